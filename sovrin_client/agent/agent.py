@@ -22,9 +22,13 @@ from stp_core.types import Identifier
 from stp_core.network.util import checkPortAvailable
 from sovrin_client.agent.agent_net import AgentNet
 from sovrin_client.agent.caching import Caching
+from sovrin_client.agent.exception import OutboundQueueFull
+from sovrin_client.agent.outbound_queues import OutboundQueues
 from sovrin_client.agent.walleted import Walleted
+from sovrin_client.anon_creds.public_data_cache import PublicDataCache
 from sovrin_client.anon_creds.sovrin_issuer import SovrinIssuer
 from sovrin_client.anon_creds.sovrin_prover import SovrinProver
+from sovrin_client.anon_creds.sovrin_public_repo import SovrinPublicRepo
 from sovrin_client.anon_creds.sovrin_verifier import SovrinVerifier
 from sovrin_client.client.client import Client
 from sovrin_client.client.wallet.wallet import Wallet
@@ -69,6 +73,13 @@ class Agent(Motor, AgentNet):
         # known identifiers of this agent's owner
         self.ownerIdentifiers = {}  # type: Dict[Identifier, Identity]
 
+        # messages waiting for the endpoint to connect to their remotes,
+        # sent from `prod` once connected
+        self.outboundQueues = OutboundQueues(
+            maxSize=getattr(self.config, 'AgentOutboundQueueSize', 1000),
+            dropOldest=getattr(self.config, 'AgentOutboundQueueDropOldest',
+                               True))
+
     @property
     def client(self):
         return self._client
@@ -77,6 +88,15 @@ class Agent(Motor, AgentNet):
     def client(self, client):
         self._client = client
 
+    @property
+    def ownsClient(self) -> bool:
+        """
+        Whether the agent's client is its own rather than shared from a
+        client pool which takes care of it
+        """
+        return self.client is not None and \
+            getattr(self.client, 'clientPool', None) is None
+
     @property
     def name(self):
         return self._name
@@ -90,10 +110,11 @@ class Agent(Motor, AgentNet):
         if self.get_status() == Status.starting:
             self.status = Status.started
             c += 1
-        if self.client:
+        if self.ownsClient:
             c += await self.client.prod(limit)
         if self.endpoint:
             c += await self.endpoint.service(limit)
+            c += self.flushOutboundQueues()
         return c
 
     def start(self, loop):
@@ -108,15 +129,17 @@ class Agent(Motor, AgentNet):
 
 
         super().start(loop)
-        if self.client:
+        if self.ownsClient:
             self.client.start(loop)
         if self.endpoint:
             self.endpoint.start()
 
     def stop(self, *args, **kwargs):
         super().stop(*args, **kwargs)
-        if self.client:
+        if self.ownsClient:
             self.client.stop()
+        elif self.client:
+            self.client.clientPool.release(self.client)
         if self.endpoint:
             self.endpoint.stop()
 
@@ -154,29 +177,39 @@ class Agent(Motor, AgentNet):
     def handleEndpointMessage(self, msg):
         raise NotImplementedError
 
-    def ensureConnectedToDest(self, name, ha, clbk, *args):
-        if self.endpoint.isConnectedTo(name=name, ha=ha):
-            if clbk:
-                clbk(*args)
-        else:
-            self.loop.call_later(.2, self.ensureConnectedToDest,
-                                 name, ha, clbk, *args)
+    def _sendToEndpoint(self, msg, name, ha):
+        self.endpoint.send(msg, name, ha)
+        logger.debug("Message sent (to -> {}): {}".format(ha, msg))
 
     def sendMessage(self, msg, name: str = None, ha: Tuple = None):
-
-        def _send(msg):
-            nonlocal name, ha
-            self.endpoint.send(msg, name, ha)
-            logger.debug("Message sent (to -> {}): {}".format(ha, msg))
-
+        remote = (name, tuple(ha) if ha else None)
         # TODO: if we call following isConnectedTo method by ha,
         # there was a case it found more than one remote, so for now,
         # I have changed it to call by remote name (which I am not sure
         # fixes the issue), need to come back to this.
-        if not self.endpoint.isConnectedTo(name=name, ha=ha):
-            self.ensureConnectedToDest(name, ha, _send, msg)
+        # Messages already queued for the remote go first
+        if remote not in self.outboundQueues and \
+                self.endpoint.isConnectedTo(name=name, ha=ha):
+            self._sendToEndpoint(msg, name, ha)
         else:
-            _send(msg)
+            try:
+                self.outboundQueues.add(remote, msg)
+            except OutboundQueueFull as ex:
+                # Refused to apply backpressure, the message is not sent
+                logger.warning("{} dropped message: {}".format(self.name, ex))
+
+    def flushOutboundQueues(self) -> int:
+        """
+        Sends the queued messages of remotes the endpoint got connected to
+        """
+        sent = 0
+        for remote in self.outboundQueues.remotes():
+            name, ha = remote
+            if self.endpoint.isConnectedTo(name=name, ha=ha):
+                for msg in self.outboundQueues.pop(remote):
+                    self._sendToEndpoint(msg, name, ha)
+                    sent += 1
+        return sent
 
     def registerEventListener(self, eventName, listener):
         cur = self._eventListeners.get(eventName)
@@ -233,9 +266,32 @@ class WalletedAgent(Walleted, Agent, Caching):
 
     def _initIssuerProverVerifier(self):
         self.issuer = SovrinIssuer(client=self.client, wallet=self._wallet,
-                                   attrRepo=self._attrRepo)
-        self.prover = SovrinProver(client=self.client, wallet=self._wallet)
-        self.verifier = SovrinVerifier(client=self.client, wallet=self._wallet)
+                                   attrRepo=self._attrRepo,
+                                   publicRepo=self._newPublicRepo())
+        self.prover = SovrinProver(client=self.client, wallet=self._wallet,
+                                   publicRepo=self._newPublicRepo())
+        self.verifier = SovrinVerifier(client=self.client, wallet=self._wallet,
+                                       publicRepo=self._newPublicRepo())
+
+    def _newPublicRepo(self):
+        return SovrinPublicRepo(client=self.client, wallet=self._wallet,
+                                diskCache=self.publicDataCache)
+
+    @property
+    def publicDataCache(self) -> PublicDataCache:
+        """
+        Disk cache of the schemas and issuer keys read from Sovrin, shared by
+        the issuer, prover and verifier
+        """
+        if getattr(self, '_publicDataCache', None) is None:
+            self._publicDataCache = PublicDataCache(
+                os.path.join(self.getContextDir(), "public_data"))
+        return self._publicDataCache
+
+    def closePublicDataCache(self):
+        if getattr(self, '_publicDataCache', None) is not None:
+            self._publicDataCache.close()
+            self._publicDataCache = None
 
     @property
     def wallet(self):
@@ -255,9 +311,22 @@ class WalletedAgent(Walleted, Agent, Caching):
         super().start(loop)
 
     def stop(self, *args, **kwargs):
-        self._saveAllWallets()
+        self.unload()
+        if self.client and not self.ownsClient:
+            self.client.clientPool.deregisterWallet(self.wallet)
         super().stop(*args, **kwargs)
 
+    def unload(self):
+        """
+        Saves the wallets and releases what the agent holds apart from its
+        client and endpoint
+        """
+        self._saveAllWallets()
+        self.stopClaimIssuancePool()
+        self.stopProofVerificationPool()
+        self.closeProverClaimStore()
+        self.closePublicDataCache()
+
     def getContextDir(self):
         return os.path.expanduser(os.path.join(
             self.config.baseDir, self.config.keyringsDir, "agents",
@@ -331,7 +400,11 @@ class WalletedAgent(Walleted, Agent, Caching):
 
 
 def createAgent(agentClass, name, wallet=None, basedirpath=None, port=None,
-                loop=None, clientClass=Client):
+                loop=None, clientClass=Client, clientPool=None):
+    """
+    :param clientPool: `ClientPool` to take the agent's client from, a new
+    client is created for the agent if not given
+    """
     config = getConfig()
 
     if not wallet:
@@ -343,11 +416,13 @@ def createAgent(agentClass, name, wallet=None, basedirpath=None, port=None,
     if not port:
         _, port = genHa()
 
-    _, clientPort = genHa()
-
-    client = clientClass(randomString(6),
-                         ha=("0.0.0.0", clientPort),
-                         basedirpath=basedirpath)
+    if clientPool:
+        client = clientPool.assign()
+    else:
+        _, clientPort = genHa()
+        client = clientClass(randomString(6),
+                             ha=("0.0.0.0", clientPort),
+                             basedirpath=basedirpath)
 
     return agentClass(basedirpath=basedirpath,
                       client=client,
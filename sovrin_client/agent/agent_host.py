@@ -0,0 +1,329 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from plenum.common.constants import IDENTIFIER, NONCE
+from plenum.common.motor import Motor
+from plenum.common.startable import Status
+from stp_core.common.log import getlogger
+from stp_core.network.util import checkPortAvailable
+from plenum.common.types import HA
+
+from sovrin_client.agent.agent import WalletedAgent
+from sovrin_client.agent.agent_net import AgentNet
+from sovrin_client.client.client import Client
+from sovrin_client.client.reply_router import ReplyRouter
+from sovrin_client.client.wallet.link import Link
+from sovrin_client.persistence.record_log import RecordLog
+from sovrin_common.config_util import getConfig
+
+logger = getlogger()
+
+# Kinds of routes to tenants
+TENANT = "tenant"
+NONCE_ROUTE = "nonce"
+IDENTIFIER_ROUTE = "identifier"
+
+# Kinds of routes by the link attribute they are taken from
+LINK_ROUTES = {
+    'invitationNonce': NONCE_ROUTE,
+    'remoteIdentifier': IDENTIFIER_ROUTE
+}
+
+
+class AgentHost(Motor, AgentNet):
+    """
+    Hosts many tenant agents behind one endpoint and one client, so the
+    sockets and connections to Sovrin do not grow with the number of
+    tenants.
+
+    Messages from other agents are routed to a tenant by the invitation
+    nonce or the identifier of the link they come over. Routes are added as
+    links of loaded tenants are created or accepted and are persisted, so a
+    tenant is only loaded, with its wallets, when a message for it arrives
+    or it is asked for, and unloaded again once idle for `idleTimeout`
+    seconds or when more than `maxLoadedTenants` are loaded.
+
+    Replies from Sovrin are given to the wallet of the loaded tenant which
+    prepared the request, like `ClientPool` does, instead of to every
+    wallet. When the host's client is taken from a `ClientPool`, the pool
+    runs the client and routes its replies, the host registers the wallets
+    of its loaded tenants with the pool.
+    """
+
+    def __init__(self,
+                 name: str = 'AgentHost',
+                 basedirpath: str = None,
+                 client: Client = None,
+                 port: int = None,
+                 loop=None,
+                 config=None,
+                 endpointArgs=None,
+                 tenantFactory: Callable[[str], WalletedAgent] = None):
+        if port:
+            checkPortAvailable(HA("0.0.0.0", port))
+        Motor.__init__(self)
+        self.endpoint = None
+        self.loop = loop or asyncio.get_event_loop()
+        self._name = name
+        self._port = port
+        self.config = config or getConfig()
+        self.basedirpath = basedirpath or os.path.expanduser(
+            self.config.baseDir)
+        self.endpointArgs = endpointArgs
+        self.client = client
+        self.tenantFactory = tenantFactory or self._newTenant
+
+        self.maxLoadedTenants = getattr(self.config, 'AgentHostMaxTenants',
+                                        1000)
+        self.idleTimeout = getattr(self.config, 'AgentHostTenantIdleTimeout',
+                                   600)
+        self.evictionInterval = getattr(self.config,
+                                        'AgentHostEvictionInterval', 60)
+        self._lastEviction = time.monotonic()
+
+        # Tenant names and routes of messages to tenants
+        self.routes = RecordLog(self.getContextDir(), "routes_log")
+        # Loaded tenants by name, least recently active first
+        self._tenants = OrderedDict()  # type: Dict[str, WalletedAgent]
+        self._lastActive = {}  # type: Dict[str, float]
+        # Observers of the links of loaded tenants, by tenant name
+        self._linkObservers = {}  # type: Dict[str, Callable]
+        self.replyRouter = ReplyRouter()
+        self.unroutable = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def port(self):
+        return self._port
+
+    @property
+    def ownsClient(self) -> bool:
+        """
+        Whether the host's client is its own rather than shared from a
+        client pool which takes care of it
+        """
+        return self.client is not None and \
+            getattr(self.client, 'clientPool', None) is None
+
+    def getContextDir(self):
+        return os.path.expanduser(os.path.join(
+            self.config.baseDir, self.config.keyringsDir, "agent-hosts",
+            self._name.lower().replace(" ", "-")))
+
+    def _newTenant(self, name: str) -> WalletedAgent:
+        return WalletedAgent(name=name, basedirpath=self.basedirpath,
+                             loop=self.loop)
+
+    # Lifecycle
+
+    def start(self, loop):
+        AgentNet.__init__(self,
+                          name=self._name.replace(" ", ""),
+                          port=self._port,
+                          basedirpath=self.basedirpath,
+                          msgHandler=self.handleEndpointMessage,
+                          config=self.config,
+                          endpointArgs=self.endpointArgs)
+        super().start(loop)
+        if self.ownsClient:
+            self.client.registerObserver(self.handleIncomingReply,
+                                         name=self._name)
+            self.client.start(loop)
+        if self.endpoint:
+            self.endpoint.start()
+        for tenant in self._tenants.values():
+            tenant.endpoint = self.endpoint
+
+    def stop(self, *args, **kwargs):
+        for name in list(self._tenants):
+            self.unloadTenant(name)
+        self.routes.close()
+        super().stop(*args, **kwargs)
+        if self.ownsClient:
+            self.client.stop()
+        elif self.client:
+            self.client.clientPool.release(self.client)
+        if self.endpoint:
+            self.endpoint.stop()
+
+    def _statusChanged(self, old, new):
+        pass
+
+    def onStopping(self, *args, **kwargs):
+        pass
+
+    async def prod(self, limit) -> int:
+        c = 0
+        if self.get_status() == Status.starting:
+            self.status = Status.started
+            c += 1
+        if self.ownsClient:
+            c += await self.client.prod(limit)
+        if self.endpoint:
+            c += await self.endpoint.service(limit)
+            for tenant in self._tenants.values():
+                c += tenant.flushOutboundQueues()
+        if time.monotonic() - self._lastEviction >= self.evictionInterval:
+            self.evictIdleTenants()
+        return c
+
+    # Tenants
+
+    def addTenant(self, name: str, load=False) -> Optional[WalletedAgent]:
+        """
+        Registers tenant `name` with the host, loading it if `load`
+        """
+        if (TENANT, name) not in self.routes:
+            self.routes.put((TENANT, name), True)
+        return self.getTenant(name) if load else None
+
+    @property
+    def tenantNames(self):
+        return [key[1] for key, _ in self.routes.items() if key[0] == TENANT]
+
+    def isLoaded(self, name: str) -> bool:
+        return name in self._tenants
+
+    def getTenant(self, name: str) -> WalletedAgent:
+        """
+        Returns tenant `name`, loading it if needed
+        """
+        tenant = self._tenants.get(name)
+        if tenant is None:
+            tenant = self._loadTenant(name)
+        self._tenants.move_to_end(name)
+        self._lastActive[name] = time.monotonic()
+        return tenant
+
+    def _loadTenant(self, name: str) -> WalletedAgent:
+        if (TENANT, name) not in self.routes:
+            raise KeyError("{} is not a tenant of {}".format(name, self))
+        while len(self._tenants) >= self.maxLoadedTenants:
+            if not self._evictOne():
+                break
+        tenant = self.tenantFactory(name)
+        tenant.endpoint = self.endpoint
+        self._routeTenant(name, tenant)
+        if self.client:
+            tenant.client = self.client
+            tenant._restoreIssuerWallet()
+            self._syncTenant(tenant)
+        tenant.status = Status.started
+        self._tenants[name] = tenant
+        self.loads += 1
+        logger.debug("{} loaded tenant {}".format(self, name))
+        return tenant
+
+    def _syncTenant(self, tenant: WalletedAgent):
+        wallet = tenant.wallet
+        wallet.pendSyncRequests()
+        prepared = wallet.preparePending()
+        if prepared:
+            self.client.submitReqs(*prepared)
+
+    def _routeTenant(self, name: str, tenant: WalletedAgent):
+        wallet = tenant.wallet
+        for link in wallet.getLinks():
+            for attr in LINK_ROUTES:
+                self._routeLink(name, link, attr, getattr(link, attr, None))
+        observer = partial(self._routeLink, name)
+        wallet.registerLinkObserver(observer)
+        self._linkObservers[name] = observer
+        if self.ownsClient:
+            self.replyRouter.add(wallet)
+        elif self.client:
+            self.client.clientPool.registerWallet(wallet)
+
+    def _unrouteTenant(self, name: str, tenant: WalletedAgent):
+        observer = self._linkObservers.pop(name, None)
+        if observer:
+            tenant.wallet.deregisterLinkObserver(observer)
+        if self.ownsClient:
+            self.replyRouter.remove(tenant.wallet)
+        elif self.client:
+            self.client.clientPool.deregisterWallet(tenant.wallet)
+
+    def _routeLink(self, name: str, link: Link, attr: str, value: Any):
+        kind = LINK_ROUTES.get(attr)
+        if kind and value and self.routes.get((kind, value)) != name:
+            self.routes.put((kind, value), name)
+
+    def _isBusy(self, tenant: WalletedAgent) -> bool:
+        # Replies to requests the tenant sent to Sovrin are still expected
+        return tenant.wallet.preparedCount > 0
+
+    def unloadTenant(self, name: str):
+        tenant = self._tenants.pop(name, None)
+        if tenant is None:
+            return
+        self._lastActive.pop(name, None)
+        self._unrouteTenant(name, tenant)
+        tenant.unload()
+        self.evictions += 1
+        logger.debug("{} unloaded tenant {}".format(self, name))
+
+    def _evictOne(self) -> bool:
+        for name, tenant in self._tenants.items():
+            if not self._isBusy(tenant):
+                self.unloadTenant(name)
+                return True
+        return False
+
+    def evictIdleTenants(self) -> int:
+        self._lastEviction = time.monotonic()
+        idleSince = self._lastEviction - self.idleTimeout
+        idle = [name for name, tenant in self._tenants.items()
+                if self._lastActive[name] <= idleSince and
+                not self._isBusy(tenant)]
+        for name in idle:
+            self.unloadTenant(name)
+        self.routes.flush()
+        return len(idle)
+
+    # Routing
+
+    def routeFor(self, body) -> Optional[str]:
+        nonce = body.get(NONCE)
+        name = self.routes.get((NONCE_ROUTE, nonce)) if nonce else None
+        if name is None:
+            identifier = body.get(IDENTIFIER)
+            if identifier:
+                name = self.routes.get((IDENTIFIER_ROUTE, identifier))
+        return name
+
+    def handleEndpointMessage(self, msg):
+        body, frm = msg
+        name = self.routeFor(body)
+        if name is None:
+            self.unroutable += 1
+            logger.warning("{} found no tenant for message from {}".
+                           format(self, frm))
+            return
+        self.getTenant(name).handleEndpointMessage(msg)
+
+    def handleIncomingReply(self, observer_name, reqId, frm, result,
+                            numReplies):
+        self.replyRouter.route(observer_name, reqId, frm, result, numReplies)
+
+    @property
+    def stats(self):
+        return {
+            "tenants": len(self.tenantNames),
+            "loaded": len(self._tenants),
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "unroutable": self.unroutable,
+            "unroutedReplies": self.replyRouter.unrouted
+        }
+
+    def __repr__(self):
+        return self._name
@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from plenum.common.constants import NAME, VERSION, ORIGIN
 from plenum.common.types import f
@@ -8,6 +8,7 @@ from anoncreds.protocol.issuer import Issuer
 from anoncreds.protocol.types import SchemaKey, ID
 from anoncreds.protocol.types import ClaimRequest
 from sovrin_client.agent.constants import EVENT_NOTIFY_MSG, CLAIMS_LIST_FIELD
+from sovrin_client.anon_creds.claim_issuance_pool import ClaimIssuancePool
 from sovrin_client.agent.msg_constants import CLAIM, CLAIM_REQ_FIELD, CLAIM_FIELD, \
     AVAIL_CLAIM_LIST
 
@@ -15,6 +16,31 @@ from sovrin_client.agent.msg_constants import CLAIM, CLAIM_REQ_FIELD, CLAIM_FIEL
 class AgentIssuer:
     def __init__(self, issuer: Issuer):
         self.issuer = issuer
+        self._claimIssuancePool = None
+
+    def getClaimIssuancePool(self) -> Optional[ClaimIssuancePool]:
+        """
+        Returns the pool of processes claims are issued by when the
+        `ClaimIssuanceWorkers` setting is positive, otherwise claims are
+        issued on the agent's event loop
+        """
+        if self._claimIssuancePool is None:
+            workers = getattr(self.config, 'ClaimIssuanceWorkers', 0)
+            if workers and workers > 0:
+                self._claimIssuancePool = ClaimIssuancePool(workers)
+        return self._claimIssuancePool
+
+    def stopClaimIssuancePool(self):
+        if self._claimIssuancePool:
+            self._claimIssuancePool.shutdown()
+            self._claimIssuancePool = None
+
+    async def issueClaim(self, schemaId: ID, claimReq: ClaimRequest):
+        pool = self.getClaimIssuancePool()
+        if pool:
+            return await pool.issueClaim(self.issuer, self._attrRepo,
+                                         schemaId, claimReq)
+        return await self.issuer.issueClaim(schemaId, claimReq)
 
     async def processReqAvailClaims(self, msg):
         body, (frm, ha) = msg
@@ -49,7 +75,7 @@ class AgentIssuer:
         self._addAttribute(schemaKey=schemaKey, proverId=claimReq.userId,
                            link=link)
 
-        claim = await self.issuer.issueClaim(schemaId, claimReq)
+        claim = await self.issueClaim(schemaId, claimReq)
 
         claimDetails = {
             NAME: schema.name,
@@ -1,5 +1,5 @@
 import asyncio
-from typing import Any
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from collections import OrderedDict
 
 from plenum.common.constants import NONCE, TYPE, NAME, VERSION, ORIGIN, IDENTIFIER, \
@@ -15,6 +15,9 @@ from sovrin_client.agent.msg_constants import CLAIM_REQUEST, PROOF, CLAIM_FIELD,
     REQ_AVAIL_CLAIMS
 from sovrin_client.client.wallet.types import ProofRequest
 from sovrin_client.client.wallet.link import Link
+from sovrin_client.client.wallet.wallet import Wallet
+from sovrin_client.persistence.prover_claim_store import ProverClaimStore, \
+    ClaimKey
 from sovrin_common.util import getNonceForProof
 from sovrin_common.exceptions import LinkNotReady
 
@@ -22,6 +25,23 @@ from sovrin_common.exceptions import LinkNotReady
 class AgentProver:
     def __init__(self, prover: Prover):
         self.prover = prover
+        # Proofs built in the background when proof requests arrive, by link
+        # name, proof request name and version, as the claims version and
+        # invitation nonce they were built with and the future of the proof
+        self._precomputedProofs = {}  # type: Dict[Tuple, Tuple]
+        # Bumped on every received claim, so a proof is not built from the
+        # claims checked before it arrived
+        self._claimsVersion = 0
+        # Available claims whose schemas and keys are being fetched
+        self._prefetching = set()
+        self._prefetchSemaphore = None  # type: asyncio.Semaphore
+        # Names of the links offering each claim in the prover claim store,
+        # built from the wallet once the store is opened
+        self._linksByClaim = None  # type: Dict[ClaimKey, List[str]]
+
+    @property
+    def precomputeProofs(self) -> bool:
+        return getattr(self.config, 'PrecomputeProofs', False)
 
     def sendReqAvailClaims(self, link: Link):
         if self.loop.is_running():
@@ -41,6 +61,57 @@ class AgentProver:
         except LinkNotReady as ex:
             self.notifyMsgListener(str(ex))
 
+    def addAvailableClaims(self, link: Link, claims):
+        """
+        Adds `claims` to the ones available on `link` and stores their
+        attributes, so proof requests are matched to them by the prover
+        claim store
+        """
+        link.availableClaims.extend(claims)
+        if self._linksByClaim is not None:
+            for cl in claims:
+                self._linksByClaim.setdefault(
+                    ProverClaimStore.key(cl), []).append(link.name)
+        self.prefetchClaimData(claims)
+
+    def prefetchClaimData(self, claims):
+        """
+        Fetches the schemas of available `claims` in the background, a few
+        at a time, and stores their attributes. Unless disabled, the issuer
+        keys are fetched too so requesting and processing the claims later
+        does not wait for Sovrin
+        """
+        if not self.prover:
+            return
+        for cl in claims:
+            if cl in self._prefetching:
+                continue
+            self._prefetching.add(cl)
+            if self.loop.is_running():
+                asyncio.ensure_future(self._prefetchClaimData(cl))
+            else:
+                self.loop.run_until_complete(self._prefetchClaimData(cl))
+
+    async def _prefetchClaimData(self, cl):
+        if self._prefetchSemaphore is None:
+            self._prefetchSemaphore = asyncio.Semaphore(
+                getattr(self.config, 'ClaimDataPrefetchConcurrency', 4))
+        name, version, origin = cl
+        schemaKey = SchemaKey(name, version, origin)
+        try:
+            async with self._prefetchSemaphore:
+                schema = await self.prover.wallet.getSchema(ID(schemaKey))
+                schemaId = ID(schemaKey=schemaKey, schemaId=schema.seqId)
+                if getattr(self.config, 'PrefetchClaimData', True):
+                    await self.prover.wallet.getPublicKey(schemaId)
+                    await self.prover.wallet.getPublicKeyRevocation(schemaId)
+                await self._storeClaimAttrs(cl, schemaId)
+        except Exception as ex:
+            self.logger.debug('Could not prefetch schema and keys of {}: {}'.
+                              format(name, ex))
+        finally:
+            self._prefetching.discard(cl)
+
     def sendReqClaim(self, link: Link, schemaKey):
         if self.loop.is_running():
             self.loop.call_soon(asyncio.ensure_future,
@@ -84,15 +155,18 @@ class AgentProver:
                                .format(proofReqName, link.name))
 
         if not proofReqExist:
-            link.proofRequests.append(
-                ProofRequest(
-                    name=proofReqName,
-                    version=body.get(VERSION),
-                    attributes=body.get(ATTRIBUTES),
-                    verifiableAttributes=body.get(VERIFIABLE_ATTRIBUTES)
-                )
+            proofRequest = ProofRequest(
+                name=proofReqName,
+                version=body.get(VERSION),
+                attributes=body.get(ATTRIBUTES),
+                verifiableAttributes=body.get(VERIFIABLE_ATTRIBUTES)
             )
+            link.proofRequests.append(proofRequest)
+            self.schedulePrecomputeProof(link, proofRequest)
         else:
+            # Asked again, so the proof is to be sent again
+            request.answered = False
+            self.schedulePrecomputeProof(link, request)
             self.notifyMsgListener('    Proof request {} already exist.\n'
                                    .format(proofReqName))
 
@@ -115,6 +189,9 @@ class AgentProver:
             claim = Claims.fromStrDict(claim[CLAIM_FIELD])
 
             await self.prover.processClaim(schemaId, claim)
+            await self._storeClaimAttrs((name, version, claimAuthor), schemaId)
+            self.invalidatePrecomputedProofs(self.proverClaimStore.get(
+                (name, version, claimAuthor)).keys())
         else:
             self.notifyMsgListener("No matching link found")
 
@@ -126,14 +203,14 @@ class AgentProver:
             self.loop.run_until_complete(self.sendProofAsync(link, proofReq))
 
     async def sendProofAsync(self, link: Link, proofRequest: ProofRequest):
-        # TODO _F_ this nonce should be from the Proof Request, not from an
-        # invitation
-        nonce = getNonceForProof(link.invitationNonce)
-
-        revealedAttrNames = proofRequest.verifiableAttributes
-        proofInput = ProofInput(revealedAttrs=revealedAttrNames)
-        # TODO rename presentProof to buildProof or generateProof
-        proof, revealedAttrs = await self.prover.presentProof(proofInput, nonce)
+        precomputed = await self.popPrecomputedProof(link, proofRequest)
+        if precomputed:
+            proofInput, proof, revealedAttrs = precomputed
+        else:
+            proofInput, proof, revealedAttrs = await self._buildProof(
+                link, proofRequest)
+        # Self attested attributes are not part of the proof, so they can
+        # change after the proof was built
         revealedAttrs.update(proofRequest.selfAttestedAttrs)
         op = OrderedDict([
             (TYPE, PROOF),
@@ -145,6 +222,127 @@ class AgentProver:
             (REVEALED_ATTRS_FIELD, toDictWithStrValues(revealedAttrs))])
 
         self.signAndSendToLink(msg=op, linkName=link.name)
+        proofRequest.answered = True
+
+    async def _buildProof(self, link: Link, proofRequest: ProofRequest):
+        # TODO _F_ this nonce should be from the Proof Request, not from an
+        # invitation
+        nonce = getNonceForProof(link.invitationNonce)
+
+        revealedAttrNames = proofRequest.verifiableAttributes
+        proofInput = ProofInput(revealedAttrs=revealedAttrNames)
+        # TODO rename presentProof to buildProof or generateProof
+        proof, revealedAttrs = await self.prover.presentProof(proofInput, nonce)
+        return proofInput, proof, revealedAttrs
+
+    @staticmethod
+    def _proofKey(link: Link, proofRequest: ProofRequest):
+        return link.name, proofRequest.name, proofRequest.version
+
+    def schedulePrecomputeProof(self, link: Link, proofRequest: ProofRequest):
+        """
+        Starts building the proof for `proofRequest` in the background if
+        proofs are precomputed, so `send proof` only has to sign and send it
+        """
+        if self.precomputeProofs and self.loop.is_running():
+            asyncio.ensure_future(
+                self._precomputeProofIfReady(link, proofRequest))
+
+    async def _precomputeProofIfReady(self, link: Link,
+                                      proofRequest: ProofRequest):
+        if self._getPrecomputed(link, proofRequest):
+            return
+        claimsVersion = self._claimsVersion
+        if not await self.hasClaimsForProof(proofRequest):
+            return
+        if claimsVersion != self._claimsVersion:
+            # A claim arrived meanwhile, check again with it
+            self.schedulePrecomputeProof(link, proofRequest)
+            return
+        # Another build may have started meanwhile
+        if self._getPrecomputed(link, proofRequest):
+            return
+        key = self._proofKey(link, proofRequest)
+        fut = asyncio.ensure_future(self._buildProof(link, proofRequest))
+        entry = (link.invitationNonce, fut)
+        self._precomputedProofs[key] = entry
+
+        def done(f):
+            if f.cancelled():
+                return
+            if f.exception():
+                self.logger.debug('Could not precompute proof {} for {}: {}'.
+                                  format(proofRequest.name, link.name,
+                                         f.exception()))
+                if self._precomputedProofs.get(key) is entry:
+                    del self._precomputedProofs[key]
+
+        fut.add_done_callback(done)
+
+    async def hasClaimsForProof(self, proofRequest: ProofRequest) -> bool:
+        """
+        Whether received claims have values for all the verifiable
+        attributes of `proofRequest`
+        """
+        needed = set(proofRequest.verifiableAttributes or [])
+        if not needed:
+            return False
+        claims = await self.getClaimsUsedForAttrs(dict.fromkeys(needed))
+        held = set()
+        for _, _, issuedAttrs in claims:
+            held.update(k for k, v in issuedAttrs.items() if v is not None)
+        return needed <= held
+
+    def _getPrecomputed(self, link: Link, proofRequest: ProofRequest):
+        key = self._proofKey(link, proofRequest)
+        entry = self._precomputedProofs.get(key)
+        if entry is None:
+            return None
+        invitationNonce, fut = entry
+        if invitationNonce != link.invitationNonce:
+            fut.cancel()
+            del self._precomputedProofs[key]
+            return None
+        return fut
+
+    async def popPrecomputedProof(self, link: Link,
+                                  proofRequest: ProofRequest) \
+            -> Optional[Tuple]:
+        """
+        Returns the proof input, proof and revealed attributes precomputed
+        for `proofRequest`, waiting for them if still being built, None if
+        there is no valid precomputed proof
+        """
+        fut = self._getPrecomputed(link, proofRequest)
+        if fut is None:
+            return None
+        del self._precomputedProofs[self._proofKey(link, proofRequest)]
+        try:
+            return await asyncio.shield(fut)
+        except (Exception, asyncio.CancelledError):
+            return None
+
+    def invalidatePrecomputedProofs(self, attrNames: Iterable[str]):
+        """
+        Drops the proofs precomputed for the proof requests having any of
+        `attrNames`, the attributes of a new claim, since the claim may
+        satisfy them differently, and precomputes them again for the
+        requests not answered yet
+        """
+        attrNames = set(attrNames)
+        self._claimsVersion += 1
+        for link in self.wallet.getLinks():
+            for proofRequest in link.proofRequests:
+                if not attrNames.intersection(
+                        proofRequest.verifiableAttributes or ()):
+                    continue
+                entry = self._precomputedProofs.pop(
+                    self._proofKey(link, proofRequest), None)
+                if entry is not None:
+                    entry[1].cancel()
+                # Wallets saved before answers were recorded lack the flag
+                if not getattr(proofRequest, 'answered', False):
+                    self.schedulePrecomputeProof(link, proofRequest)
 
     def handleProofStatusResponse(self, msg: Any):
         body, _ = msg
@@ -154,49 +352,114 @@ class AgentProver:
         self.notifyResponseFromMsg(li.name, body.get(f.REQ_ID.nm))
         self.notifyMsgListener(data)
 
-    async def getMatchingLinksWithReceivedClaimAsync(self, claimName=None):
-        matchingLinkAndAvailableClaim = self.wallet.getMatchingLinksWithAvailableClaim(
-            claimName)
-        matchingLinkAndReceivedClaim = []
-        for li, cl in matchingLinkAndAvailableClaim:
-            name, version, origin = cl
-            schemaKeyId = ID(
-                SchemaKey(name=name, version=version, issuerId=origin))
+    @property
+    def proverClaimStore(self) -> ProverClaimStore:
+        """
+        Store of the claims known to the wallet's prover, persisted in the
+        agent's context directory
+        """
+        name = "prover_claims_{}".format(self.wallet.name.lower().replace(
+            " ", "-"))
+        store = getattr(self, '_proverClaimStore', None)
+        if store is None or self._proverClaimStoreName != name:
+            if store is not None:
+                store.close()
+            self._proverClaimStore = ProverClaimStore(self.getContextDir(),
+                                                      name)
+            self._proverClaimStoreName = name
+            self._linksByClaim = None
+        return self._proverClaimStore
+
+    def closeProverClaimStore(self):
+        store = getattr(self, '_proverClaimStore', None)
+        if store is not None:
+            store.close()
+            self._proverClaimStore = None
+            self._linksByClaim = None
+
+    async def _storeClaimAttrs(self, cl, schemaId: ID = None):
+        """
+        Stores the attributes of claim `cl` with the values from the
+        prover's wallet if it has the claim
+        """
+        name, version, origin = cl
+        schemaKeyId = schemaId or ID(
+            SchemaKey(name=name, version=version, issuerId=origin))
+        attrs = self.proverClaimStore.get(cl)
+        if attrs is None:
             schema = await self.prover.wallet.getSchema(schemaKeyId)
-            claimAttrs = OrderedDict()
-            for attr in schema.attrNames:
-                claimAttrs[attr] = None
-            claim = None
-            try:
-                claim = await self.prover.wallet.getClaims(schemaKeyId)
-            except ValueError:
-                pass  # it means no claim was issued
-
-            if claim:
-                issuedAttributes = claim.primaryClaim.attrs
-                if set(claimAttrs.keys()).intersection(issuedAttributes.keys()):
-                    for k in claimAttrs.keys():
-                        claimAttrs[k] = issuedAttributes[k]
-            matchingLinkAndReceivedClaim.append((li, cl, claimAttrs))
-        return matchingLinkAndReceivedClaim
+            attrs = OrderedDict((attr, None) for attr in schema.attrNames)
+        claim = None
+        try:
+            claim = await self.prover.wallet.getClaims(schemaKeyId)
+        except ValueError:
+            pass  # it means no claim was issued
+
+        if claim:
+            issuedAttributes = claim.primaryClaim.attrs
+            if set(attrs.keys()).intersection(issuedAttributes.keys()):
+                for k in attrs.keys():
+                    attrs[k] = issuedAttributes[k]
+        self.proverClaimStore.put(cl, attrs)
+
+    async def _getLinksByClaim(self) -> Dict[ClaimKey, List[str]]:
+        """
+        Names of the links offering each claim of the prover claim store.
+        Built from the wallet's links when the store is opened, storing the
+        claims it does not know yet, then kept up to date as claims are
+        listed.
+        """
+        store = self.proverClaimStore
+        if self._linksByClaim is None:
+            self._linksByClaim = {}
+            unknown = []
+            for li, cl in self.wallet.getMatchingLinksWithAvailableClaim():
+                self._linksByClaim.setdefault(store.key(cl), []).append(
+                    li.name)
+                if cl not in store:
+                    unknown.append(cl)
+            for cl in unknown:
+                await self._storeClaimAttrs(cl)
+        return self._linksByClaim
+
+    async def _getLinksWithClaims(self, claimKeys) -> List[Tuple]:
+        linksByClaim = await self._getLinksByClaim()
+        store = self.proverClaimStore
+        claimKeys = {key for key in claimKeys if key in linksByClaim}
+        for key in claimKeys:
+            if key not in store:
+                # still being fetched since the claim was listed
+                await self._storeClaimAttrs(key)
+        # In the order of the wallet's links and of the claims each offers,
+        # which decides the claim used when several have an attribute
+        linksAndClaims = []
+        for li, cl in self.wallet.getMatchingLinksWithAvailableClaim():
+            key = store.key(cl)
+            if key in claimKeys:
+                linksAndClaims.append((li, cl, store.get(key)))
+        return linksAndClaims
+
+    async def getMatchingLinksWithReceivedClaimAsync(self, claimName=None):
+        linksByClaim = await self._getLinksByClaim()
+        return await self._getLinksWithClaims(
+            key for key in linksByClaim
+            if not claimName or Wallet._isMatchingName(claimName, key[0]))
 
     async def getMatchingRcvdClaimsAsync(self, attributes):
-        linksAndReceivedClaim = await self.getMatchingLinksWithReceivedClaimAsync()
-        attributes = set(attributes)
+        return await self._getLinksAndClaimsWithAttrs(attributes)
 
-        matchingLinkAndRcvdClaim = []
-        for li, cl, issuedAttrs in linksAndReceivedClaim:
-            if attributes.intersection(issuedAttrs.keys()):
-                matchingLinkAndRcvdClaim.append((li, cl, issuedAttrs))
-        return matchingLinkAndRcvdClaim
+    async def _getLinksAndClaimsWithAttrs(self, attributes):
+        return await self._getLinksWithClaims(
+            self.proverClaimStore.claimsWithAttrs(attributes))
 
     async def getClaimsUsedForAttrs(self, attributes):
-        allMatchingClaims = await self.getMatchingLinksWithReceivedClaimAsync()
+        matchingClaims = await self._getLinksAndClaimsWithAttrs(
+            attributes.keys())
         alreadySatisfiedKeys = {}
         claimsToUse = []
         alreadyAddedClaims = []
 
-        for li, cl, issuedAttrs in allMatchingClaims:
+        for li, cl, issuedAttrs in matchingClaims:
             issuedClaimKeys = issuedAttrs.keys()
             for key in attributes.keys():
                 if key not in alreadySatisfiedKeys and key in issuedClaimKeys:
@@ -1,4 +1,5 @@
-from typing import Any
+import asyncio
+from typing import Any, Dict, Optional
 from collections import OrderedDict
 
 from plenum.common.constants import NAME, NONCE, TYPE, DATA, VERSION, \
@@ -14,6 +15,8 @@ from sovrin_client.agent.msg_constants import PROOF_STATUS, PROOF_FIELD, \
     PROOF_REQ_SCHEMA_NAME, PROOF_REQ_SCHEMA_VERSION, \
     PROOF_REQ_SCHEMA_ATTRIBUTES, PROOF_REQ_SCHEMA_VERIFIABLE_ATTRIBUTES, \
     ERR_NO_PROOF_REQUEST_SCHEMA_FOUND
+from sovrin_client.anon_creds.proof_verification_pool import \
+    ProofVerificationPool
 from sovrin_client.client.wallet.link import Link
 from sovrin_common.util import getNonceForProof
 
@@ -21,6 +24,36 @@ from sovrin_common.util import getNonceForProof
 class AgentVerifier(Verifier):
     def __init__(self, verifier: Verifier):
         self.verifier = verifier
+        self._proofVerificationPool = None
+        # Future of the last proof from each link, by link name, done once
+        # the proof's status is sent
+        self._lastProofDone = {}  # type: Dict[str, asyncio.Future]
+
+    def getProofVerificationPool(self) -> Optional[ProofVerificationPool]:
+        """
+        Returns the pool of processes proofs are verified by when the
+        `ProofVerificationWorkers` setting is positive, otherwise proofs are
+        verified on the agent's event loop
+        """
+        if self._proofVerificationPool is None:
+            workers = getattr(self.config, 'ProofVerificationWorkers', 0)
+            if workers and workers > 0:
+                self._proofVerificationPool = ProofVerificationPool(workers)
+        return self._proofVerificationPool
+
+    def stopProofVerificationPool(self):
+        if self._proofVerificationPool:
+            self._proofVerificationPool.shutdown()
+            self._proofVerificationPool = None
+
+    async def verifyProofValues(self, proofInput, proof, revealedAttrs,
+                                nonce) -> bool:
+        pool = self.getProofVerificationPool()
+        if pool:
+            return await pool.verify(self.verifier, proofInput, proof,
+                                     revealedAttrs, nonce)
+        return await self.verifier.verify(proofInput, proof,
+                                          revealedAttrs, nonce)
 
     async def verifyProof(self, msg: Any):
         body, (frm, _) = msg
@@ -28,13 +61,28 @@ class AgentVerifier(Verifier):
         if not link:
             raise NotImplementedError
 
+        # Proofs are verified concurrently but their statuses are sent, and
+        # their follow ups done, in the order the proofs came from the link
+        prevDone = self._lastProofDone.get(link.name)
+        done = asyncio.get_event_loop().create_future()
+        self._lastProofDone[link.name] = done
+        try:
+            await self._verifyProof(body, frm, link, prevDone)
+        finally:
+            done.set_result(None)
+            if self._lastProofDone.get(link.name) is done:
+                del self._lastProofDone[link.name]
+
+    async def _verifyProof(self, body, frm, link: Link, prevDone):
         proofName = body[NAME]
         nonce = getNonceForProof(body[NONCE])
         proof = FullProof.fromStrDict(body[PROOF_FIELD])
         proofInput = ProofInput.fromStrDict(body[PROOF_INPUT_FIELD])
         revealedAttrs = fromDictWithStrValues(body[REVEALED_ATTRS_FIELD])
-        result = await self.verifier.verify(proofInput, proof,
-                                            revealedAttrs, nonce)
+        result = await self.verifyProofValues(proofInput, proof,
+                                              revealedAttrs, nonce)
+        if prevDone:
+            await prevDone
 
         self.logger.info('Proof "{}" accepted with nonce {}'
                               .format(proofName, nonce))
@@ -5,3 +5,9 @@ class NonceNotFound(RuntimeError):
 
 class SignatureRejected(RuntimeError):
     pass
+
+
+class OutboundQueueFull(RuntimeError):
+    def __init__(self, remote, maxSize):
+        super().__init__("{} messages already queued for {}".
+                         format(maxSize, remote))
@@ -0,0 +1,53 @@
+from collections import OrderedDict, deque
+from typing import Dict, Hashable
+
+from sovrin_client.agent.exception import OutboundQueueFull
+
+
+class OutboundQueues:
+    """
+    Messages waiting for the endpoint to get connected to their remotes, in
+    one queue per remote. A full queue either drops its oldest message or,
+    to apply backpressure, refuses new ones.
+    """
+
+    def __init__(self, maxSize: int=1000, dropOldest: bool=True):
+        assert maxSize > 0
+        self.maxSize = maxSize
+        self.dropOldest = dropOldest
+        self._queues = OrderedDict()  # type: Dict[Hashable, deque]
+        self.dropped = 0
+        self.refused = 0
+
+    def __len__(self):
+        return sum(len(q) for q in self._queues.values())
+
+    def __contains__(self, remote):
+        return remote in self._queues
+
+    def add(self, remote: Hashable, msg):
+        queue = self._queues.setdefault(remote, deque())
+        if len(queue) >= self.maxSize:
+            if not self.dropOldest:
+                self.refused += 1
+                raise OutboundQueueFull(remote, self.maxSize)
+            queue.popleft()
+            self.dropped += 1
+        queue.append(msg)
+
+    def remotes(self):
+        return list(self._queues.keys())
+
+    def pop(self, remote: Hashable) -> deque:
+        return self._queues.pop(remote, deque())
+
+    @property
+    def stats(self):
+        return {
+            "remotes": len(self._queues),
+            "queued": len(self),
+            "maxDepth": max((len(q) for q in self._queues.values()),
+                            default=0),
+            "dropped": self.dropped,
+            "refused": self.refused
+        }
@@ -0,0 +1,49 @@
+from sovrin_client.client.cache import LRUCache
+
+
+class ReceivedMsgStore(LRUCache):
+    """
+    Messages received from other agents by the id of the request they
+    respond to, kept so that responses arriving before anyone waits for them
+    are not missed. A message is removed once a waiter takes it; the rest
+    expire after `ttl` seconds and the least recently used request ids are
+    evicted when more than `maxSize` are kept.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.taken = 0
+
+    def add(self, reqId, msg):
+        entry = self._getEntry(reqId)
+        if entry is not None:
+            entry[0].append(msg)
+            return
+        if len(self) >= self.maxSize:
+            self.removeExpired()
+        self.put(reqId, [msg])
+
+    def take(self, reqId, msg) -> bool:
+        """
+        Removes `msg` received for `reqId`, returns whether it was there
+        """
+        entry = self._getEntry(reqId)
+        if entry is None:
+            return False
+        msgs = entry[0]
+        for i, m in enumerate(msgs):
+            if m is msg:
+                del msgs[i]
+                break
+        else:
+            return False
+        if not msgs:
+            self.invalidate(reqId)
+        self.taken += 1
+        return True
+
+    @property
+    def stats(self):
+        stats = super().stats
+        stats["taken"] = self.taken
+        return stats
@@ -0,0 +1,94 @@
+import asyncio
+import heapq
+import itertools
+from typing import Any, Callable, Dict, List, Tuple
+
+# Key of a wait, the request id the response refers to and the type of the
+# response
+WaitKey = Tuple[Any, str]
+
+
+class ResponseWaiters:
+    """
+    Futures waiting for responses from other agents, keyed by the request id
+    and type of the expected response. They are resolved with the response
+    as soon as it is dispatched. Expiries are kept in a heap served by a
+    single timer scheduled for the earliest one, so outstanding waits cost
+    nothing until they resolve or expire.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None):
+        self.loop = loop
+        # key -> list of (future, predicate on the response)
+        self._waiters = {}  # type: Dict[WaitKey, List[Tuple[asyncio.Future, Callable]]]
+        self._expiries = []  # type: List[Tuple[float, int, asyncio.Future]]
+        self._seq = itertools.count()
+        self._timer = None  # type: asyncio.TimerHandle
+        self._timerDeadline = None
+
+    def __len__(self):
+        return sum(len(ws) for ws in self._waiters.values())
+
+    def _getLoop(self):
+        return self.loop or asyncio.get_event_loop()
+
+    def wait(self, reqId, respType: str, timeout: float,
+             predicate: Callable[[Any], bool] = None) -> asyncio.Future:
+        """
+        Returns a future resolved with the first response of type
+        `respType` to request `reqId` satisfying `predicate`, it fails with
+        `asyncio.TimeoutError` if none arrives in `timeout` seconds
+        """
+        loop = self._getLoop()
+        fut = loop.create_future()
+        key = (reqId, respType)
+        self._waiters.setdefault(key, []).append((fut, predicate))
+        fut.add_done_callback(lambda f: self._discard(key, f))
+        deadline = loop.time() + max(timeout, 0)
+        heapq.heappush(self._expiries, (deadline, next(self._seq), fut))
+        self._schedule()
+        return fut
+
+    def resolve(self, reqId, respType: str, msg) -> int:
+        """
+        Resolves the futures waiting for `msg`, returns how many were
+        """
+        waiters = self._waiters.get((reqId, respType))
+        if not waiters:
+            return 0
+        resolved = 0
+        for fut, predicate in list(waiters):
+            if not fut.done() and (predicate is None or predicate(msg)):
+                fut.set_result(msg)
+                resolved += 1
+        return resolved
+
+    def _discard(self, key, fut):
+        waiters = self._waiters.get(key)
+        if waiters is None:
+            return
+        waiters[:] = [(f, p) for f, p in waiters if f is not fut]
+        if not waiters:
+            del self._waiters[key]
+
+    def _schedule(self):
+        while self._expiries and self._expiries[0][2].done():
+            heapq.heappop(self._expiries)
+        if not self._expiries:
+            return
+        deadline = self._expiries[0][0]
+        if self._timer and self._timerDeadline <= deadline:
+            return
+        if self._timer:
+            self._timer.cancel()
+        self._timerDeadline = deadline
+        self._timer = self._getLoop().call_at(deadline, self._expire)
+
+    def _expire(self):
+        self._timer = None
+        now = self._getLoop().time()
+        while self._expiries and self._expiries[0][0] <= now:
+            _, _, fut = heapq.heappop(self._expiries)
+            if not fut.done():
+                fut.set_exception(asyncio.TimeoutError())
+        self._schedule()
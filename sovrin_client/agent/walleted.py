@@ -1,5 +1,6 @@
 import asyncio
 import collections
+import hashlib
 import inspect
 import json
 import time
@@ -17,7 +18,7 @@ from plenum.common.constants import TYPE, DATA, NONCE, IDENTIFIER, NAME, VERSION
     TARGET_NYM, ATTRIBUTES, VERKEY, VERIFIABLE_ATTRIBUTES
 from plenum.common.types import f
 from plenum.common.util import getTimeBasedId, getCryptonym, \
-    isMaxCheckTimeExpired, convertTimeBasedReqIdToMillis, friendlyToRaw
+    convertTimeBasedReqIdToMillis, friendlyToRaw
 from plenum.common.verifier import DidVerifier
 
 from anoncreds.protocol.issuer import Issuer
@@ -32,10 +33,13 @@ from sovrin_client.agent.constants import ALREADY_ACCEPTED_FIELD, CLAIMS_LIST_FI
     EVENT_POST_ACCEPT_INVITE, PONG, EVENT_NOT_CONNECTED_TO_ANY_ENV
 from sovrin_client.agent.exception import NonceNotFound, SignatureRejected
 from sovrin_client.agent.helper import friendlyVerkeyToPubkey
+from sovrin_client.agent.received_msg_store import ReceivedMsgStore
+from sovrin_client.agent.response_waiters import ResponseWaiters
 from sovrin_client.agent.msg_constants import ACCEPT_INVITE, CLAIM_REQUEST, \
     PROOF, \
     AVAIL_CLAIM_LIST, CLAIM, PROOF_STATUS, NEW_AVAILABLE_CLAIMS, \
     REF_REQUEST_ID, REQ_AVAIL_CLAIMS, INVITE_ACCEPTED, PROOF_REQUEST
+from sovrin_client.client.cache import LRUCache
 from sovrin_client.client.wallet.attribute import Attribute, LedgerStore
 from sovrin_client.client.wallet.link import Link, constant
 from sovrin_client.client.wallet.types import ProofRequest, AvailableClaim
@@ -43,10 +47,9 @@ from sovrin_client.client.wallet.wallet import Wallet
 from sovrin_common.exceptions import LinkNotFound, LinkAlreadyExists, \
     NotConnectedToNetwork, LinkNotReady
 from sovrin_common.identity import Identity
-from sovrin_common.constants import ENDPOINT
-from sovrin_common.util import ensureReqCompleted
+from sovrin_common.constants import ENDPOINT, GET_NYM, GET_ATTR
 from sovrin_common.config import agentLoggingLevel
-from plenum.common.constants import PUBKEY
+from plenum.common.constants import PUBKEY, TXN_TYPE, RAW
 
 logger = getlogger()
 logger.setLevel(agentLoggingLevel)
@@ -73,7 +76,21 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
         # TODO Why are we syncing the client here?
         if self.client:
             self.syncClient()
-        self.rcvdMsgStore = {}  # type: Dict[reqId, [reqMsg]]
+        # responses received, by request id, until someone waits for them
+        self.rcvdMsgStore = ReceivedMsgStore(
+            maxSize=getattr(self.config, 'AgentRcvdMsgStoreSize', 10000),
+            ttl=getattr(self.config, 'AgentRcvdMsgTTL', 600))
+        # futures waiting for responses to requests sent to other agents
+        self.responseWaiters = ResponseWaiters()
+        # verifiers of signatures of incoming messages, by identifier and
+        # verkey, since decoding verkeys for every message is costly
+        self.verifierCache = LRUCache(
+            maxSize=getattr(self.config, 'AgentVerifierCacheSize', 1000))
+        # keys of the signed messages recently accepted, so that
+        # retransmitted or replayed ones are dropped without verifying them
+        self.rcvdMsgKeys = LRUCache(
+            maxSize=getattr(self.config, 'AgentMsgDedupCacheSize', 10000),
+            ttl=getattr(self.config, 'AgentMsgDedupWindow', 300))
 
         self.msgHandlers = {
             ERROR: self._handleError,
@@ -100,7 +117,11 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
 
     def syncClient(self):
         obs = self._wallet.handleIncomingReply
-        if not self.client.hasObserver(obs):
+        clientPool = getattr(self.client, 'clientPool', None)
+        if clientPool:
+            # Replies are routed to the wallet by the pool
+            clientPool.registerWallet(self._wallet)
+        elif not self.client.hasObserver(obs):
             self.client.registerObserver(obs)
         self._wallet.pendSyncRequests()
         prepared = self._wallet.preparePending()
@@ -289,6 +310,12 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
                 logger.warning("{}".format(errorMsg))
                 return
 
+        msgKey = self._rcvdMsgKey(body)
+        if msgKey and self.rcvdMsgKeys.get(msgKey):
+            logger.debug("Dropping duplicate message {} from {}".
+                         format(body.get(f.REQ_ID.nm), frm))
+            return
+
         typ = body.get(TYPE)
         link = self.wallet.getLinkInvitationByTarget(body.get(f.IDENTIFIER.nm))
 
@@ -317,13 +344,14 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
                 self.sendSigVerifResponseMsg("\nSignature rejected.",
                                              frm, typ, localIdr)
                 return
+            # Only messages whose signature was verified are remembered,
+            # otherwise a forged message carrying a copied signature would
+            # get the genuine one dropped
+            if msgKey:
+                self.rcvdMsgKeys.put(msgKey, True)
         reqId = body.get(f.REQ_ID.nm)
 
-        oldResps = self.rcvdMsgStore.get(reqId)
-        if oldResps:
-            oldResps.append(msg)
-        else:
-            self.rcvdMsgStore[reqId] = [msg]
+        self.rcvdMsgStore.add(reqId, msg)
 
         # TODO: Question: Should we sending an acknowledgement for every message?
         # We are sending, ACKs for "signature accepted" messages too
@@ -338,6 +366,9 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
             res = handler((body, (frm, frmHa)))
             if inspect.isawaitable(res):
                 self.loop.call_soon(asyncio.ensure_future, res)
+            if self.responseWaiters.resolve(reqId, typ, msg):
+                # Taken by its waiters, no later one needs it
+                self.rcvdMsgStore.take(reqId, msg)
         else:
             raise NotImplementedError("No type handle found for {} message".
                                       format(typ))
@@ -379,7 +410,7 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
                 newAvailableClaims = self._getNewAvailableClaims(
                     li, rcvdAvailableClaims)
                 if newAvailableClaims:
-                    li.availableClaims.extend(newAvailableClaims)
+                    self.addAvailableClaims(li, newAvailableClaims)
                     claimNames = ", ".join(
                         [n for n, _, _ in newAvailableClaims])
                     self.notifyMsgListener(
@@ -431,7 +462,7 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
                 newAvailableClaims = self._getNewAvailableClaims(
                     li, rcvdAvailableClaims)
                 if newAvailableClaims:
-                    li.availableClaims.extend(newAvailableClaims)
+                    self.addAvailableClaims(li, newAvailableClaims)
                     self.notifyMsgListener("    Available Claim(s): {}".
                         format(",".join(
                         [rc.get(NAME) for rc in rcvdAvailableClaims])))
@@ -485,7 +516,7 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
                 # Assuming CID for now.
                 verkey = link.targetVerkey
 
-        v = DidVerifier(verkey, identifier=identifier)
+        v = self.getVerifier(identifier, verkey)
         if not v.verify(signature, ser):
             raise SignatureRejected
         else:
@@ -493,16 +524,56 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
                 self.logger.info('\nSignature accepted.')
             return True
 
+    @staticmethod
+    def _rcvdMsgKey(body):
+        signature = body.get(f.SIG.nm)
+        if not signature:
+            return None
+        digest = hashlib.sha256(signature.encode()).hexdigest()
+        return body.get(f.IDENTIFIER.nm), body.get(f.REQ_ID.nm), digest
+
+    @property
+    def msgDedupStats(self):
+        stats = self.rcvdMsgKeys.stats
+        return {
+            "duplicatesDropped": stats["hits"],
+            "new": stats["misses"],
+            "size": stats["size"],
+            "evictions": stats["evictions"],
+            "expirations": stats["expirations"]
+        }
+
+    def getVerifier(self, identifier, verkey) -> DidVerifier:
+        key = (identifier, verkey)
+        v = self.verifierCache.get(key)
+        if v is None:
+            v = DidVerifier(verkey, identifier=identifier)
+            self.verifierCache.put(key, v)
+        return v
+
+    def setLinkTargetVerkey(self, link: Link, verkey):
+        if link.targetVerkey != verkey:
+            # Messages signed with the old verkey must not be accepted any
+            # more
+            identifier = link.remoteIdentifier
+            self.verifierCache.invalidateWhere(
+                lambda k: k[0] == identifier and k[1] != verkey)
+        link.targetVerkey = verkey
+
     def _getLinkByTarget(self, target) -> Link:
         return self.wallet.getLinkInvitationByTarget(target)
 
     def _checkIfLinkIdentifierWrittenToSovrin(self, li: Link, availableClaims):
-        req = self.getIdentity(li.localIdentifier)
-        self.notifyMsgListener("\nSynchronizing...")
+        cache = self.getClient().readCache
+        op = {
+            TARGET_NYM: li.localIdentifier,
+            TXN_TYPE: GET_NYM
+        }
 
         def getNymReply(reply, err, availableClaims, li: Link):
             if reply.get(DATA) and json.loads(reply[DATA])[TARGET_NYM] == \
                     li.localIdentifier:
+                cache.putReply(op, reply)
                 self.notifyMsgListener(
                     "    Confirmed identifier written to Sovrin.")
                 self.notifyEventListeners(EVENT_POST_ACCEPT_INVITE, link=li)
@@ -510,8 +581,15 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
                 self.notifyMsgListener(
                     "    Identifier is not yet written to Sovrin")
 
-        self.loop.call_later(.2, ensureReqCompleted, self.loop, req.key,
-                             self.client, getNymReply, (availableClaims, li))
+        self.notifyMsgListener("\nSynchronizing...")
+        cachedReply = cache.getReply(op)
+        if cachedReply:
+            self.loop.call_soon(getNymReply, cachedReply, None,
+                                availableClaims, li)
+            return
+
+        req = self.getIdentity(li.localIdentifier)
+        self._whenReqCompleted(req, getNymReply, availableClaims, li)
 
     def notifyResponseFromMsg(self, linkName, reqId=None):
         if reqId:
@@ -550,7 +628,7 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
         identifier = body.get(f.IDENTIFIER.nm)
         verkey = body.get(VERKEY)
         idy = Identity(identifier, verkey=verkey)
-        link.targetVerkey = verkey
+        self.setLinkTargetVerkey(link, verkey)
         try:
             pendingCount = self.wallet.addTrustAnchoredIdentity(idy)
             logger.debug("pending request count {}".format(pendingCount))
@@ -603,7 +681,25 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
 
     def _sendToSovrinAndDo(self, req, clbk=None, *args):
         self.client.submitReqs(req)
-        ensureReqCompleted(self.loop, req.key, self.client, clbk, *args)
+        if clbk:
+            self._whenReqCompleted(req, clbk, *args)
+
+    def _whenReqCompleted(self, req, clbk, *args):
+        """
+        Calls `clbk(reply, err, *args)` as soon as the submitted request gets
+        consensus or is rejected. Not called if the request does neither
+        within the client's reply timeout.
+        """
+        def done(fut):
+            if fut.cancelled():
+                logger.warning("{} got no consensus on request {} within {} "
+                               "seconds".format(self, req.key,
+                                                self.client.replyTimeout))
+            else:
+                reply, err = fut.result()
+                clbk(reply, err, *args)
+
+        self.client.getReplyFuture(*req.key).add_done_callback(done)
 
     def newAvailableClaimsPostClaimVerif(self, claimName):
         raise NotImplementedError
@@ -774,19 +870,17 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
                 raise RuntimeError(err)
             reqId = self._updateLinkWithLatestInfo(link, reply)
             if reqId:
-                self.loop.call_later(.2,
-                                     self.executeWhenResponseRcvd,
-                                     time.time(), 8000,
-                                     self.loop, reqId, PONG, True,
-                                     additionalCallback, reply, err)
+                self.executeWhenResponseRcvd(time.time(), 8000,
+                                             self.loop, reqId, PONG, True,
+                                             additionalCallback, reply, err)
             else:
                 additionalCallback(reply, err)
 
         return _
 
     def _updateLinkWithLatestInfo(self, link: Link, reply):
-        link.targetVerkey = DidVerifier(reply[VERKEY],
-                                        identifier=link.remoteIdentifier).verkey
+        self.setLinkTargetVerkey(link, self.getVerifier(
+            link.remoteIdentifier, reply[VERKEY]).verkey)
         if DATA in reply and reply[DATA]:
             data = json.loads(reply[DATA])
             ep = data.get(ENDPOINT)
@@ -834,6 +928,19 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
         #                          self.client,
         #                          self._handleSyncNymResp(link, doneCallback))
 
+        cache = self.client.readCache
+        op = {
+            TARGET_NYM: nym,
+            TXN_TYPE: GET_ATTR,
+            RAW: ENDPOINT
+        }
+        cachedReply = cache.getReply(op)
+        if cachedReply:
+            if doneCallback:
+                self.loop.call_soon(self._handleSyncResp(link, doneCallback),
+                                    cachedReply, None)
+            return
+
         attrib = Attribute(name=ENDPOINT,
                            value=None,
                            dest=nym,
@@ -842,42 +949,47 @@ class Walleted(AgentIssuer, AgentProver, AgentVerifier):
         self.client.submitReqs(req)
 
         if doneCallback:
-            self.loop.call_later(.2,
-                                 ensureReqCompleted,
-                                 self.loop,
-                                 req.key,
-                                 self.client,
-                                 self._handleSyncResp(link, doneCallback))
+            handleSyncResp = self._handleSyncResp(link, doneCallback)
+
+            def cacheAndHandle(reply, err):
+                if not err and reply.get(DATA):
+                    cache.putReply(op, reply)
+                handleSyncResp(reply, err)
+
+            self._whenReqCompleted(req, cacheAndHandle)
 
     def executeWhenResponseRcvd(self, startTime, maxCheckForMillis,
                                 loop, reqId, respType,
                                 checkIfLinkExists, clbk, *args):
+        """
+        Calls `clbk(*args)` as soon as a response of type `respType` to
+        request `reqId` is received, or `clbk(None, error)` if none is
+        received within `maxCheckForMillis` milliseconds of `startTime`
+        """
+        def matches(msg):
+            if not checkIfLinkExists:
+                return True
+            body, _ = msg
+            identifier = body.get(IDENTIFIER)
+            return self._getLinkByTarget(getCryptonym(identifier)) is not None
 
-        if isMaxCheckTimeExpired(startTime, maxCheckForMillis):
-            clbk(None, "No response received within specified time ({} mills). "
-                       "Retry the command and see if that works.\n".
-                 format(maxCheckForMillis))
-        else:
-            found = False
-            rcvdResponses = self.rcvdMsgStore.get(reqId)
-            if rcvdResponses:
-                for msg in rcvdResponses:
-                    body, frm = msg
-                    if body.get(TYPE) == respType:
-                        if checkIfLinkExists:
-                            identifier = body.get(IDENTIFIER)
-                            li = self._getLinkByTarget(getCryptonym(identifier))
-                            linkCheckOk = li is not None
-                        else:
-                            linkCheckOk = True
-
-                        if linkCheckOk:
-                            found = True
-                            break
-
-            if found:
-                clbk(*args)
+        def done(fut):
+            if fut.cancelled():
+                return
+            if fut.exception():
+                clbk(None, "No response received within specified time ({} "
+                           "mills). Retry the command and see if that "
+                           "works.\n".format(maxCheckForMillis))
             else:
-                loop.call_later(.2, self.executeWhenResponseRcvd,
-                                startTime, maxCheckForMillis, loop,
-                                reqId, respType, checkIfLinkExists, clbk, *args)
+                clbk(*args)
+
+        for msg in self.rcvdMsgStore.get(reqId, []):
+            body, _ = msg
+            if body.get(TYPE) == respType and matches(msg):
+                self.rcvdMsgStore.take(reqId, msg)
+                loop.call_soon(clbk, *args)
+                return
+
+        timeout = maxCheckForMillis / 1000 - (time.time() - startTime)
+        self.responseWaiters.wait(reqId, respType, timeout,
+                                  matches).add_done_callback(done)
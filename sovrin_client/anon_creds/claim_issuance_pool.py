@@ -0,0 +1,101 @@
+import asyncio
+from typing import Dict, Tuple
+
+import jsonpickle
+
+from anoncreds.protocol.issuer import Issuer
+from anoncreds.protocol.repo.attributes_repo import AttributeRepo, \
+    AttributeRepoInMemory
+from anoncreds.protocol.types import ID, Claims, ClaimRequest
+from anoncreds.protocol.wallet.issuer_wallet import IssuerWalletInMemory
+
+from sovrin_client.anon_creds.worker_pool import AnoncredsWorkerPool, \
+    ShippedPublicRepo, runInWorker, SCHEMA, PK
+
+
+# Issuers of the worker process with their attribute repos, by issuer and
+# schema, so a secret key is loaded once per worker
+_workerIssuers = {}  # type: Dict[Tuple[str, ID], Tuple[Issuer, AttributeRepoInMemory]]
+
+
+def _nonRevocationClaimIssuer(issuer: Issuer):
+    """
+    Returns a coroutine function issuing the non revocation half of a claim
+    by `issuer` apart from the primary one. anoncreds has no public method
+    for it, so it uses private methods of Issuer, the ones of the anoncreds
+    version pinned in setup.py.
+    """
+    try:
+        genContxt = issuer._genContxt
+        issueNonRevocationClaim = issuer._issueNonRevocationClaim
+    except AttributeError as ex:
+        raise RuntimeError("ClaimIssuancePool can not issue non revocation "
+                           "claims with this version of anoncreds ({}), "
+                           "use the pinned version or set "
+                           "ClaimIssuanceWorkers to 0".format(ex)) from ex
+
+    async def issue(schemaId: ID, claimRequest: ClaimRequest, iA):
+        # The context attribute depends on the issuer's accumulator which
+        # only the agent's process keeps up to date
+        await genContxt(schemaId, iA, claimRequest.userId)
+        return await issueNonRevocationClaim(schemaId, claimRequest.Ur, iA,
+                                             None)
+
+    return issue
+
+
+def _workerIssuer(issuerId: str, schemaId: ID, publicData, sk):
+    key = (issuerId, schemaId)
+    if key not in _workerIssuers:
+        wallet = IssuerWalletInMemory(issuerId, ShippedPublicRepo(publicData))
+        runInWorker(wallet.submitSecretKeys(schemaId, sk))
+        attrRepo = AttributeRepoInMemory()
+        _workerIssuers[key] = Issuer(wallet, attrRepo), attrRepo
+    return _workerIssuers[key]
+
+
+def _issuePrimaryClaim(serializedArgs: str) -> str:
+    issuerId, schemaId, publicData, sk, attributes, claimRequest, iA = \
+        jsonpickle.decode(serializedArgs, keys=True)
+    issuer, attrRepo = _workerIssuer(issuerId, schemaId, publicData, sk)
+    schemaKey = publicData[0][1][SCHEMA].getKey()
+    attrRepo.addAttributes(schemaKey, claimRequest.userId, attributes)
+    claims = runInWorker(issuer.issueClaim(schemaId, claimRequest, iA=iA))
+    return jsonpickle.encode(claims.primaryClaim, keys=True)
+
+
+class ClaimIssuancePool(AnoncredsWorkerPool):
+    """
+    Issues claims with the big integer math of primary claims done by worker
+    processes, so the agent's event loop is not blocked and issuance scales
+    with the number of cores. A job carries the schema, the public key, the
+    issuer's secret key and the claim's attributes, so the secret key is
+    pickled into every job and held by the workers.
+
+    Non revocation claims update the issuer's accumulator so they are still
+    issued by the agent's process, while the worker computes the primary
+    claim.
+    """
+
+    async def issueClaim(self, issuer: Issuer, attrRepo: AttributeRepo,
+                         schemaId: ID, claimRequest: ClaimRequest) -> Claims:
+        issueNonRevocClaim = _nonRevocationClaimIssuer(issuer) \
+            if claimRequest.Ur else None
+        wallet = issuer.wallet
+        schema = await wallet.getSchema(schemaId)
+        publicData = [(schemaId, {SCHEMA: schema,
+                                  PK: await wallet.getPublicKey(schemaId)})]
+        sk = await wallet.getSecretKey(schemaId)
+        attributes = attrRepo.getAttributes(schema.getKey(),
+                                            claimRequest.userId)
+        iA = (await wallet.getAccumulator(schemaId)).currentI
+
+        primaryClaim = asyncio.ensure_future(self.run(
+            _issuePrimaryClaim, wallet.walletId, schemaId, publicData, sk,
+            attributes, claimRequest._replace(Ur=None), iA))
+        nonRevocClaim = None
+        if issueNonRevocClaim:
+            nonRevocClaim = await issueNonRevocClaim(schemaId, claimRequest,
+                                                     iA)
+        return Claims(primaryClaim=await primaryClaim,
+                      nonRevocClaim=nonRevocClaim)
@@ -0,0 +1,58 @@
+from typing import Dict, List
+
+import jsonpickle
+
+from anoncreds.protocol.types import FullProof, ProofInput, ID
+from anoncreds.protocol.verifier import Verifier
+from anoncreds.protocol.wallet.wallet import WalletInMemory
+
+from sovrin_client.anon_creds.worker_pool import AnoncredsWorkerPool, \
+    ShippedPublicRepo, runInWorker, PublicData, SCHEMA, PK, PK_REVOCATION, \
+    PK_ACCUMULATOR, ACCUMULATOR, TAILS
+
+
+def _verify(serializedArgs: str) -> str:
+    verifierId, publicData, proofInput, proof, revealedAttrs, nonce = \
+        jsonpickle.decode(serializedArgs, keys=True)
+    verifier = Verifier(WalletInMemory(verifierId,
+                                       ShippedPublicRepo(publicData)))
+    result = runInWorker(verifier.verify(proofInput, proof, revealedAttrs,
+                                         nonce))
+    return jsonpickle.encode(result, keys=True)
+
+
+class ProofVerificationPool(AnoncredsWorkerPool):
+    """
+    Verifies proofs in parallel in worker processes. The schemas and public
+    keys a proof refers to are fetched by the agent first and shipped to the
+    workers with the proof, so workers never go to Sovrin.
+    """
+
+    @staticmethod
+    async def _publicData(verifier: Verifier, proof: FullProof) \
+            -> List[PublicData]:
+        wallet = verifier.wallet
+        publicData = []
+        for schemaKey, proofItem in zip(proof.schemaKeys, proof.proofs):
+            schemaId = ID(schemaKey)
+            data = {
+                SCHEMA: await wallet.getSchema(schemaId),
+                PK: await wallet.getPublicKey(schemaId)
+            }
+            if proofItem.nonRevocProof:
+                data[PK_REVOCATION] = \
+                    await wallet.getPublicKeyRevocation(schemaId)
+                data[PK_ACCUMULATOR] = \
+                    await wallet.getPublicKeyAccumulator(schemaId)
+                data[ACCUMULATOR] = await wallet.getAccumulator(schemaId)
+                data[TAILS] = await wallet.getTails(schemaId)
+            # Found by seqId as well
+            publicData.append((ID(schemaKey, schemaId=data[SCHEMA].seqId),
+                               data))
+        return publicData
+
+    async def verify(self, verifier: Verifier, proofInput: ProofInput,
+                     proof: FullProof, revealedAttrs: Dict, nonce) -> bool:
+        publicData = await self._publicData(verifier, proof)
+        return await self.run(_verify, verifier.wallet.walletId, publicData,
+                              proofInput, proof, revealedAttrs, nonce)
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import zlib
+from typing import Dict, Optional, Tuple
+
+from plenum.common.constants import TARGET_NYM, TXN_TYPE, DATA, NAME, \
+    VERSION, ORIGIN
+from stp_core.common.log import getlogger
+
+from sovrin_common.constants import GET_SCHEMA, GET_ISSUER_KEY, REF
+from sovrin_client.persistence.record_log import RecordLog
+
+logger = getlogger()
+
+
+class PublicDataCache:
+    """
+    Disk cache of the replies to reads of schemas and issuer keys, which
+    never change once written to Sovrin, so that they are not read again
+    after a restart.
+
+    Replies are stored zlib compressed in files named by the SHA-256 digest
+    of their content. An index from the schema (issuer, name and version)
+    or the issuer keys (issuer and schema sequence number) to the digest is
+    read on start, a reply is read from disk on its first use only.
+    """
+
+    def __init__(self, dataDir: str):
+        self.objectsDir = os.path.join(dataDir, "objects")
+        os.makedirs(self.objectsDir, exist_ok=True)
+        self._index = RecordLog(dataDir, "index_log")
+        self._loaded = {}  # type: Dict[Tuple, Dict]
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def keyForOp(op: Dict) -> Optional[Tuple]:
+        typ = op.get(TXN_TYPE)
+        if typ == GET_SCHEMA:
+            return typ, op[TARGET_NYM], op[DATA][NAME], op[DATA][VERSION]
+        if typ == GET_ISSUER_KEY:
+            return typ, op[ORIGIN], op[REF]
+        return None
+
+    def _objectPath(self, digest):
+        return os.path.join(self.objectsDir, digest)
+
+    def getReply(self, op: Dict):
+        key = self.keyForOp(op)
+        if key is None:
+            return None
+        reply = self._loaded.get(key)
+        if reply is None:
+            reply = self._load(key)
+        if reply is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return reply
+
+    def _load(self, key):
+        digest = self._index.get(key)
+        if digest is None:
+            return None
+        try:
+            with open(self._objectPath(digest), 'rb') as f:
+                blob = f.read()
+        except OSError as ex:
+            logger.warning("Could not read cached {}: {}".format(key, ex))
+            self._index.remove(key)
+            return None
+        if hashlib.sha256(blob).hexdigest() != digest:
+            logger.warning("Discarding corrupt cached {}".format(key))
+            self._index.remove(key)
+            return None
+        reply = json.loads(zlib.decompress(blob).decode())
+        self._loaded[key] = reply
+        return reply
+
+    def putReply(self, op: Dict, reply):
+        key = self.keyForOp(op)
+        if key is None or key in self._index:
+            return
+        blob = zlib.compress(json.dumps(reply, sort_keys=True).encode(), 9)
+        digest = hashlib.sha256(blob).hexdigest()
+        path = self._objectPath(digest)
+        if not os.path.exists(path):
+            tmpPath = path + ".tmp"
+            with open(tmpPath, 'wb') as f:
+                f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmpPath, path)
+        self._index.put(key, digest)
+        self._loaded[key] = reply
+
+    @property
+    def stats(self):
+        return {
+            "size": len(self._index),
+            "loaded": len(self._loaded),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def close(self):
+        self._index.close()
@@ -23,11 +23,13 @@ class SovrinIssuer(Issuer):
         self.wallet._repo.client = None
 
     def restorePersistedWallet(self, issuerWallet):
-        curRepoClient = self.wallet._repo.client
+        # The persisted repo is a stale copy, keep using the current one so
+        # that its client and settings (like request timeout) are preserved
+        curRepo = self.wallet._repo
         self.wallet = issuerWallet
         self._primaryIssuer._wallet = issuerWallet
         self._nonRevocationIssuer._wallet = issuerWallet
-        self.wallet._repo.client = curRepoClient
+        self.wallet._repo = curRepo
 
 
 class SovrinIssuerWalletInMemory(IssuerWalletInMemory):
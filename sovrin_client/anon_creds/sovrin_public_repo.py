@@ -1,8 +1,9 @@
+import asyncio
 import json
+from typing import Dict, Tuple
 
 from ledger.util import F
-from stp_core.loop.eventually import eventually
-from plenum.common.exceptions import NoConsensusYet, OperationError
+from plenum.common.exceptions import OperationError
 from stp_core.common.log import getlogger
 from plenum.common.constants import TARGET_NYM, TXN_TYPE, DATA, NAME, \
     VERSION, TYPE, ORIGIN
@@ -14,21 +15,11 @@ from anoncreds.protocol.repo.public_repo import PublicRepo
 from anoncreds.protocol.types import Schema, ID, PublicKey, \
     RevocationPublicKey, AccumulatorPublicKey, \
     Accumulator, TailsType, TimestampType
+from sovrin_client.anon_creds.public_data_cache import PublicDataCache
+from sovrin_common.config_util import getConfig
 from sovrin_common.types import Request
 
 
-def _ensureReqCompleted(reqKey, client, clbk):
-    reply, err = client.replyIfConsensus(*reqKey)
-
-    if err:
-        raise OperationError(err)
-
-    if reply is None:
-        raise NoConsensusYet('not completed')
-
-    return clbk(reply, err)
-
-
 def _getData(result, error):
     data = json.loads(result.get(DATA).replace("\'", '"'))
     seqNo = None if not data else data.get(F.seqNo.name)
@@ -45,10 +36,38 @@ logger = getlogger()
 
 
 class SovrinPublicRepo(PublicRepo):
-    def __init__(self, client, wallet):
+    def __init__(self, client, wallet, timeout=None, diskCache=None):
         self.client = client
         self.wallet = wallet
+        # schemas and issuer keys read before, kept across restarts
+        self.diskCache = diskCache  # type: PublicDataCache
         self.displayer = print
+        # seconds to wait for consensus on a request sent to Sovrin
+        self.timeout = timeout or getattr(getConfig(), 'PublicRepoReqTimeout',
+                                          20)
+        # read requests sent to Sovrin and not yet completed, keyed by
+        # normalized operation, identical reads wait on the same request
+        self._inFlightReads = {}  # type: Dict[str, asyncio.Future]
+        # public keys already parsed from ledger replies. The client's read
+        # cache keeps the raw replies, but only for as long as they are not
+        # evicted, and parsing the keys' big numbers each time a proof is
+        # built or verified is costly
+        self._issuerKeys = {}  # type: Dict[Tuple[int, str], Tuple[PublicKey, RevocationPublicKey]]
+
+    def __getstate__(self):
+        # Pending requests and parsed keys are not persisted along with the
+        # issuer wallet
+        state = self.__dict__.copy()
+        state.pop('_inFlightReads', None)
+        state.pop('_issuerKeys', None)
+        state.pop('diskCache', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._inFlightReads = {}
+        self._issuerKeys = {}
+        self.diskCache = None
 
     async def getSchema(self, id: ID) -> Schema:
         op = {
@@ -68,19 +87,22 @@ class SovrinPublicRepo(PublicRepo):
                                seqId=seqNo)
 
     async def getPublicKey(self, id: ID) -> PublicKey:
-        op = {
-            TXN_TYPE: GET_ISSUER_KEY,
-            REF: id.schemaId,
-            ORIGIN: id.schemaKey.issuerId
-        }
-
-        data, seqNo = await self._sendGetReq(op)
-
-        data = data[DATA][PRIMARY]
-        pk = PublicKey.fromStrDict(data)._replace(seqId=seqNo)
+        pk, _ = await self.getPublicKeys(id)
         return pk
 
     async def getPublicKeyRevocation(self, id: ID) -> RevocationPublicKey:
+        _, pkR = await self.getPublicKeys(id)
+        return pkR
+
+    async def getPublicKeys(self, id: ID) -> (PublicKey, RevocationPublicKey):
+        """
+        Fetches both the primary and the revocation public key of the issuer
+        with a single request, since they are written in the same transaction
+        """
+        memoKey = (id.schemaId, id.schemaKey.issuerId)
+        if memoKey in self._issuerKeys:
+            return self._issuerKeys[memoKey]
+
         op = {
             TXN_TYPE: GET_ISSUER_KEY,
             REF: id.schemaId,
@@ -90,11 +112,14 @@ class SovrinPublicRepo(PublicRepo):
         data, seqNo = await self._sendGetReq(op)
 
         if not data:
-            return None
+            return None, None
 
-        data = data[DATA][REVOCATION]
-        pkR = RevocationPublicKey.fromStrDict(data)._replace(seqId=seqNo)
-        return pkR
+        data = data[DATA]
+        pk = PublicKey.fromStrDict(data[PRIMARY])._replace(seqId=seqNo)
+        pkR = RevocationPublicKey.fromStrDict(data[REVOCATION])._replace(
+            seqId=seqNo) if data.get(REVOCATION) else None
+        self._issuerKeys[memoKey] = pk, pkR
+        return pk, pkR
 
     async def getPublicKeyAccumulator(self, id: ID) -> AccumulatorPublicKey:
         pass
@@ -144,6 +169,7 @@ class SovrinPublicRepo(PublicRepo):
             return None
         pk = pk._replace(seqId=seqNo)
         pkR = pkR._replace(seqId=seqNo)
+        self._issuerKeys[(id.schemaId, self.wallet.defaultId)] = pk, pkR
         return pk, pkR
 
     async def submitAccumulator(self, id: ID, accumPK: AccumulatorPublicKey,
@@ -155,23 +181,50 @@ class SovrinPublicRepo(PublicRepo):
         pass
 
     async def _sendSubmitReq(self, op):
-        return await self._sendReq(op, _submitData)
+        return _submitData(await self._sendReq(op), None)
 
     async def _sendGetReq(self, op):
-        return await self._sendReq(op, _getData)
-
-    async def _sendReq(self, op, clbk):
+        cache = self.client.readCache
+        reply = cache.getReply(op)
+        if reply is None and self.diskCache:
+            reply = self.diskCache.getReply(op)
+            if reply is not None:
+                cache.putReply(op, reply)
+        if reply is None:
+            reply = await self._sendCoalescedReq(op)
+            _, seqNo = _getData(reply, None)
+            # Only cache what exists on the ledger, it may be written later
+            if seqNo:
+                cache.putReply(op, reply)
+                if self.diskCache:
+                    self.diskCache.putReply(op, reply)
+        return _getData(reply, None)
+
+    async def _sendCoalescedReq(self, op):
+        key = json.dumps(op, sort_keys=True)
+        fut = self._inFlightReads.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._sendReq(op))
+            self._inFlightReads[key] = fut
+            fut.add_done_callback(
+                lambda _: self._inFlightReads.pop(key, None))
+        # Shielded so that one waiter being cancelled does not cancel the
+        # request for the others
+        return await asyncio.shield(fut)
+
+    async def _sendReq(self, op):
         req = Request(identifier=self.wallet.defaultId, operation=op)
         req = self.wallet.prepReq(req)
         self.client.submitReqs(req)
+        # The future is resolved by the client as soon as it gets f+1
+        # matching replies (or NACKs/REJECTs), no polling involved
         try:
-            # TODO: Come up with an explanation, why retryWait had to be
-            # increases to 1 from .5 to pass some tests and from 1 to 2 to
-            # pass some other tests. The client was not getting a chance to
-            # service its stack, we need to find a way to stop this starvation.
-            resp = await eventually(_ensureReqCompleted,
-                                    req.key, self.client, clbk,
-                                    timeout=20, retryWait=2)
-        except NoConsensusYet:
+            reply, err = await asyncio.wait_for(
+                self.client.getReplyFuture(*req.key), timeout=self.timeout)
+        except asyncio.TimeoutError:
             raise TimeoutError('Request timed out')
-        return resp
+
+        if err:
+            raise OperationError(err)
+
+        return reply
@@ -0,0 +1,132 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+import jsonpickle
+
+from anoncreds.protocol.repo.public_repo import PublicRepo
+from anoncreds.protocol.types import ID, Schema, PublicKey, \
+    RevocationPublicKey, AccumulatorPublicKey, Accumulator, TailsType, \
+    TimestampType
+from stp_core.common.log import getlogger
+
+logger = getlogger()
+
+# Event loop the worker process runs anoncreds coroutines in
+_workerLoop = None
+
+SCHEMA = 'schema'
+PK = 'pk'
+PK_REVOCATION = 'pkR'
+PK_ACCUMULATOR = 'accumPk'
+ACCUMULATOR = 'accum'
+TAILS = 'tails'
+
+# Public data of a schema shipped to a worker: the schema's id and the
+# schema, keys, accumulator and tails by the names above
+PublicData = Tuple[ID, Dict[str, Any]]
+
+
+def runInWorker(coro):
+    global _workerLoop
+    if _workerLoop is None:
+        _workerLoop = asyncio.new_event_loop()
+    return _workerLoop.run_until_complete(coro)
+
+
+class ShippedPublicRepo(PublicRepo):
+    """
+    Read-only public repo of a worker process, answering from the public
+    data shipped along with a job, so workers never go to Sovrin.
+    """
+
+    def __init__(self, publicData: List[PublicData]):
+        self._byKey = {}
+        self._bySeqId = {}
+        for schemaId, data in publicData:
+            if schemaId.schemaKey:
+                self._byKey[schemaId.schemaKey] = data
+            if schemaId.schemaId:
+                self._bySeqId[schemaId.schemaId] = data
+
+    def _get(self, id: ID, name: str):
+        data = self._byKey.get(id.schemaKey) if id.schemaKey else None
+        if data is None:
+            data = self._bySeqId.get(id.schemaId)
+        if data is None:
+            raise ValueError("No public data was shipped for {}".format(id))
+        return data.get(name)
+
+    async def getSchema(self, id: ID) -> Schema:
+        return self._get(id, SCHEMA)
+
+    async def getPublicKey(self, id: ID) -> PublicKey:
+        return self._get(id, PK)
+
+    async def getPublicKeyRevocation(self, id: ID) -> RevocationPublicKey:
+        return self._get(id, PK_REVOCATION)
+
+    async def getPublicKeyAccumulator(self, id: ID) -> AccumulatorPublicKey:
+        return self._get(id, PK_ACCUMULATOR)
+
+    async def getAccumulator(self, id: ID) -> Accumulator:
+        return self._get(id, ACCUMULATOR)
+
+    async def getTails(self, id: ID) -> TailsType:
+        return self._get(id, TAILS)
+
+    async def submitSchema(self, schema: Schema) -> Schema:
+        raise NotImplementedError
+
+    async def submitPublicKeys(self, id: ID, pk: PublicKey,
+                               pkR: RevocationPublicKey = None) -> (
+            PublicKey, RevocationPublicKey):
+        raise NotImplementedError
+
+    async def submitAccumulator(self, id: ID, accumPK: AccumulatorPublicKey,
+                                accum: Accumulator, tails: TailsType):
+        raise NotImplementedError
+
+    async def submitAccumUpdate(self, id: ID, accum: Accumulator,
+                                timestampMs: TimestampType):
+        raise NotImplementedError
+
+
+class AnoncredsWorkerPool:
+    """
+    Pool of worker processes doing anoncreds math off the agent's event loop.
+    Workers hold no wallet: each job is shipped with the public data, and for
+    issuance the secret key, of the schemas it needs, so a new schema does
+    not need new workers. Secret keys are thus pickled into jobs and kept in
+    the workers' memory, though the agent's signing keys are never shipped.
+
+    Arguments and results cross processes jsonpickled, like persisted
+    wallets, since the crypto integers can not be pickled.
+    """
+
+    def __init__(self, workers: int):
+        assert workers > 0
+        self.workers = workers
+        self._executor = None  # type: ProcessPoolExecutor
+
+    def run(self, func: Callable[[str], str], *args):
+        """
+        Submits `func` with `args` to a worker right away and returns an
+        awaitable of its result
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            logger.debug("Started {} {} workers".
+                         format(self.workers, type(self).__name__))
+        fut = asyncio.get_event_loop().run_in_executor(
+            self._executor, func, jsonpickle.encode(args, keys=True))
+        return self._decoded(fut)
+
+    @staticmethod
+    async def _decoded(fut):
+        return jsonpickle.decode(await fut, keys=True)
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
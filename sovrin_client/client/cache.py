@@ -0,0 +1,147 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, ORIGIN
+
+from sovrin_common.constants import GET_NYM, GET_ATTR, GET_SCHEMA, \
+    GET_ISSUER_KEY
+
+
+class LRUCache:
+    """
+    Size bounded cache which evicts the least recently used entry when full.
+    Entries can optionally expire `ttl` seconds after being put.
+    """
+
+    def __init__(self, maxSize: int, ttl: Optional[float]=None,
+                 clock: Callable[[], float]=time.monotonic):
+        assert maxSize > 0
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self._clock = clock
+        # key -> (value, time of expiry or None)
+        self._entries = OrderedDict()  # type: Dict[Hashable, Tuple[Any, Optional[float]]]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self._getEntry(key) is not None
+
+    def _getEntry(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            _, expiresAt = entry
+            if expiresAt is not None and expiresAt <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+        return entry
+
+    def get(self, key, default=None):
+        entry = self._getEntry(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, expires=True):
+        """
+        :param expires: whether the entry should expire after `ttl`
+        seconds, entries which don't expire are only removed by eviction or
+        invalidation
+        """
+        expiresAt = self._clock() + self.ttl if expires and self.ttl else None
+        self._entries[key] = (value, expiresAt)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxSize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def pop(self, key, default=None):
+        entry = self._getEntry(key)
+        if entry is None:
+            return default
+        del self._entries[key]
+        return entry[0]
+
+    def invalidate(self, key) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def invalidateWhere(self, predicate: Callable[[Hashable], bool]) -> int:
+        keys = [k for k in self._entries if predicate(k)]
+        for k in keys:
+            del self._entries[k]
+        return len(keys)
+
+    def removeExpired(self) -> int:
+        now = self._clock()
+        removed = self.invalidateWhere(
+            lambda k: self._entries[k][1] is not None and
+            self._entries[k][1] <= now)
+        self.expirations += removed
+        return removed
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+class LedgerReadCache(LRUCache):
+    """
+    Cache of replies to read requests sent to Sovrin, keyed by the request's
+    operation. Schemas and issuer keys never change once written so they do
+    not expire; identities and attributes can be updated on the ledger so
+    they expire after `ttl` seconds.
+    """
+
+    cacheableTypes = (GET_NYM, GET_ATTR, GET_SCHEMA, GET_ISSUER_KEY)
+    immutableTypes = (GET_SCHEMA, GET_ISSUER_KEY)
+
+    @staticmethod
+    def keyForOp(op: Dict) -> Tuple[str, str, str]:
+        # The target is kept separately in the key so that all entries about
+        # an identifier can be invalidated
+        target = op.get(TARGET_NYM) or op.get(ORIGIN)
+        rest = {k: v for k, v in op.items() if k != TXN_TYPE}
+        return op[TXN_TYPE], target, json.dumps(rest, sort_keys=True)
+
+    def isCacheable(self, op: Dict) -> bool:
+        return op.get(TXN_TYPE) in self.cacheableTypes
+
+    def getReply(self, op: Dict):
+        if not self.isCacheable(op):
+            return None
+        return self.get(self.keyForOp(op))
+
+    def putReply(self, op: Dict, reply):
+        if self.isCacheable(op):
+            self.put(self.keyForOp(op), reply,
+                     expires=op[TXN_TYPE] not in self.immutableTypes)
+
+    def invalidateTarget(self, target: str) -> int:
+        """
+        Removes cached replies about `target` which can change on the ledger
+        """
+        return self.invalidateWhere(
+            lambda k: k[1] == target and k[0] not in self.immutableTypes)
@@ -1,8 +1,11 @@
+import asyncio
 import json
+import time
 import traceback
 import uuid
 from collections import deque
-from typing import Dict, Union, Tuple, Optional, Callable
+from functools import partial
+from typing import Dict, Union, Tuple, Optional, Callable, List
 
 import pyorient
 from base58 import b58decode, b58encode
@@ -14,7 +17,7 @@ from stp_core.common.log import getlogger
 from plenum.common.startable import Status
 
 from plenum.common.constants import REPLY, NAME, VERSION, REQACK, REQNACK, \
-    TXN_ID, TARGET_NYM, NONCE, STEWARD, OP_FIELD_NAME
+    REJECT, TXN_ID, TARGET_NYM, NONCE, STEWARD, OP_FIELD_NAME, BATCH
 from plenum.common.types import f
 from plenum.common.util import libnacl
 from plenum.persistence.orientdb_store import OrientDbStore
@@ -25,18 +28,27 @@ from stp_zmq.zstack import SimpleZStack
 
 from sovrin_common.constants import TXN_TYPE, ATTRIB, DATA, GET_NYM, ROLE, \
     NYM, GET_TXNS, LAST_TXN, TXNS, SCHEMA, ISSUER_KEY, SKEY, DISCLO,\
-    GET_ATTR, TRUST_ANCHOR
+    GET_ATTR, TRUST_ANCHOR, GET_SCHEMA, GET_ISSUER_KEY
 
+from sovrin_client.client.cache import LedgerReadCache
 from sovrin_client.persistence.client_req_rep_store_file import ClientReqRepStoreFile
 from sovrin_client.persistence.client_req_rep_store_orientdb import \
     ClientReqRepStoreOrientDB
+from sovrin_client.persistence.client_req_rep_store_sqlite import \
+    ClientReqRepStoreSqlite
 from sovrin_client.persistence.client_txn_log import ClientTxnLog
+from sovrin_client.persistence.retention import CompactionResult, \
+    RetentionPolicy
 from sovrin_common.config_util import getConfig
 from sovrin_common.persistence.identity_graph import getEdgeByTxnType, IdentityGraph
+from sovrin_common.types import Request
 from stp_core.types import HA
 
 logger = getlogger()
 
+# Types of requests which read from the ledger rather than write to it
+READ_TXN_TYPES = (GET_NYM, GET_ATTR, GET_SCHEMA, GET_ISSUER_KEY, GET_TXNS)
+
 
 class Client(PlenumClient):
     def __init__(self,
@@ -55,6 +67,21 @@ class Client(PlenumClient):
                          config,
                          sighex)
         self.graphStore = self.getGraphStore()
+        self.readCache = LedgerReadCache(
+            maxSize=getattr(self.config, 'ClientReadCacheSize', 1000),
+            ttl=getattr(self.config, 'ClientReadCacheTTL', 300))
+        # Which requests, with their acks, nacks and replies, are kept in the
+        # request/reply store, compacted every `reqRepCompactionInterval`
+        # seconds
+        self.reqRepRetention = RetentionPolicy.fromConfig(self.config)
+        self.reqRepCompactionInterval = getattr(
+            self.config, 'ClientReqRepCompactionInterval', 3600)
+        # Compaction done in prods reads or removes this many requests per
+        # prod, so a large store does not stall the event loop
+        self.reqRepCompactionSlice = getattr(
+            self.config, 'ClientReqRepCompactionSlice', 1000)
+        self._lastReqRepCompaction = time.time()
+        self._reqRepCompaction = None
         self.autoDiscloseAttributes = False
         self.requestedPendingTxns = False
         self.hasAnonCreds = bool(peerHA)
@@ -72,8 +99,23 @@ class Client(PlenumClient):
                                           msgHandler=self.handlePeerMessage)
             self.peerStack.sign = self.sign
             self.peerInbox = deque()
+        # Requests held back for up to `reqBatchWindow` seconds, or until
+        # `reqBatchSize` of them are held, to be sent together
+        self.reqBatchWindow = getattr(self.config, 'ClientReqBatchWindow', 0)
+        self.reqBatchSize = getattr(self.config, 'ClientReqBatchSize', 100)
+        self._reqBatch = []  # type: List[Request]
+        self._reqBatchStartedAt = None
+        # Pool the client is shared by agents in, which then starts, prods
+        # and stops it
+        self.clientPool = None
         self._observers = {}  # type Dict[str, Callable]
         self._observerSet = set()  # makes it easier to guard against duplicates
+        # futures waiting for consensus on a request, resolved with a
+        # `(reply, error)` tuple
+        self._replyFutures = {}  # type: Dict[Tuple[str, int], List[asyncio.Future]]
+        # Seconds after which a reply future not yet resolved is cancelled,
+        # so requests which never complete are not waited for forever
+        self.replyTimeout = getattr(self.config, 'ClientReplyTimeout', 300)
 
     @property
     def peerStackClass(self):
@@ -99,9 +141,17 @@ class Client(PlenumClient):
     def getReqRepStore(self):
         if self.config.ReqReplyStore == "orientdb":
             return ClientReqRepStoreOrientDB(self._getOrientDbStore())
+        elif self.config.ReqReplyStore == "sqlite":
+            return ClientReqRepStoreSqlite(self.name, self.basedirpath)
         else:
             return ClientReqRepStoreFile(self.name, self.basedirpath)
 
+    @property
+    def hasIndexedReqRepStore(self):
+        # These stores track consensus and confirmation per request themselves
+        return isinstance(self.reqRepStore, (ClientReqRepStoreOrientDB,
+                                             ClientReqRepStoreSqlite))
+
     def getGraphStore(self):
         return IdentityGraph(self._getOrientDbStore()) if \
             self.config.ClientIdentityGraph else None
@@ -109,8 +159,57 @@ class Client(PlenumClient):
     def getTxnLogStore(self):
         return ClientTxnLog(self.name, self.basedirpath)
 
+    def submitReqs(self, *reqs: Request) -> List[Request]:
+        """
+        Sends the requests to the nodes.
+
+        With a batch window, writes are held back and sent together, so that
+        the node stack ships them to each node as one batch message instead
+        of one message each. They are sent at the first `prod` after the
+        window has passed, or right away once `reqBatchSize` of them are
+        held, and when the client stops. Held back writes are returned as if
+        sent, but they reach the nodes and the request/reply store only when
+        sent. Reads are always sent right away, as their callers wait for
+        the replies.
+        """
+        if not self.reqBatchWindow:
+            return super().submitReqs(*reqs)
+        reads = [req for req in reqs if self._isRead(req)]
+        if reads:
+            super().submitReqs(*reads)
+        writes = [req for req in reqs if not self._isRead(req)]
+        if writes:
+            if not self._reqBatch:
+                self._reqBatchStartedAt = time.perf_counter()
+            self._reqBatch.extend(writes)
+            if len(self._reqBatch) >= self.reqBatchSize:
+                self.flushReqBatch()
+        return list(reqs)
+
+    @staticmethod
+    def _isRead(req: Request) -> bool:
+        return req.operation.get(TXN_TYPE) in READ_TXN_TYPES
+
+    def flushReqBatch(self) -> int:
+        """
+        Sends the requests held back, returns how many there were
+        """
+        if not self._reqBatch:
+            return 0
+        batch, self._reqBatch = self._reqBatch, []
+        self._reqBatchStartedAt = None
+        super().submitReqs(*batch)
+        return len(batch)
+
     def handleOneNodeMsg(self, wrappedMsg, excludeFromCli=None) -> None:
         msg, sender = wrappedMsg
+        if msg.get(OP_FIELD_NAME) == BATCH:
+            # Messages of a batch are handled as if they came one by one
+            for m in msg.get(f.MSGS.nm, []):
+                if isinstance(m, (str, bytes)):
+                    m = json.loads(m.decode() if isinstance(m, bytes) else m)
+                self.handleOneNodeMsg((m, sender), excludeFromCli)
+            return
         # excludeGetTxns = (msg.get(OP_FIELD_NAME) == REPLY and
         #                   msg[f.RESULT.nm].get(TXN_TYPE) == GET_TXNS)
         excludeReqAcks = msg.get(OP_FIELD_NAME) == REQACK
@@ -121,6 +220,9 @@ class Client(PlenumClient):
         super().handleOneNodeMsg(wrappedMsg, excludeFromCli)
         if OP_FIELD_NAME not in msg:
             logger.error("Op absent in message {}".format(msg))
+        elif msg[OP_FIELD_NAME] in (REQNACK, REJECT):
+            self._resolveIfRejected(msg.get(f.IDENTIFIER.nm),
+                                    msg.get(f.REQ_ID.nm))
 
     def postReplyRecvd(self, identifier, reqId, frm, result, numReplies):
         reply = super().postReplyRecvd(identifier, reqId, frm, result, numReplies)
@@ -136,8 +238,11 @@ class Client(PlenumClient):
                     # being shown on the cli since the clients would anyway
                     # collect enough replies from other nodes.
                     logger.debug("Observer threw an exception", exc_info=ex)
-            if isinstance(self.reqRepStore, ClientReqRepStoreOrientDB):
+            if self.hasIndexedReqRepStore:
                 self.reqRepStore.setConsensus(identifier, reqId)
+            if result[TXN_TYPE] in (NYM, ATTRIB) and result.get(TARGET_NYM):
+                # The identity or its attributes changed on the ledger
+                self.readCache.invalidateTarget(result[TARGET_NYM])
             if result[TXN_TYPE] == NYM:
                 if self.graphStore:
                     self.addNymToGraph(result)
@@ -172,15 +277,60 @@ class Client(PlenumClient):
                     self.graphStore.addIssuerKeyTxnToGraph(result)
                     # else:
                     #    logger.debug("Unknown type {}".format(result[TXN_TYPE]))
+            self._resolveReplyFutures(identifier, reqId, reply, None)
+        return reply
+
+    def getReplyFuture(self, identifier: str, reqId: int,
+                       timeout: Optional[float] = None) -> asyncio.Future:
+        """
+        Returns a future which is resolved with a `(reply, error)` tuple as
+        soon as f+1 matching replies or f+1 NACKs/REJECTs are received for the
+        request. The request must have been submitted already. The future is
+        cancelled if it is not resolved within `timeout` seconds, by default
+        `replyTimeout`.
+        """
+        loop = asyncio.get_event_loop()
+        fut = loop.create_future()
+        reply, err = self.replyIfConsensus(identifier, reqId)
+        if reply is not None or err:
+            fut.set_result((reply, err))
+            return fut
+        key = (identifier, reqId)
+        self._replyFutures.setdefault(key, []).append(fut)
+        fut.add_done_callback(partial(self._discardReplyFuture, key))
+        timeout = self.replyTimeout if timeout is None else timeout
+        if timeout:
+            expiry = loop.call_later(timeout, fut.cancel)
+            fut.add_done_callback(lambda _: expiry.cancel())
+        return fut
+
+    def _discardReplyFuture(self, key, fut):
+        futs = self._replyFutures.get(key)
+        if futs and fut in futs:
+            futs.remove(fut)
+            if not futs:
+                del self._replyFutures[key]
+
+    def _resolveReplyFutures(self, identifier, reqId, reply, error):
+        for fut in self._replyFutures.pop((identifier, reqId), []):
+            if not fut.done():
+                fut.set_result((reply, error))
+
+    def _resolveIfRejected(self, identifier, reqId):
+        if (identifier, reqId) not in self._replyFutures:
+            return
+        _, err = self.replyIfConsensus(identifier, reqId)
+        if err:
+            self._resolveReplyFutures(identifier, reqId, None, err)
 
     def requestConfirmed(self, identifier: str, reqId: int) -> bool:
-        if isinstance(self.reqRepStore, ClientReqRepStoreOrientDB):
+        if self.hasIndexedReqRepStore:
             return self.reqRepStore.requestConfirmed(identifier, reqId)
         else:
             return self.txnLog.hasTxnWithReqId(identifier, reqId)
 
     def hasConsensus(self, identifier: str, reqId: int) -> Optional[str]:
-        if isinstance(self.reqRepStore, ClientReqRepStoreOrientDB):
+        if self.hasIndexedReqRepStore:
             return self.reqRepStore.hasConsensus(identifier, reqId)
         else:
             return super().hasConsensus(identifier, reqId)
@@ -201,13 +351,14 @@ class Client(PlenumClient):
             txns = list(self.graphStore.getResultForTxnIds(txnId).values())
             return txns[0] if txns else {}
         else:
-            # TODO: Add support for fetching reply by transaction id
-            # serTxn = self.reqRepStore.getResultForTxnId(txnId)
-            pass
             # TODO Add merkleInfo as well
+            return self.txnLog.getTxnById(txnId) or {}
 
     def getTxnsByNym(self, nym: str):
-        raise NotImplementedError
+        if self.graphStore:
+            raise NotImplementedError
+        else:
+            return self.txnLog.getTxnsByNym(nym)
 
     def getTxnsByType(self, txnType):
         if self.graphStore:
@@ -265,8 +416,9 @@ class Client(PlenumClient):
         if self.graphStore:
             return self.graphStore.hasNym(nym)
         else:
-            for txn in self.txnLog.getTxnsByType(NYM):
-                if txn.get(TXN_TYPE) == NYM:
+            for txn in self.txnLog.getTxnsByNym(nym):
+                if txn.get(TXN_TYPE) == NYM or \
+                        (txn.get(TXN_TYPE) == GET_NYM and txn.get(DATA)):
                     return True
             return False
 
@@ -278,17 +430,74 @@ class Client(PlenumClient):
         if self.hasAnonCreds and self.status not in Status.going():
             self.peerStack.start()
 
+    def onStopping(self, *args, **kwargs):
+        # Writes still held back are sent rather than lost
+        if self.flushReqBatch():
+            self.nodestack.flushOutBoxes()
+        super().onStopping(*args, **kwargs)
+
+    def sendLedgerStatus(self, nodeName: str):
+        # Pooled clients other than the pool's catchup client are given the
+        # pool ledger by the pool instead of catching it up themselves
+        if self.clientPool and not self.clientPool.catchesUp(self):
+            return
+        super().sendLedgerStatus(nodeName)
+
+    def postPoolLedgerCaughtUp(self, *args, **kwargs):
+        super().postPoolLedgerCaughtUp(*args, **kwargs)
+        if self.clientPool:
+            self.clientPool.ledgerCaughtUp(self)
+
     async def prod(self, limit) -> int:
         # s = await self.nodestack.service(limit)
         # if self.isGoing():
         #     await self.nodestack.serviceLifecycle()
         # self.nodestack.flushOutBoxes()
+        if self._reqBatch and time.perf_counter() - \
+                self._reqBatchStartedAt >= self.reqBatchWindow:
+            # Sent to the nodes when the stack flushes during this prod
+            self.flushReqBatch()
         s = await super().prod(limit)
+        if self.hasIndexedReqRepStore:
+            # Write what the store buffered during this prod in one go
+            self.reqRepStore.flush()
+        if self._reqRepCompaction is not None:
+            self._continueReqRepCompaction()
+        elif self.reqRepRetention.isActive and time.time() - \
+                self._lastReqRepCompaction >= self.reqRepCompactionInterval:
+            self._lastReqRepCompaction = time.time()
+            self._reqRepCompaction = self.reqRepStore.compactInSlices(
+                self.reqRepRetention, isConfirmed=self.txnLog.hasTxnWithReqId,
+                sliceSize=self.reqRepCompactionSlice)
+            self._continueReqRepCompaction()
         if self.hasAnonCreds:
             return s + await self.peerStack.service(limit)
         else:
             return s
 
+    def compactReqRepStore(self) -> CompactionResult:
+        """
+        Removes requests the retention policy does not keep anymore from the
+        request/reply store
+        """
+        self._lastReqRepCompaction = time.time()
+        self._reqRepCompaction = None
+        result = self.reqRepStore.compact(
+            self.reqRepRetention, isConfirmed=self.txnLog.hasTxnWithReqId)
+        self._reqRepCompacted(result)
+        return result
+
+    def _continueReqRepCompaction(self):
+        try:
+            next(self._reqRepCompaction)
+        except StopIteration as ex:
+            self._reqRepCompaction = None
+            self._reqRepCompacted(ex.value)
+
+    def _reqRepCompacted(self, result: CompactionResult):
+        logger.info("{} removed {} requests taking {} bytes from its request "
+                    "store".format(self, result.entries, result.bytes))
+
     def registerObserver(self, observer: Callable, name=None):
         if not name:
             name = uuid.uuid4()
@@ -0,0 +1,146 @@
+from typing import List
+
+from ledger.util import F
+from plenum.common.constants import POOL_LEDGER_ID
+from plenum.common.motor import Motor
+from plenum.common.startable import Status
+from plenum.common.util import randomString
+from stp_core.common.log import getlogger
+from stp_core.network.port_dispenser import genHa
+
+from sovrin_client.client.client import Client
+from sovrin_client.client.reply_router import ReplyRouter
+from sovrin_client.client.wallet.wallet import Wallet
+from sovrin_common.config_util import getConfig
+
+logger = getlogger()
+
+
+class ClientPool(Motor):
+    """
+    A few clients connected to Sovrin shared by the agents of a process, so
+    the connections to the nodes and the catchups do not grow with the
+    number of agents. Agents are given the client with the fewest agents.
+
+    The pool owns its clients: it starts, prods and stops them, agents using
+    a pooled client leave that to the pool. Replies are given to the wallet
+    which prepared the request, found by the request's identifier and id,
+    instead of to the wallets of all the agents sharing the client.
+
+    Only the first client catches up the pool ledger from the nodes, the
+    others are given the transactions it caught up, so a pool catches up
+    once whatever its size.
+    """
+
+    def __init__(self, size: int = None, basedirpath: str = None,
+                 clientClass=Client, config=None):
+        Motor.__init__(self)
+        self.config = config or getConfig()
+        size = size or getattr(self.config, 'ClientPoolSize', 2)
+        assert size > 0
+        basedirpath = basedirpath or self.config.baseDir
+        self.clients = []  # type: List[Client]
+        for _ in range(size):
+            _, port = genHa()
+            client = clientClass(randomString(6), ha=("0.0.0.0", port),
+                                 basedirpath=basedirpath)
+            self._addClient(client)
+        # Number of agents using each client, by position in `clients`
+        self._agentCounts = [0] * size
+        self.replyRouter = ReplyRouter()
+        self.sharedCatchupTxns = 0
+
+    def _addClient(self, client: Client):
+        client.clientPool = self
+        client.registerObserver(self._routeReply, name="clientPool")
+        self.clients.append(client)
+
+    # Agents
+
+    def assign(self) -> Client:
+        """
+        Returns the client used by the fewest agents, for a new agent
+        """
+        i = self._agentCounts.index(min(self._agentCounts))
+        self._agentCounts[i] += 1
+        return self.clients[i]
+
+    def release(self, client: Client):
+        i = self.clients.index(client)
+        self._agentCounts[i] = max(self._agentCounts[i] - 1, 0)
+
+    def registerWallet(self, wallet: Wallet):
+        self.replyRouter.add(wallet)
+
+    def deregisterWallet(self, wallet: Wallet):
+        self.replyRouter.remove(wallet)
+
+    def _routeReply(self, observer_name, reqId, frm, result, numReplies):
+        self.replyRouter.route(observer_name, reqId, frm, result, numReplies)
+
+    # Catchup
+
+    @property
+    def catchupClient(self) -> Client:
+        """
+        The client catching up the pool ledger for all the pooled clients
+        """
+        return self.clients[0]
+
+    def catchesUp(self, client: Client) -> bool:
+        return client is self.catchupClient
+
+    def ledgerCaughtUp(self, client: Client):
+        """
+        Adds the pool ledger transactions the catchup client has and the
+        other clients lack to their ledgers, as their own catchup would
+        """
+        if not self.catchesUp(client):
+            return
+        for other in self.clients[1:]:
+            for seqNo, txn in client.ledger.getAllTxn(other.ledger.size + 1):
+                other.ledger.add(txn)
+                txn[F.seqNo.name] = seqNo
+                other.postTxnFromCatchupAddedToLedger(POOL_LEDGER_ID, txn)
+                self.sharedCatchupTxns += 1
+            other.postPoolLedgerCaughtUp()
+
+    @property
+    def stats(self):
+        return {
+            "clients": len(self.clients),
+            "agents": sum(self._agentCounts),
+            "wallets": len(self.replyRouter),
+            "unroutedReplies": self.replyRouter.unrouted,
+            "sharedCatchupTxns": self.sharedCatchupTxns
+        }
+
+    # Lifecycle
+
+    def start(self, loop):
+        super().start(loop)
+        for client in self.clients:
+            client.start(loop)
+
+    async def prod(self, limit) -> int:
+        c = 0
+        if self.get_status() == Status.starting:
+            self.status = Status.started
+            c += 1
+        for client in self.clients:
+            c += await client.prod(limit)
+        return c
+
+    def stop(self, *args, **kwargs):
+        super().stop(*args, **kwargs)
+        for client in self.clients:
+            client.stop()
+
+    def _statusChanged(self, old, new):
+        pass
+
+    def onStopping(self, *args, **kwargs):
+        pass
+
+    def __repr__(self):
+        return "ClientPool({})".format(", ".join(c.name for c in self.clients))
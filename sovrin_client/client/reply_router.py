@@ -0,0 +1,86 @@
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from plenum.common.constants import IDENTIFIER
+from stp_core.common.log import getlogger
+
+from sovrin_client.client.wallet.wallet import Wallet
+
+logger = getlogger()
+
+
+class ReplyRouter:
+    """
+    Gives each reply a client shared by many wallets gets to the wallet
+    which prepared the request, found by the request's identifier and id,
+    instead of giving every reply to every wallet.
+    """
+
+    def __init__(self):
+        # identifier -> wallets having it
+        self._walletsById = {}  # type: Dict[str, List[Wallet]]
+        # identifiers indexed for each wallet, by id of the wallet
+        self._indexedIds = {}  # type: Dict[int, Set[str]]
+        # observers of the requests each wallet added prepares, by id of
+        # the wallet
+        self._observers = {}  # type: Dict[int, Callable]
+        self.unrouted = 0
+
+    def __len__(self):
+        return len(self._observers)
+
+    def add(self, wallet: Wallet):
+        if id(wallet) not in self._observers:
+            for identifier in wallet.idsToSigners:
+                self._index(wallet, identifier)
+            # Requests are signed by identifiers the wallet may add later
+            observer = partial(self._indexPrepared, wallet)
+            wallet.registerPreparedObserver(observer)
+            self._observers[id(wallet)] = observer
+
+    def remove(self, wallet: Wallet):
+        observer = self._observers.pop(id(wallet), None)
+        if observer is None:
+            return
+        wallet.deregisterPreparedObserver(observer)
+        for identifier in self._indexedIds.pop(id(wallet), ()):
+            wallets = self._walletsById[identifier]
+            wallets.remove(wallet)
+            if not wallets:
+                del self._walletsById[identifier]
+
+    def _index(self, wallet: Wallet, identifier: str):
+        indexed = self._indexedIds.setdefault(id(wallet), set())
+        if identifier not in indexed:
+            indexed.add(identifier)
+            self._walletsById.setdefault(identifier, []).append(wallet)
+
+    def _indexPrepared(self, wallet: Wallet, key: Tuple):
+        identifier, _ = key
+        self._index(wallet, identifier)
+
+    def walletFor(self, identifier, reqId) -> Optional[Wallet]:
+        """
+        Returns the wallet which prepared the request `reqId` of
+        `identifier`
+        """
+        for wallet in self._walletsById.get(identifier, ()):
+            if wallet.hasPrepared((identifier, reqId)):
+                return wallet
+
+    def route(self, observer_name, reqId, frm, result, numReplies) \
+            -> Optional[Wallet]:
+        """
+        Gives a reply to the wallet which prepared its request, returns that
+        wallet or None if no wallet did
+        """
+        identifier = result.get(IDENTIFIER)
+        wallet = self.walletFor(identifier, reqId)
+        if wallet is None:
+            self.unrouted += 1
+            logger.debug("found no wallet for reply to {}".
+                         format((identifier, reqId)))
+            return None
+        wallet.handleIncomingReply(observer_name, reqId, frm, result,
+                                   numReplies)
+        return wallet
@@ -1,4 +1,5 @@
-from typing import List
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
 
 from plenum.common.constants import NAME, NONCE
 from plenum.common.types import f
@@ -42,6 +43,9 @@ class constant:
 
 
 class Link:
+    # attributes by which the wallet looks up links, see `LinkIndex`
+    indexedAttrs = ('invitationNonce', 'remoteIdentifier', 'internalId')
+
     def __init__(self,
                  name,
                  localIdentifier=None,
@@ -79,6 +83,21 @@ class Link:
     def __repr__(self):
         return self.key
 
+    def __setattr__(self, name, value):
+        index = self.__dict__.get('_index')
+        if index is not None and name in self.indexedAttrs:
+            index.update(self, name, self.__dict__.get(name), value)
+        super().__setattr__(name, value)
+
+    def __getstate__(self):
+        # The index belongs to the wallet and is rebuilt after restoring it
+        state = self.__dict__.copy()
+        state.pop('_index', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
     @property
     def key(self):
         return self.name
@@ -204,3 +223,75 @@ class Link:
         v = DidVerifier(verkey=self.targetVerkey,
                         identifier=self.remoteIdentifier)
         return v.verkey
+
+
+class LinkIndex:
+    """
+    Hash indexes of a wallet's links on `Link.indexedAttrs`. Indexed links
+    update the index themselves whenever one of those attributes is set.
+    Observers are told of every link and value indexed.
+    """
+
+    def __init__(self):
+        # attribute name -> attribute value -> links having that value
+        self._byAttr = {attr: {} for attr in Link.indexedAttrs}  # type: Dict[str, Dict[Any, OrderedDict]]
+        self._observers = []  # type: List[Callable[[Link, str, Any], None]]
+        # set when restored from a persisted wallet, since the index is not
+        # persisted it has to be rebuilt
+        self.stale = False
+
+    def __getstate__(self):
+        return {'stale': True}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.stale = True
+
+    def registerObserver(self, observer: Callable[[Link, str, Any], None]):
+        if observer not in self._observers:
+            self._observers.append(observer)
+
+    def deregisterObserver(self, observer: Callable[[Link, str, Any], None]):
+        if observer in self._observers:
+            self._observers.remove(observer)
+
+    def add(self, link: Link):
+        link.__dict__['_index'] = self
+        for attr in Link.indexedAttrs:
+            self._add(attr, getattr(link, attr, None), link)
+
+    def remove(self, link: Link):
+        for attr in Link.indexedAttrs:
+            self._remove(attr, getattr(link, attr, None), link)
+        link.__dict__.pop('_index', None)
+
+    def update(self, link: Link, attr, oldValue, newValue):
+        self._remove(attr, oldValue, link)
+        self._add(attr, newValue, link)
+
+    def get(self, attr, value) -> List[Link]:
+        try:
+            return list(self._byAttr[attr].get(value, {}).values())
+        except TypeError:
+            # unhashable values are never indexed
+            return []
+
+    def _add(self, attr, value, link):
+        try:
+            self._byAttr[attr].setdefault(value, OrderedDict())[id(link)] = \
+                link
+        except TypeError:
+            return
+        if value is not None:
+            for observer in self._observers:
+                observer(link, attr, value)
+
+    def _remove(self, attr, value, link):
+        try:
+            links = self._byAttr[attr].get(value)
+        except TypeError:
+            return
+        if links:
+            links.pop(id(link), None)
+            if not links:
+                del self._byAttr[attr][value]
@@ -14,6 +14,8 @@ class ProofRequest:
         self.verifiableAttributes = verifiableAttributes
         self.fulfilledByClaims = []
         self.selfAttestedAttrs = {}
+        # Whether a proof was sent for the request
+        self.answered = False
         # TODO _F_ need to add support for predicates on unrevealed attibutes
 
     @property
@@ -1,9 +1,10 @@
 import datetime
 import json
 import operator
+import time
 from collections import OrderedDict
 from collections import deque
-from typing import Dict, List
+from typing import Callable, Dict, List, Tuple
 from typing import Optional
 
 from ledger.util import F
@@ -14,8 +15,9 @@ from plenum.common.constants import TXN_TYPE, TARGET_NYM, DATA, \
     IDENTIFIER, NYM, ROLE, VERKEY, NODE
 from plenum.common.types import f
 
+from sovrin_client.client.cache import LRUCache
 from sovrin_client.client.wallet.attribute import Attribute, AttributeKey
-from sovrin_client.client.wallet.link import Link
+from sovrin_client.client.wallet.link import Link, LinkIndex
 from sovrin_client.client.wallet.node import Node
 from sovrin_client.client.wallet.trustAnchoring import TrustAnchoring
 from sovrin_client.client.wallet.upgrade import Upgrade
@@ -35,6 +37,10 @@ logger = getlogger()
 class Wallet(PWallet, TrustAnchoring):
     clientNotPresentMsg = "The wallet does not have a client associated with it"
 
+    # Bounds for prepared requests that never get a reply
+    maxPrepared = 10000
+    preparedTTL = 24 * 60 * 60
+
     def __init__(self,
                  name: str,
                  supportedDidMethods: DidMethods=None):
@@ -51,6 +57,7 @@ class Wallet(PWallet, TrustAnchoring):
 
         self._links = OrderedDict()  # type: Dict[str, Link]
         # Note, ordered dict to make iteration deterministic
+        self._linkIndex = LinkIndex()
 
         self.knownIds = {}  # type: Dict[str, Identifier]
 
@@ -58,8 +65,9 @@ class Wallet(PWallet, TrustAnchoring):
         self._pending = deque()  # type Tuple[Request, Tuple[str, Identifier,
         #  Optional[Identifier]]
 
-        # pending transactions that have been prepared (probably submitted)
-        self._prepared = {}  # type: Dict[(Identifier, int), Request]
+        # pending transactions that have been prepared (probably submitted),
+        # removed once their reply is handled
+        self._prepared = self._newPrepared()  # type: LRUCache
         self.lastKnownSeqs = {}  # type: Dict[str, int]
 
         self.replyHandler = {
@@ -76,6 +84,16 @@ class Wallet(PWallet, TrustAnchoring):
     def pendingCount(self):
         return len(self._pending)
 
+    @property
+    def preparedCount(self):
+        return len(self._getPrepared())
+
+    def __getstate__(self):
+        # Observers belong to the running process, they are not persisted
+        state = self.__dict__.copy()
+        state.pop('_preparedObservers', None)
+        return state
+
     @staticmethod
     def _isMatchingName(needle, haystack):
         return needle.lower() in haystack.lower()
@@ -172,7 +190,34 @@ class Wallet(PWallet, TrustAnchoring):
         return [a for a in self._attributes.values() if a.dest == idr]
 
     def addLink(self, link: Link):
+        index = self._getLinkIndex()
+        existing = self._links.get(link.key)
+        if existing is not None:
+            index.remove(existing)
         self._links[link.key] = link
+        index.add(link)
+
+    def _getLinkIndex(self) -> LinkIndex:
+        # Wallets persisted before links were indexed do not have an index,
+        # restored ones have an empty one
+        index = self.__dict__.get('_linkIndex')
+        if index is None or index.stale:
+            index = LinkIndex()
+            for link in self._links.values():
+                index.add(link)
+            self._linkIndex = index
+        return index
+
+    def registerLinkObserver(self, observer):
+        """
+        Calls `observer` with a link, the name of one of
+        `Link.indexedAttrs` and its value whenever a link is added or that
+        attribute of a link is set
+        """
+        self._getLinkIndex().registerObserver(observer)
+
+    def deregisterLinkObserver(self, observer):
+        self._getLinkIndex().deregisterObserver(observer)
 
     def getLink(self, name, required=False) -> Link:
         l = self._links.get(name)
@@ -210,13 +255,61 @@ class Wallet(PWallet, TrustAnchoring):
         for req in pendingTxnsReqs:
             self.pendRequest(req)
 
+    def _newPrepared(self):
+        # Wall clock time since the wallet is persisted
+        return LRUCache(maxSize=self.maxPrepared, ttl=self.preparedTTL,
+                        clock=time.time)
+
+    def _getPrepared(self) -> LRUCache:
+        # Wallets persisted before prepared requests were bounded have them
+        # in a dict
+        if not isinstance(self._prepared, LRUCache):
+            prepared = self._newPrepared()
+            for k, v in self._prepared.items():
+                prepared.put(k, v)
+            self._prepared = prepared
+        return self._prepared
+
+    def _getPreparedObservers(self) -> List[Callable[[Tuple], None]]:
+        # Restored wallets have no observers
+        return self.__dict__.setdefault('_preparedObservers', [])
+
+    def registerPreparedObserver(self, observer: Callable[[Tuple], None]):
+        """
+        Calls `observer` with the identifier and id of every request the
+        wallet prepares
+        """
+        observers = self._getPreparedObservers()
+        if observer not in observers:
+            observers.append(observer)
+
+    def deregisterPreparedObserver(self, observer: Callable[[Tuple], None]):
+        observers = self._getPreparedObservers()
+        if observer in observers:
+            observers.remove(observer)
+
+    def hasPrepared(self, key: Tuple) -> bool:
+        """
+        Whether the request with the identifier and id `key` was prepared
+        and its reply not handled yet
+        """
+        return key in self._getPrepared()
+
     def preparePending(self):
         new = {}
         while self._pending:
             req, key = self._pending.pop()
             sreq = self.signRequest(req)
             new[req.identifier, req.reqId] = sreq, key
-        self._prepared.update(new)
+        prepared = self._getPrepared()
+        if len(prepared) + len(new) > prepared.maxSize:
+            # Make room by dropping expired requests before evicting live ones
+            prepared.removeExpired()
+        for k, v in new.items():
+            prepared.put(k, v)
+        for observer in self._getPreparedObservers():
+            for k in new:
+                observer(k)
         # Return request in the order they were submitted
         return sorted([req for req, _ in new.values()],
                       key=operator.attrgetter("reqId"))
@@ -228,15 +321,21 @@ class Wallet(PWallet, TrustAnchoring):
         replies
         :return:
         """
-        preparedReq = self._prepared.get((result[IDENTIFIER], reqId))
+        prepared = self._getPrepared()
+        key = (result[IDENTIFIER], reqId)
+        preparedReq = prepared.get(key)
         if not preparedReq:
             raise RuntimeError('no matching prepared value for {},{}'.
                                format(result[IDENTIFIER], reqId))
         typ = result.get(TXN_TYPE)
-        if typ and typ in self.replyHandler:
-            self.replyHandler[typ](result, preparedReq)
-            # else:
-            #    raise NotImplementedError('No handler for {}'.format(typ))
+        try:
+            if typ and typ in self.replyHandler:
+                self.replyHandler[typ](result, preparedReq)
+                # else:
+                #    raise NotImplementedError('No handler for {}'.format(typ))
+        finally:
+            # The client notifies observers once per request
+            prepared.pop(key)
 
     def _attribReply(self, result, preparedReq):
         _, attrKey = preparedReq
@@ -295,9 +394,9 @@ class Wallet(PWallet, TrustAnchoring):
         self._pending.appendleft((req, key))
 
     def getLinkInvitationByTarget(self, target: str) -> Link:
-        for k, li in self._links.items():
-            if li.remoteIdentifier == target:
-                return li
+        links = self._getLinkIndex().get('remoteIdentifier', target)
+        if links:
+            return links[0]
 
     def getLinkInvitation(self, name: str):
         return self._links.get(name)
@@ -334,14 +433,14 @@ class Wallet(PWallet, TrustAnchoring):
         return self.preparePending()[0]
 
     def getLinkByNonce(self, nonce, identifier=None) -> Optional[Link]:
-        for _, li in self._links.items():
-            if li.invitationNonce == nonce and (not identifier or li.remoteIdentifier == identifier):
+        for li in self._getLinkIndex().get('invitationNonce', nonce):
+            if not identifier or li.remoteIdentifier == identifier:
                 return li
 
     def getLinkByInternalId(self, internalId) -> Optional[Link]:
-        for _, li in self._links.items():
-            if li.internalId == internalId:
-                return li
+        links = self._getLinkIndex().get('internalId', internalId)
+        if links:
+            return links[0]
 
     def getIdentity(self, idr):
         # TODO, Question: Should it consider self owned identities too or
@@ -350,3 +449,6 @@ class Wallet(PWallet, TrustAnchoring):
 
     def getLinkNames(self):
         return list(self._links.keys())
+
+    def getLinks(self) -> List[Link]:
+        return list(self._links.values())
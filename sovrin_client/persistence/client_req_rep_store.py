@@ -1,8 +1,13 @@
+import time
 from abc import abstractmethod
+from typing import Callable, Generator, Iterable, Optional, Set, Tuple
 
 from plenum.persistence.client_req_rep_store import ClientReqRepStore as \
     PClientReqRepStore
 
+from sovrin_client.persistence.retention import CompactionResult, \
+    RetentionEntry, RetentionPolicy
+
 
 class ClientReqRepStore(PClientReqRepStore):
     @abstractmethod
@@ -16,3 +21,53 @@ class ClientReqRepStore(PClientReqRepStore):
     @abstractmethod
     def getLastTxnForIdentifier(self, identifier):
         pass
+
+    @abstractmethod
+    def retentionEntries(self) -> Iterable[RetentionEntry]:
+        pass
+
+    @abstractmethod
+    def removeRequests(self, keys: Set[Tuple[str, int]]):
+        pass
+
+    def compact(self, policy: RetentionPolicy,
+                isConfirmed: Callable[[str, int], bool]=None,
+                now: Optional[float]=None) -> CompactionResult:
+        """
+        Removes the requests, with their acks, nacks and replies, which
+        `policy` does not retain anymore.
+
+        :param isConfirmed: tells whether a request got consensus when the
+        store does not know it
+        """
+        steps = self.compactInSlices(policy, isConfirmed, now)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as ex:
+                return ex.value
+
+    def compactInSlices(self, policy: RetentionPolicy,
+                        isConfirmed: Callable[[str, int], bool]=None,
+                        now: Optional[float]=None, sliceSize: int=1000) \
+            -> Generator[None, None, CompactionResult]:
+        """
+        Same as `compact` but as a generator which yields after reading or
+        removing every `sliceSize` requests, so a caller can compact a large
+        store a slice at a time. Returns the CompactionResult when exhausted.
+        """
+        now = time.time() if now is None else now
+        entries = {}
+        for e in self.retentionEntries():
+            if e.confirmed is None and isConfirmed and \
+                    policy.consensusGrace is not None:
+                e = e._replace(confirmed=isConfirmed(e.identifier, e.reqId))
+            entries[(e.identifier, e.reqId)] = e
+            if len(entries) % sliceSize == 0:
+                yield
+        drop = list(policy.select(entries.values(), now))
+        for i in range(0, len(drop), sliceSize):
+            self.removeRequests(set(drop[i:i + sliceSize]))
+            yield
+        return CompactionResult(len(drop),
+                                sum(entries[k].size for k in drop))
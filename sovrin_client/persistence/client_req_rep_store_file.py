@@ -4,37 +4,76 @@ import os
 from plenum.common.util import updateFieldsWithSeqNo
 from plenum.persistence.client_req_rep_store_file import ClientReqRepStoreFile \
     as PClientReqRepStoreFile
+from stp_core.common.log import getlogger
 
+from sovrin_client.persistence.client_req_rep_store import ClientReqRepStore
+from sovrin_client.persistence.record_log import RecordLog
+from sovrin_client.persistence.retention import RetentionEntry
 from sovrin_common.txn_util import getTxnOrderedFields
 
+logger = getlogger()
 
-class ClientReqRepStoreFile(PClientReqRepStoreFile):
+
+class ClientReqRepStoreFile(PClientReqRepStoreFile, ClientReqRepStore):
     def __init__(self, name, baseDir):
         super().__init__(name, baseDir)
+        # Name of the file the last transactions used to be rewritten to as
+        # a whole JSON object, it is migrated to `lastTxns` on start
         self.lastTxnsFileName = "last_txn_for_id"
+        self.lastTxns = RecordLog(self.dataLocation, "last_txn_for_id_log")
+        self._migrateLastTxns()
 
     @property
     def txnFieldOrdering(self):
         fields = getTxnOrderedFields()
         return updateFieldsWithSeqNo(fields)
 
-    def setLastTxnForIdentifier(self, identifier, value: str):
+    def _migrateLastTxns(self):
         filePath = os.path.join(self.dataLocation, self.lastTxnsFileName)
         if not os.path.exists(filePath):
-            open(filePath, 'w').close()
-        with open(filePath, "r+") as f:
+            return
+        with open(filePath, "r") as f:
             data = f.read().strip()
-            data = json.loads(data) if data else {}
-            data[identifier] = value
-            f.seek(0)
-            f.write(json.dumps(data))
+        try:
+            # The old format was overwritten in place without truncating so
+            # there can be leftovers of an earlier, longer object at the end
+            data = json.JSONDecoder().raw_decode(data)[0] if data else {}
+        except ValueError as ex:
+            logger.warning("Could not migrate last transactions from {}: {}".
+                           format(filePath, ex))
+            return
+        for identifier, value in data.items():
+            if identifier not in self.lastTxns:
+                self.lastTxns.put(identifier, value)
+        self.lastTxns.flush()
+        os.remove(filePath)
+
+    def retentionEntries(self):
+        # Every request is kept in a file named by the request's identifier
+        # and id run together, which cannot be split back, so requests are
+        # taken from their lines in the files. Keys running together to the
+        # same name share a file.
+        prefix = "{}{}".format(self.linePrefixes.Request, self.delimiter)
+        for entry in os.scandir(self.reqStore.dbPath):
+            stat = entry.stat()
+            with open(entry.path) as f:
+                for line in f:
+                    if line.startswith(prefix):
+                        req = self.deserializeReq(line[len(prefix):])
+                        yield RetentionEntry(req.identifier, req.reqId,
+                                             stat.st_mtime, None,
+                                             stat.st_size)
+
+    def removeRequests(self, keys):
+        for identifier, reqId in keys:
+            try:
+                os.remove(self.reqStore.keyFilePath("{}{}".format(identifier,
+                                                                  reqId)))
+            except FileNotFoundError:
+                pass
+
+    def setLastTxnForIdentifier(self, identifier, value: str):
+        self.lastTxns.put(identifier, value)
 
     def getLastTxnForIdentifier(self, identifier):
-        try:
-            with open(os.path.join(self.dataLocation, self.lastTxnsFileName),
-                      "r") as f:
-                data = f.read().strip()
-                data = json.loads(data) if data else {}
-                return data.get(identifier)
-        except FileNotFoundError:
-            return None
+        return self.lastTxns.get(identifier)
@@ -1,4 +1,7 @@
-from typing import Any, Sequence, List
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Sequence, List, Dict, Tuple
 
 from plenum.common.constants import TXN_ID
 from plenum.common.constants import TXN_TYPE, TXN_TIME
@@ -9,7 +12,9 @@ from plenum.persistence.orientdb_store import OrientDbStore
 
 from sovrin_common.txn_util import getTxnOrderedFields
 from sovrin_common.types import Request
+from sovrin_client.client.cache import LRUCache
 from sovrin_client.persistence.client_req_rep_store import ClientReqRepStore
+from sovrin_client.persistence.retention import RetentionEntry
 
 REQ_DATA = "ReqData"
 """
@@ -23,8 +28,23 @@ LAST_TXN_DATA = "LastTxnData"
 
 
 class ClientReqRepStoreOrientDB(ClientReqRepStore):
-    def __init__(self, store: OrientDbStore):
+    """
+    Acks, nacks, replies and consensus flags are buffered per request and
+    written together in one batch script when `batchSize` of them are
+    buffered, when the client flushes the store once per prod, or before a
+    read.
+    """
+
+    def __init__(self, store: OrientDbStore, batchSize=100,
+                 replySendersCacheSize=1000):
         self.store = store
+        self.batchSize = batchSize
+        self._pending = OrderedDict()  # type: Dict[Tuple[str, int], Dict]
+        self._numPending = 0
+        # Senders of replies to requests awaiting consensus, so the number of
+        # replies is known without a round trip. Bounded since some requests
+        # never reach consensus, evicted senders are read again if needed
+        self._replySenders = LRUCache(replySendersCacheSize)
         self.bootstrap()
 
     @property
@@ -61,83 +81,151 @@ class ClientReqRepStoreOrientDB(ClientReqRepStore):
             "acks": "embeddedset string",
             "nacks": "embeddedmap string",
             "replies": "embeddedmap string",
-            "hasConsensus": "boolean"
+            "hasConsensus": "boolean",
+            "created": "long"
         })
         self.store.createIndexOnClass(REQ_DATA, "hasConsensus")
 
+    @staticmethod
+    def _literal(value) -> str:
+        # pyorient's commands cannot bind parameters, so values are embedded
+        # as JSON string literals which OrientDB's parser reads back as is
+        return json.dumps(str(value), ensure_ascii=False)
+
+    def _where(self, identifier, reqId) -> str:
+        return "{} = {} and {} = {}".format(f.IDENTIFIER.nm,
+                                            self._literal(identifier),
+                                            f.REQ_ID.nm, int(reqId))
+
+    def _pendingFor(self, identifier, reqId) -> Dict:
+        key = (identifier, reqId)
+        if key not in self._pending:
+            self._pending[key] = {
+                "insert": None,
+                "acks": [],
+                "nacks": {},
+                "replies": {},
+                "txn": None,
+                "hasConsensus": None
+            }
+        return self._pending[key]
+
+    def _buffered(self):
+        self._numPending += 1
+        if self._numPending >= self.batchSize:
+            self.flush()
+
+    def _statementsFor(self, identifier, reqId, pending) -> List[str]:
+        where = self._where(identifier, reqId)
+        stmts = []
+        if pending["insert"]:
+            stmts.append("insert into {} set {} = {}, {} = {}, {} = {}, "
+                         "created = {}, nacks = {{}}, replies = {{}}".
+                         format(REQ_DATA, f.REQ_ID.nm, int(reqId),
+                                f.IDENTIFIER.nm, self._literal(identifier),
+                                TXN_TYPE, self._literal(pending["insert"]),
+                                int(time.time())))
+        for sender in pending["acks"]:
+            stmts.append("update {} add acks = {} where {}".
+                         format(REQ_DATA, self._literal(sender), where))
+        sets = ["nacks.{} = {}".format(sender, self._literal(reason))
+                for sender, reason in pending["nacks"].items()]
+        sets.extend("replies.{} = {}".format(sender, self._literal(txn))
+                    for sender, txn in pending["replies"].items())
+        if pending["txn"]:
+            txnId, txnTime, txnType = pending["txn"]
+            sets.append("{} = {}, {} = {}, {} = {}".
+                        format(TXN_ID, self._literal(txnId), TXN_TIME,
+                               "null" if txnTime is None else int(txnTime),
+                               TXN_TYPE, self._literal(txnType)))
+        if pending["hasConsensus"] is not None:
+            sets.append("hasConsensus = {}".format(pending["hasConsensus"]))
+        if sets:
+            stmts.append("update {} set {} where {}".
+                         format(REQ_DATA, ", ".join(sets), where))
+        return stmts
+
+    def flush(self):
+        """
+        Writes all buffered acks, nacks, replies and consensus flags in a
+        single batch script
+        """
+        if not self._pending:
+            return
+        stmts = []
+        for (identifier, reqId), pending in self._pending.items():
+            stmts.extend(self._statementsFor(identifier, reqId, pending))
+        self._pending.clear()
+        self._numPending = 0
+        if stmts:
+            self.store.client.batch("begin;\n{};\ncommit;".
+                                    format(";\n".join(stmts)))
+
+    def _command(self, cmd):
+        # Reads must see the buffered writes
+        self.flush()
+        return self.store.client.command(cmd)
+
     @property
     def lastReqId(self):
-        result = self.store.client.command("select max({}) as lastId from {}".
-                                           format(f.REQ_ID.nm, REQ_DATA))
+        result = self._command("select max({}) as lastId from {}".
+                               format(f.REQ_ID.nm, REQ_DATA))
         return 0 if not result else result[0].oRecordData['lastId']
 
     def addRequest(self, req: Request):
-        self.store.client.command(
-            "insert into {} set {} = {}, {} = '{}',{} = '{}', "
-            "nacks = {{}}, replies = {{}}".
-            format(REQ_DATA, f.REQ_ID.nm, req.reqId,
-                   f.IDENTIFIER.nm, req.identifier,
-                   TXN_TYPE, req.operation[TXN_TYPE]))
+        self._pendingFor(req.identifier, req.reqId)["insert"] = \
+            req.operation[TXN_TYPE]
+        self._replySenders.put((req.identifier, req.reqId), set())
+        self._buffered()
 
     def addAck(self, msg: Any, sender: str):
         identifier = msg[f.IDENTIFIER.nm]
         reqId = msg[f.REQ_ID.nm]
-        self.store.client.command(
-            "update {} add acks = '{}' where {} = '{}' and {} = {}".
-            format(REQ_DATA, sender, f.IDENTIFIER.nm, identifier, f.REQ_ID.nm,
-                   reqId))
+        self._pendingFor(identifier, reqId)["acks"].append(sender)
+        self._buffered()
 
     def addNack(self, msg: Any, sender: str):
         identifier = msg[f.IDENTIFIER.nm]
         reqId = msg[f.REQ_ID.nm]
-        reason = msg[f.REASON.nm]
-        reason = reason.replace('"', '\\"').replace("'", "\\'")
-        self.store.client.command(
-            "update {} set nacks.{} = '{}' where {} = '{}' and {} = {}".
-            format(REQ_DATA, sender, reason, f.IDENTIFIER.nm, identifier,
-                   f.REQ_ID.nm,
-                   reqId))
+        self._pendingFor(identifier, reqId)["nacks"][sender] = \
+            msg[f.REASON.nm]
+        self._buffered()
 
     def addReply(self, identifier: str, reqId: int, sender: str, result: Any) -> \
             Sequence[str]:
-        txnId = result[TXN_ID]
-        txnTime = result.get(TXN_TIME)
-        serializedTxn = self.txnSerializer.serialize(result, toBytes=False)
-        serializedTxn = serializedTxn.replace('"', '\\"').replace("'", "\\'")
-        res = self.store.client.command(
-            "update {} set replies.{} = '{}' return "
-            "after @this.replies where {} = '{}' and {} = {}".
-            format(REQ_DATA, sender, serializedTxn, f.IDENTIFIER.nm, identifier,
-                   f.REQ_ID.nm, reqId))
-        replies = res[0].oRecordData['value']
+        key = (identifier, reqId)
+        senders = self._replySenders.get(key)
+        if senders is None:
+            # Request sent before a restart or evicted from the cache
+            senders = set(self.getReplies(identifier, reqId))
+            self._replySenders.put(key, senders)
+        pending = self._pendingFor(identifier, reqId)
+        pending["replies"][sender] = self.txnSerializer.serialize(
+            result, toBytes=False)
         # TODO: Set txnId txnTime, txnType only when got same f+1 replies
-        if len(replies) == 1:
-            self.store.client.command(
-                "update {} set {} = '{}', {} = {}, {} = '{}' "
-                "where {} = '{}' and {} = {}".
-                format(REQ_DATA, TXN_ID, txnId, TXN_TIME,
-                       txnTime, TXN_TYPE, result[TXN_TYPE],
-                       f.IDENTIFIER.nm, identifier,
-                       f.REQ_ID.nm, reqId))
-        return len(replies)
+        if not senders:
+            pending["txn"] = (result[TXN_ID], result.get(TXN_TIME),
+                              result[TXN_TYPE])
+        senders.add(sender)
+        self._buffered()
+        return len(senders)
 
     def requestConfirmed(self, identifier, reqId):
-        result = self.store.client.command(
-            "select {} from {} where {} = '{}' and {} = {}".
-            format(TXN_ID, REQ_DATA, f.IDENTIFIER.nm, identifier, f.REQ_ID.nm,
-                   reqId))
+        result = self._command(
+            "select {} from {} where {}".
+            format(TXN_ID, REQ_DATA, self._where(identifier, reqId)))
         return bool(result[0].oRecordData.get(TXN_ID) if result else False)
 
     def hasRequest(self, identifier: str, reqId: int):
-        result = self.store.client.command(
-            "select from {} where {} = '{}' and {} = {}".
-            format(REQ_DATA, f.IDENTIFIER.nm, identifier, f.REQ_ID.nm, reqId))
+        result = self._command(
+            "select from {} where {}".
+            format(REQ_DATA, self._where(identifier, reqId)))
         return bool(result)
 
     def getReplies(self, identifier: str, reqId: int):
-        result = self.store.client.command(
-            "select replies from {} where {} = '{}' and {} = {}".
-            format(REQ_DATA, f.IDENTIFIER.nm, identifier, f.REQ_ID.nm, reqId))
+        result = self._command(
+            "select replies from {} where {}".
+            format(REQ_DATA, self._where(identifier, reqId)))
         if not result:
             return {}
         else:
@@ -147,31 +235,30 @@ class ClientReqRepStoreOrientDB(ClientReqRepStore):
                 }
 
     def getAcks(self, identifier: str, reqId: int) -> List[str]:
-        result = self.store.client.command(
-            "select acks from {} where {} = '{}' and {} = {}".
-            format(REQ_DATA, f.IDENTIFIER.nm, identifier, f.REQ_ID.nm, reqId))
+        result = self._command(
+            "select acks from {} where {}".
+            format(REQ_DATA, self._where(identifier, reqId)))
         if not result:
             return []
         result = result[0].oRecordData.get('acks', [])
         return result
 
     def getNacks(self, identifier: str, reqId: int) -> dict:
-        result = self.store.client.command(
-            "select nacks from {} where {} = '{}' and {} = {}".
-            format(REQ_DATA, f.IDENTIFIER.nm, identifier, f.REQ_ID.nm, reqId))
+        result = self._command(
+            "select nacks from {} where {}".
+            format(REQ_DATA, self._where(identifier, reqId)))
         return {} if not result else result[0].oRecordData.get('nacks', {})
 
     def setConsensus(self, identifier: str, reqId: int, value='true'):
-        self.store.client.command(
-            "update {} set hasConsensus = {} where {} = '{}' and {} = {}".
-            format(REQ_DATA, value, f.IDENTIFIER.nm, identifier, f.REQ_ID.nm,
-                   reqId))
+        self._pendingFor(identifier, reqId)["hasConsensus"] = value
+        # Replies arriving after consensus are rare, their senders are loaded
+        # again if needed
+        self._replySenders.invalidate((identifier, reqId))
+        self._buffered()
 
     def hasConsensus(self, identifier: str, reqId: int):
-        result = self.store.client.command("select hasConsensus from {} where "
-                                           "{} = '{}' and {} = {}".format(
-            REQ_DATA, f.IDENTIFIER.nm, identifier, f.REQ_ID.nm,
-            reqId))
+        result = self._command("select hasConsensus from {} where {}".format(
+            REQ_DATA, self._where(identifier, reqId)))
         if result and result[0].oRecordData.get('hasConsensus'):
             replies = self.getReplies(identifier, reqId).values()
             fVal = getMaxFailures(len(list(replies)))
@@ -179,16 +266,43 @@ class ClientReqRepStoreOrientDB(ClientReqRepStore):
         else:
             return False
 
+    def retentionEntries(self):
+        # Requests stored before their creation time was recorded are aged
+        # from now on
+        self._command("update {} set created = {} where created is null".
+                      format(REQ_DATA, int(time.time())))
+        result = self._command(
+            "select {}, {}, created, hasConsensus, acks, nacks, replies "
+            "from {}".format(f.IDENTIFIER.nm, f.REQ_ID.nm, REQ_DATA))
+        for r in result:
+            data = r.oRecordData
+            size = sum(len(json.dumps(data.get(k) or {}, default=list))
+                       for k in ("acks", "nacks", "replies"))
+            yield RetentionEntry(data[f.IDENTIFIER.nm], data[f.REQ_ID.nm],
+                                 data["created"],
+                                 bool(data.get("hasConsensus")), size)
+
+    def removeRequests(self, keys):
+        self.flush()
+        stmts = ["delete from {} where {}".format(
+            REQ_DATA, self._where(identifier, reqId))
+            for identifier, reqId in keys]
+        for key in keys:
+            self._replySenders.invalidate(key)
+        self.store.client.batch("begin;\n{};\ncommit;".
+                                format(";\n".join(stmts)))
+
     def setLastTxnForIdentifier(self, identifier, value: str):
+        identifier = self._literal(identifier)
         self.store.client.command(
-            "update {} set value = '{}', {} = '{}' upsert "
-            "where {} = '{}'".
-            format(LAST_TXN_DATA, value, f.IDENTIFIER.nm,
+            "update {} set value = {}, {} = {} upsert "
+            "where {} = {}".
+            format(LAST_TXN_DATA, self._literal(value), f.IDENTIFIER.nm,
                    identifier, f.IDENTIFIER.nm, identifier))
 
     def getLastTxnForIdentifier(self, identifier):
         result = self.store.client.command(
-            "select value from {} where {} = '{}'".
+            "select value from {} where {} = {}".
             format(LAST_TXN_DATA, f.IDENTIFIER.nm,
-                   identifier))
+                   self._literal(identifier)))
         return None if not result else result[0].oRecordData['value']
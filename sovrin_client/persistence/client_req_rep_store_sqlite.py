@@ -0,0 +1,278 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Sequence, List
+
+from plenum.common.constants import TXN_ID, TXN_TYPE, TXN_TIME
+from plenum.common.types import f
+from plenum.common.util import checkIfMoreThanFSameItems, getMaxFailures, \
+    updateFieldsWithSeqNo
+
+from sovrin_common.txn_util import getTxnOrderedFields
+from sovrin_common.types import Request
+from sovrin_client.persistence.client_req_rep_store import ClientReqRepStore
+from sovrin_client.persistence.retention import RetentionEntry
+
+SCHEMA = """
+create table if not exists ReqData (
+    identifier text not null,
+    reqId integer not null,
+    txnType text,
+    txnId text,
+    txnTime integer,
+    hasConsensus integer not null default 0,
+    created real,
+    request text,
+    primary key (identifier, reqId)
+);
+create table if not exists Acks (
+    identifier text not null,
+    reqId integer not null,
+    sender text not null,
+    primary key (identifier, reqId, sender)
+);
+create table if not exists Nacks (
+    identifier text not null,
+    reqId integer not null,
+    sender text not null,
+    reason text,
+    primary key (identifier, reqId, sender)
+);
+create table if not exists Rejects (
+    identifier text not null,
+    reqId integer not null,
+    sender text not null,
+    reason text,
+    primary key (identifier, reqId, sender)
+);
+create table if not exists Replies (
+    identifier text not null,
+    reqId integer not null,
+    sender text not null,
+    txn text not null,
+    primary key (identifier, reqId, sender)
+);
+create table if not exists LastTxnData (
+    identifier text primary key,
+    value text
+);
+"""
+
+# The statements are constant so sqlite3 prepares each of them once and
+# reuses it from its statement cache
+INSERT_REQUEST = "insert or ignore into ReqData (identifier, reqId, txnType, " \
+                 "created, request) values (?, ?, ?, ?, ?)"
+INSERT_ACK = "insert or ignore into Acks values (?, ?, ?)"
+INSERT_NACK = "insert or replace into Nacks values (?, ?, ?, ?)"
+INSERT_REJECT = "insert or replace into Rejects values (?, ?, ?, ?)"
+INSERT_REPLY = "insert or replace into Replies values (?, ?, ?, ?)"
+COUNT_REPLIES = "select count(*) from Replies where identifier = ? and " \
+                "reqId = ?"
+SET_TXN = "update ReqData set txnId = ?, txnTime = ?, txnType = ? " \
+          "where identifier = ? and reqId = ? and txnId is null"
+SELECT_TXN_ID = "select txnId from ReqData where identifier = ? and reqId = ?"
+SELECT_REQUEST = "select request from ReqData where identifier = ? and " \
+                 "reqId = ?"
+SELECT_CONSENSUS = "select hasConsensus from ReqData where identifier = ? " \
+                   "and reqId = ?"
+SET_CONSENSUS = "update ReqData set hasConsensus = ? where identifier = ? " \
+                "and reqId = ?"
+SELECT_REPLIES = "select sender, txn from Replies where identifier = ? and " \
+                 "reqId = ?"
+SELECT_ACKS = "select sender from Acks where identifier = ? and reqId = ?"
+SELECT_NACKS = "select sender, reason from Nacks where identifier = ? and " \
+               "reqId = ?"
+SELECT_REJECTS = "select sender, reason from Rejects where identifier = ? " \
+                 "and reqId = ?"
+SELECT_LAST_REQ_ID = "select max(reqId) from ReqData"
+UPSERT_LAST_TXN = "insert or replace into LastTxnData values (?, ?)"
+SELECT_LAST_TXN = "select value from LastTxnData where identifier = ?"
+SELECT_RETENTION = "select r.identifier, r.reqId, r.created, r.hasConsensus, " \
+                   "(select coalesce(sum(length(txn)), 0) from Replies p " \
+                   "where p.identifier = r.identifier and p.reqId = r.reqId) " \
+                   "from ReqData r"
+REMOVE_REQUEST = ["delete from {} where identifier = ? and reqId = ?".
+                  format(table) for table in
+                  ("ReqData", "Acks", "Nacks", "Rejects", "Replies")]
+
+
+class ClientReqRepStoreSqlite(ClientReqRepStore):
+    """
+    Request/reply store kept in an embedded SQLite database in WAL mode, so
+    consensus and confirmation checks are indexed lookups without needing an
+    OrientDB server.
+
+    Writes are made in a transaction which is committed every `batchSize`
+    writes or on `flush`, which the client calls once per prod. Acks and
+    nacks are buffered and inserted together; they are written before being
+    read so reads always see them.
+    """
+
+    def __init__(self, name, baseDir, batchSize=100):
+        self.dataLocation = os.path.join(baseDir, "data", "clients", name)
+        os.makedirs(self.dataLocation, exist_ok=True)
+        self.dbPath = os.path.join(self.dataLocation, "req_rep.db")
+        self.batchSize = batchSize
+        self.db = sqlite3.connect(self.dbPath)
+        self.db.execute("pragma journal_mode = wal")
+        # Durable across process crashes, only an OS crash can lose the last
+        # commits
+        self.db.execute("pragma synchronous = normal")
+        self.db.executescript(SCHEMA)
+        self._migrate()
+        self._pendingAcks = []
+        self._pendingNacks = []
+        self._uncommitted = 0
+
+    def _migrate(self):
+        columns = {row[1] for row in
+                   self.db.execute("pragma table_info(ReqData)")}
+        if "created" not in columns:
+            # Databases made before requests were aged. Their requests are
+            # aged from now on, rather than all being taken as expired
+            self.db.execute("alter table ReqData add column created real")
+            self.db.execute("update ReqData set created = ?", (time.time(),))
+            self.db.commit()
+        if "request" not in columns:
+            # Databases made before requests were kept, their requests are
+            # not known
+            self.db.execute("alter table ReqData add column request text")
+            self.db.commit()
+
+    @property
+    def txnFieldOrdering(self):
+        fields = getTxnOrderedFields()
+        return updateFieldsWithSeqNo(fields)
+
+    def _wrote(self, count=1):
+        self._uncommitted += count
+        if self._uncommitted + len(self._pendingAcks) + \
+                len(self._pendingNacks) >= self.batchSize:
+            self.flush()
+
+    def _writePending(self):
+        if self._pendingAcks:
+            self.db.executemany(INSERT_ACK, self._pendingAcks)
+            self._uncommitted += len(self._pendingAcks)
+            self._pendingAcks = []
+        if self._pendingNacks:
+            self.db.executemany(INSERT_NACK, self._pendingNacks)
+            self._uncommitted += len(self._pendingNacks)
+            self._pendingNacks = []
+
+    def flush(self):
+        self._writePending()
+        if self._uncommitted:
+            self.db.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def _fetchOne(self, sql, *params):
+        return self.db.execute(sql, params).fetchone()
+
+    @property
+    def lastReqId(self):
+        row = self._fetchOne(SELECT_LAST_REQ_ID)
+        return row[0] or 0
+
+    def addRequest(self, req: Request):
+        self.db.execute(INSERT_REQUEST, (req.identifier, req.reqId,
+                                         req.operation[TXN_TYPE],
+                                         time.time(),
+                                         json.dumps(req.__getstate__())))
+        self._wrote()
+
+    def addAck(self, msg: Any, sender: str):
+        self._pendingAcks.append((msg[f.IDENTIFIER.nm], msg[f.REQ_ID.nm],
+                                  sender))
+        self._wrote(0)
+
+    def addNack(self, msg: Any, sender: str):
+        self._pendingNacks.append((msg[f.IDENTIFIER.nm], msg[f.REQ_ID.nm],
+                                   sender, msg[f.REASON.nm]))
+        self._wrote(0)
+
+    def addReject(self, msg: Any, sender: str):
+        self.db.execute(INSERT_REJECT, (msg[f.IDENTIFIER.nm],
+                                        msg[f.REQ_ID.nm], sender,
+                                        msg[f.REASON.nm]))
+        self._wrote()
+
+    def addReply(self, identifier: str, reqId: int, sender: str,
+                 result: Any) -> Sequence[str]:
+        serializedTxn = self.txnSerializer.serialize(result, toBytes=False)
+        self.db.execute(INSERT_REPLY, (identifier, reqId, sender,
+                                       serializedTxn))
+        # TODO: Set txnId txnTime, txnType only when got same f+1 replies
+        self.db.execute(SET_TXN, (result[TXN_ID], result.get(TXN_TIME),
+                                  result[TXN_TYPE], identifier, reqId))
+        self._wrote(2)
+        return self._fetchOne(COUNT_REPLIES, identifier, reqId)[0]
+
+    def requestConfirmed(self, identifier, reqId):
+        row = self._fetchOne(SELECT_TXN_ID, identifier, reqId)
+        return bool(row and row[0])
+
+    def hasRequest(self, identifier: str, reqId: int):
+        return self._fetchOne(SELECT_TXN_ID, identifier, reqId) is not None
+
+    def getRequest(self, identifier: str, reqId: int) -> Request:
+        row = self._fetchOne(SELECT_REQUEST, identifier, reqId)
+        if row and row[0]:
+            return Request.fromState(json.loads(row[0]))
+
+    def getReplies(self, identifier: str, reqId: int):
+        return {sender: self.txnSerializer.deserialize(txn)
+                for sender, txn in self.db.execute(SELECT_REPLIES,
+                                                   (identifier, reqId))}
+
+    def getAcks(self, identifier: str, reqId: int) -> List[str]:
+        self._writePending()
+        return [sender for sender, in self.db.execute(SELECT_ACKS,
+                                                      (identifier, reqId))]
+
+    def getNacks(self, identifier: str, reqId: int) -> dict:
+        self._writePending()
+        return dict(self.db.execute(SELECT_NACKS, (identifier, reqId)))
+
+    def getRejects(self, identifier: str, reqId: int) -> dict:
+        return dict(self.db.execute(SELECT_REJECTS, (identifier, reqId)))
+
+    def setConsensus(self, identifier: str, reqId: int, value=True):
+        self.db.execute(SET_CONSENSUS, (int(value), identifier, reqId))
+        self._wrote()
+
+    def hasConsensus(self, identifier: str, reqId: int):
+        row = self._fetchOne(SELECT_CONSENSUS, identifier, reqId)
+        if row and row[0]:
+            replies = list(self.getReplies(identifier, reqId).values())
+            fVal = getMaxFailures(len(replies))
+            return checkIfMoreThanFSameItems(replies, fVal)
+        else:
+            return False
+
+    def retentionEntries(self):
+        self._writePending()
+        for identifier, reqId, created, hasConsensus, size in \
+                self.db.execute(SELECT_RETENTION).fetchall():
+            yield RetentionEntry(identifier, reqId, created or 0,
+                                 bool(hasConsensus), size)
+
+    def removeRequests(self, keys):
+        self._writePending()
+        for sql in REMOVE_REQUEST:
+            self.db.executemany(sql, keys)
+        self.db.commit()
+        self._uncommitted = 0
+
+    def setLastTxnForIdentifier(self, identifier, value: str):
+        self.db.execute(UPSERT_LAST_TXN, (identifier, value))
+        self._wrote()
+
+    def getLastTxnForIdentifier(self, identifier):
+        row = self._fetchOne(SELECT_LAST_TXN, identifier)
+        return None if not row else row[0]
@@ -0,0 +1,81 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+
+class ClientTxnIndex:
+    """
+    Append-only file of pointers into a client's transaction log, along with
+    in-memory indexes from transaction type, target nym, transaction id and
+    (identifier, reqId) to the position of the transaction in the log. So
+    transactions can be looked up in time proportional to the number of
+    results rather than the size of the log. The transactions themselves are
+    only kept in the log.
+    """
+
+    fileName = "txn_index"
+
+    def __init__(self, dataDir: str):
+        self.filePath = os.path.join(dataDir, self.fileName)
+        self._file = open(self.filePath, 'a+b')
+        self._byKey = {}  # type: Dict[Tuple[str, int], int]
+        self._byType = {}  # type: Dict[str, List[int]]
+        self._byNym = {}  # type: Dict[str, List[int]]
+        self._byTxnId = {}  # type: Dict[str, int]
+        # Position in the log of the last indexed transaction
+        self.lastLogOffset = None  # type: Optional[int]
+        self._load()
+
+    def _load(self):
+        self._file.seek(0)
+        offset = 0
+        for line in self._file:
+            if not line.endswith(b'\n'):
+                # Partially written entry, the process stopped while
+                # appending it
+                self._file.truncate(offset)
+                break
+            self._indexEntry(json.loads(line.decode()))
+            offset += len(line)
+
+    def _indexEntry(self, entry):
+        identifier, reqId, txnType, nym, txnId, logOffset = entry
+        self._byKey[identifier, reqId] = logOffset
+        if txnType is not None:
+            self._byType.setdefault(txnType, []).append(logOffset)
+        if nym is not None:
+            self._byNym.setdefault(nym, []).append(logOffset)
+        if txnId is not None:
+            self._byTxnId[txnId] = logOffset
+        self.lastLogOffset = logOffset
+
+    def add(self, identifier: str, reqId: int, txnType: Optional[str],
+            nym: Optional[str], txnId: Optional[str], logOffset: int):
+        entry = [identifier, reqId, txnType, nym, txnId, logOffset]
+        self._file.seek(0, os.SEEK_END)
+        self._file.write((json.dumps(entry) + '\n').encode())
+        self._file.flush()
+        self._indexEntry(entry)
+
+    def has(self, identifier: str, reqId: int) -> bool:
+        return (identifier, reqId) in self._byKey
+
+    def getByType(self, txnType: str) -> List[int]:
+        return list(self._byType.get(txnType, []))
+
+    def getByNym(self, nym: str) -> List[int]:
+        return list(self._byNym.get(nym, []))
+
+    def getByTxnId(self, txnId: str) -> Optional[int]:
+        return self._byTxnId.get(txnId)
+
+    def reset(self):
+        self._file.truncate(0)
+        self._byKey.clear()
+        self._byType.clear()
+        self._byNym.clear()
+        self._byTxnId.clear()
+        self.lastLogOffset = None
+
+    def close(self):
+        self._file.close()
@@ -1,24 +1,106 @@
-from typing import List
+from typing import Iterator, List, Tuple
 
-from plenum.common.constants import TXN_TYPE
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, TXN_ID
+from plenum.common.types import f
 from plenum.common.util import updateFieldsWithSeqNo
 from plenum.persistence.client_txn_log import ClientTxnLog as PClientTxnLog
 
 from sovrin_common.txn_util import getTxnOrderedFields
+from sovrin_client.persistence.client_txn_index import ClientTxnIndex
 
 
 class ClientTxnLog(PClientTxnLog):
+    def __init__(self, name, baseDir=None):
+        super().__init__(name, baseDir)
+        self.txnIndex = ClientTxnIndex(self.dataLocation)
+        # Position in the log right after the last indexed transaction
+        self._logEnd = 0
+        if self.txnIndex.lastLogOffset is not None:
+            for _, end, _ in self._logLines(self.txnIndex.lastLogOffset):
+                self._logEnd = end
+                break
+            if not self._logEnd:
+                # The index points past the end of the log
+                self.txnIndex.reset()
+        # The index is written after the log so the process may have
+        # stopped in between, index whatever the log has beyond it
+        self._indexNewTxns()
 
     @property
     def txnFieldOrdering(self):
-        fields = getTxnOrderedFields()
-        return updateFieldsWithSeqNo(fields)
+        fields = updateFieldsWithSeqNo(getTxnOrderedFields())
+        # Last, so that transactions logged without it still deserialize,
+        # the id is needed to look transactions up by it
+        fields[TXN_ID] = (str, str)
+        return fields
+
+    def _serialize(self, txn) -> str:
+        return self.serializer.serialize(txn, fields=self.txnFieldOrdering,
+                                         toBytes=False)
+
+    def _deserialize(self, val):
+        return self.serializer.deserialize(val, fields=self.txnFieldOrdering)
+
+    def _logLines(self, start: int) -> Iterator[Tuple[int, int, str]]:
+        """
+        Yields the start and end positions and the serialized transaction
+        of each line of the log from position `start`. Lines are
+        `key<delimiter>value`, followed by `<delimiter>hash of value` when
+        the store keeps content hashes.
+        """
+        log = self.transactionLog
+        delimiter = getattr(log, 'delimiter', '\t')
+        lineSep = getattr(log, 'lineSep', '\r\n')
+        hasHash = getattr(log, 'storeContentHash', True)
+        path = getattr(log, 'dbPath', None) or log._dbPath
+        with open(path, 'rb') as logFile:
+            logFile.seek(start)
+            for line in logFile:
+                if not line.endswith(b'\n'):
+                    # Partially written transaction
+                    break
+                _, _, val = line.decode().rstrip(lineSep).partition(delimiter)
+                if hasHash:
+                    val, _, _ = val.rpartition(delimiter)
+                yield start, start + len(line), val
+                start += len(line)
+
+    def _readTxnAt(self, offset: int):
+        for _, _, val in self._logLines(offset):
+            return self._deserialize(val)
+
+    def _indexNewTxns(self):
+        for offset, end, val in self._logLines(self._logEnd):
+            txn = self._deserialize(val)
+            self.txnIndex.add(txn.get(f.IDENTIFIER.nm), txn.get(f.REQ_ID.nm),
+                              txn.get(TXN_TYPE), txn.get(TARGET_NYM),
+                              txn.get(TXN_ID), offset)
+            self._logEnd = end
+
+    def append(self, identifier: str, reqId, txn):
+        super().append(identifier, reqId, txn)
+        self._indexNewTxns()
+
+    def close(self):
+        super().close()
+        self.txnIndex.close()
+
+    def reset(self):
+        super().reset()
+        self.txnIndex.reset()
+        self._logEnd = 0
+
+    def hasTxnWithReqId(self, identifier, reqId) -> bool:
+        return self.txnIndex.has(identifier, reqId)
 
     def getTxnsByType(self, txnType: str) -> List:
-        txns = []
-        for val in self.transactionLog.iterator(includeKey=False,
-                                                includeValue=True):
-            txn = self.serializer.deserialize(val, fields=self.txnFieldOrdering)
-            if txn.get(TXN_TYPE) == txnType:
-                txns.append(txn)
-        return txns
+        return [self._readTxnAt(offset)
+                for offset in self.txnIndex.getByType(txnType)]
+
+    def getTxnsByNym(self, nym: str) -> List:
+        return [self._readTxnAt(offset)
+                for offset in self.txnIndex.getByNym(nym)]
+
+    def getTxnById(self, txnId: str):
+        offset = self.txnIndex.getByTxnId(txnId)
+        return None if offset is None else self._readTxnAt(offset)
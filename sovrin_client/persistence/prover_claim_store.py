@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sovrin_client.persistence.record_log import RecordLog
+
+# Key of a claim, the name, version and issuer of its schema
+ClaimKey = Tuple[str, str, str]
+
+
+class ProverClaimStore:
+    """
+    The attributes of the claims a prover knows of, by claim, with the
+    values of the claims it has received, persisted apart from the wallet.
+    An index from attribute name to the claims having that attribute makes
+    matching proof requests to claims a lookup.
+    """
+
+    def __init__(self, dataDir: str, name: str = "prover_claims_log"):
+        self._log = RecordLog(dataDir, name)
+        self._byAttr = {}  # type: Dict[str, Set[ClaimKey]]
+        for key, record in self._log.items():
+            self._index(key, record)
+
+    @staticmethod
+    def key(claim: Iterable[str]) -> ClaimKey:
+        name, version, origin = claim
+        return name, version, origin
+
+    def _index(self, key, record):
+        for attrName, _ in record:
+            self._byAttr.setdefault(attrName, set()).add(key)
+
+    def __len__(self):
+        return len(self._log)
+
+    def __contains__(self, claim):
+        return self.key(claim) in self._log
+
+    def get(self, claim) -> Optional[OrderedDict]:
+        """
+        Returns the attributes of `claim` in the order of its schema, with
+        None values if it was not received yet
+        """
+        record = self._log.get(self.key(claim))
+        return None if record is None else OrderedDict(record)
+
+    def isReceived(self, claim) -> bool:
+        attrs = self.get(claim)
+        return bool(attrs) and None not in attrs.values()
+
+    def put(self, claim, attrs: OrderedDict):
+        key = self.key(claim)
+        # A list of pairs keeps the order of the attributes through JSON
+        record = [[k, self._jsonValue(v)] for k, v in attrs.items()]
+        old = self._log.get(key)
+        if old == record:
+            return
+        if old:
+            for attrName, _ in old:
+                self._byAttr[attrName].discard(key)
+        self._log.put(key, record)
+        self._index(key, record)
+
+    @staticmethod
+    def _jsonValue(value):
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        return str(value)
+
+    def claimsWithAttrs(self, attrNames: Iterable[str]) -> Set[ClaimKey]:
+        """
+        Returns the claims having any of the attributes `attrNames`
+        """
+        keys = set()
+        for attrName in attrNames:
+            keys.update(self._byAttr.get(attrName, ()))
+        return keys
+
+    def flush(self):
+        self._log.flush()
+
+    def close(self):
+        self._log.close()
@@ -0,0 +1,141 @@
+import json
+import os
+from typing import Any, Dict, Hashable
+
+from stp_core.common.log import getlogger
+
+logger = getlogger()
+
+PUT = "p"
+REMOVE = "r"
+
+
+class RecordLog:
+    """
+    Key value store persisted as an append-only log of JSON records, one per
+    line. The latest value of every key is kept in memory and recovered on
+    start by replaying the log; a partially written last record (the process
+    stopped while writing it) is discarded.
+
+    Records are flushed to the OS as they are written but fsynced only every
+    `fsyncEvery` records, on `flush` and on `close`. Once the log has more
+    than `compactionFactor` records per key it is compacted by atomically
+    replacing it with a log of only the latest values.
+
+    Keys must be strings or tuples of JSON scalars and values JSON
+    serializable.
+    """
+
+    def __init__(self, dataDir: str, name: str, fsyncEvery: int = 100,
+                 compactionFactor: int = 4, minCompactionSize: int = 1000):
+        self.filePath = os.path.join(dataDir, name)
+        self.fsyncEvery = fsyncEvery
+        self.compactionFactor = compactionFactor
+        self.minCompactionSize = minCompactionSize
+        self._data = {}  # type: Dict[Hashable, Any]
+        self._numRecords = 0
+        self._unsynced = 0
+        os.makedirs(dataDir, exist_ok=True)
+        self._load()
+        self._file = open(self.filePath, 'ab')
+
+    def _load(self):
+        if not os.path.exists(self.filePath):
+            return
+        offset = 0
+        with open(self.filePath, 'r+b') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("incomplete record")
+                    self._apply(json.loads(line.decode()))
+                except ValueError as ex:
+                    logger.warning("Discarding records from offset {} of {}: "
+                                   "{}".format(offset, self.filePath, ex))
+                    f.truncate(offset)
+                    break
+                offset += len(line)
+                self._numRecords += 1
+
+    @staticmethod
+    def _key(key):
+        # JSON has no tuples
+        return tuple(key) if isinstance(key, list) else key
+
+    def _apply(self, record):
+        op, key = record[0], self._key(record[1])
+        if op == PUT:
+            self._data[key] = record[2]
+        elif op == REMOVE:
+            self._data.pop(key, None)
+        else:
+            raise ValueError("unknown operation {}".format(op))
+
+    def _append(self, record):
+        self._file.write((json.dumps(record) + '\n').encode())
+        self._file.flush()
+        self._apply(record)
+        self._numRecords += 1
+        self._unsynced += 1
+        if self._unsynced >= self.fsyncEvery:
+            self._fsync()
+        if self._numRecords > max(self.minCompactionSize,
+                                  self.compactionFactor * len(self._data)):
+            self.compact()
+
+    def _fsync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def put(self, key, value):
+        self._append([PUT, key, value])
+
+    def remove(self, key):
+        if key in self._data:
+            self._append([REMOVE, key])
+
+    def items(self):
+        return self._data.items()
+
+    def flush(self):
+        self._file.flush()
+        self._fsync()
+
+    def compact(self):
+        tmpPath = self.filePath + ".tmp"
+        with open(tmpPath, 'wb') as f:
+            for key, value in self._data.items():
+                f.write((json.dumps([PUT, key, value]) + '\n').encode())
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmpPath, self.filePath)
+        self._fsyncDir()
+        self._file = open(self.filePath, 'ab')
+        self._numRecords = len(self._data)
+        self._unsynced = 0
+
+    def _fsyncDir(self):
+        try:
+            fd = os.open(os.path.dirname(self.filePath), os.O_RDONLY)
+        except OSError:
+            # Not supported on some platforms, like Windows
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
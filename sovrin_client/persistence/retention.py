@@ -0,0 +1,68 @@
+from collections import namedtuple
+from typing import Iterable, Optional, Set, Tuple
+
+# A request kept by a request/reply store. `time` is the time of the last
+# activity on it in seconds since the epoch, `confirmed` is None when the
+# store does not know whether the request got consensus and `size` is the
+# number of bytes the request takes in the store.
+RetentionEntry = namedtuple("RetentionEntry", ["identifier", "reqId", "time",
+                                               "confirmed", "size"])
+
+CompactionResult = namedtuple("CompactionResult", ["entries", "bytes"])
+
+
+class RetentionPolicy:
+    """
+    Decides which requests a request/reply store can forget. A request is
+    dropped when it is older than `maxAge`, when it got consensus more than
+    `consensusGrace` seconds ago, or when it is among the oldest requests
+    beyond the newest `maxCount`. Requests younger than `minAge` are always
+    kept so requests still waiting for replies are not lost.
+    """
+
+    def __init__(self, maxAge: Optional[float]=None,
+                 maxCount: Optional[int]=None,
+                 consensusGrace: Optional[float]=None,
+                 minAge: float=60):
+        self.maxAge = maxAge
+        self.maxCount = maxCount
+        self.consensusGrace = consensusGrace
+        self.minAge = minAge
+
+    @classmethod
+    def fromConfig(cls, config):
+        return cls(maxAge=getattr(config, 'ClientReqRepMaxAge', None),
+                   maxCount=getattr(config, 'ClientReqRepMaxCount', None),
+                   consensusGrace=getattr(config,
+                                          'ClientReqRepConsensusGrace', None))
+
+    @property
+    def isActive(self):
+        return any(v is not None for v in
+                   (self.maxAge, self.maxCount, self.consensusGrace))
+
+    def select(self, entries: Iterable[RetentionEntry], now: float) \
+            -> Set[Tuple[str, int]]:
+        """
+        Returns the keys, (identifier, reqId), of entries to drop
+        """
+        entries = sorted(entries, key=lambda e: e.time)
+        drop = set()
+        kept = []
+        for e in entries:
+            age = now - e.time
+            if age >= self.minAge and (
+                    (self.maxAge is not None and age > self.maxAge) or
+                    (self.consensusGrace is not None and e.confirmed and
+                     age > self.consensusGrace)):
+                drop.add((e.identifier, e.reqId))
+            else:
+                kept.append(e)
+        if self.maxCount is not None:
+            excess = len(kept) - self.maxCount
+            for e in kept:
+                if excess <= 0 or now - e.time < self.minAge:
+                    break
+                drop.add((e.identifier, e.reqId))
+                excess -= 1
+        return drop
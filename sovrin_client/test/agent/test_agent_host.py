@@ -0,0 +1,120 @@
+import pytest
+
+from plenum.common.constants import IDENTIFIER, NONCE
+from plenum.common.signer_did import DidSigner
+from plenum.common.util import randomString
+from plenum.test.helper import assertFunc
+from stp_core.loop.eventually import eventually
+from stp_core.network.port_dispenser import genHa
+
+from sovrin_client.agent.agent import WalletedAgent
+from sovrin_client.agent.agent_host import AgentHost
+from sovrin_client.client.wallet.link import Link
+from sovrin_client.test.helper import TestClient, addUser
+from sovrin_common.identity import Identity
+
+nonce = 'b1134a647eb818069c089e7694f63e6d'
+aliceIdr = DidSigner().identifier
+
+
+@pytest.fixture(scope="module")
+def tenantWallets(nodeSet, emptyLooper, steward, stewardWallet):
+    """
+    Wallets of the tenants, with identifiers written to Sovrin
+    """
+    return {name: addUser(emptyLooper, steward, stewardWallet, name)
+            for name in ('faber', 'acme')}
+
+
+@pytest.fixture(scope="module")
+def received():
+    """
+    Messages the host gives each tenant, by tenant name
+    """
+    return {}
+
+
+@pytest.fixture(scope="module")
+def host(tdirWithPoolTxns, emptyLooper, tenantWallets, received):
+    def newTenant(name):
+        tenant = WalletedAgent(name=name, basedirpath=tdirWithPoolTxns,
+                               wallet=tenantWallets[name],
+                               loop=emptyLooper.loop)
+        received[name] = []
+        tenant.handleEndpointMessage = received[name].append
+        return tenant
+
+    _, clientPort = genHa()
+    client = TestClient(randomString(6), ha=("0.0.0.0", clientPort),
+                        basedirpath=tdirWithPoolTxns)
+    _, port = genHa()
+    host = AgentHost(name=randomString(6), basedirpath=tdirWithPoolTxns,
+                     client=client, port=port, loop=emptyLooper.loop,
+                     tenantFactory=newTenant)
+    emptyLooper.add(host)
+    emptyLooper.run(eventually(assertFunc, client.isReady))
+    return host
+
+
+def testRoutesAreAddedAsLinksAreCreatedAndAccepted(host, received):
+    faber = host.addTenant('faber', load=True)
+    link = Link('Alice', invitationNonce=nonce)
+    faber.wallet.addLink(link)
+    assert host.routeFor({NONCE: nonce}) == 'faber'
+
+    link.remoteIdentifier = aliceIdr
+    msg = ({IDENTIFIER: aliceIdr}, 'Alice')
+    host.handleEndpointMessage(msg)
+    assert received['faber'] == [msg]
+
+    host.handleEndpointMessage(({IDENTIFIER: 'unknown'}, 'Mallory'))
+    assert host.stats["unroutable"] == 1
+
+
+def testUnloadedTenantIsLoadedForItsMessages(host, received):
+    host.unloadTenant('faber')
+    assert not host.isLoaded('faber')
+
+    msg = ({NONCE: nonce}, 'Alice')
+    host.handleEndpointMessage(msg)
+    assert host.isLoaded('faber')
+    assert received['faber'] == [msg]
+
+
+def testRepliesReachOnlyTheOwningTenant(host, emptyLooper):
+    faber = host.getTenant('faber')
+    acme = host.addTenant('acme', load=True)
+    acmeReplies = []
+    acme.wallet.handleIncomingReply = \
+        lambda *args: acmeReplies.append(args)
+
+    req = faber.wallet.requestIdentity(
+        Identity(identifier=acme.wallet.defaultId),
+        sender=faber.wallet.defaultId)
+    host.client.submitReqs(req)
+
+    def chkReplied():
+        assert req.key not in faber.wallet._getPrepared()
+
+    emptyLooper.run(eventually(chkReplied, timeout=10))
+    assert not acmeReplies
+    assert host.stats["unroutedReplies"] == 0
+    del acme.wallet.handleIncomingReply
+
+
+def testBusyTenantIsNotEvicted(host):
+    faber = host.getTenant('faber')
+    acme = host.getTenant('acme')
+    # A request whose reply acme still waits for
+    acme.wallet.requestIdentity(Identity(identifier=faber.wallet.defaultId),
+                                sender=acme.wallet.defaultId)
+
+    host.idleTimeout = 0
+    assert host.evictIdleTenants() == 1
+    assert host.isLoaded('acme')
+    assert not host.isLoaded('faber')
+
+    host.maxLoadedTenants = 1
+    host.addTenant('faber', load=True)
+    assert host.isLoaded('acme')
+    assert host.isLoaded('faber')
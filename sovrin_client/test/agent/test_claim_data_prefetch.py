@@ -0,0 +1,51 @@
+import pytest
+
+from stp_core.loop.eventually import eventually
+
+
+@pytest.fixture(scope="module")
+def aliceFetched(aliceAgent):
+    """
+    Schemas and keys Alice's prover fetches, by claim name, and the most
+    fetched at once
+    """
+    fetched = {'inFlight': 0, 'maxInFlight': 0}
+    wallet = aliceAgent.prover.wallet
+
+    def recording(what, fetch):
+        async def recordingFetch(id, *args, **kwargs):
+            fetched['inFlight'] += 1
+            fetched['maxInFlight'] = max(fetched['maxInFlight'],
+                                         fetched['inFlight'])
+            try:
+                return await fetch(id, *args, **kwargs)
+            finally:
+                fetched['inFlight'] -= 1
+                if id.schemaKey:
+                    fetched.setdefault(id.schemaKey.name, set()).add(what)
+        return recordingFetch
+
+    wallet.getSchema = recording('schema', wallet.getSchema)
+    wallet.getPublicKey = recording('pk', wallet.getPublicKey)
+    wallet.getPublicKeyRevocation = recording('pkR',
+                                              wallet.getPublicKeyRevocation)
+    return fetched
+
+
+def testDataOfClaimsOfferedOnAcceptIsPrefetched(aliceFetched,
+                                                aliceAcceptedFaber,
+                                                aliceAgent, emptyLooper):
+    availableClaims = aliceAgent.wallet.getLink('Faber College').\
+        availableClaims
+    assert availableClaims
+
+    def chkPrefetched():
+        for name, _, _ in availableClaims:
+            assert aliceFetched.get(name) == {'schema', 'pk', 'pkR'}
+        assert not aliceAgent._prefetching
+
+    emptyLooper.run(eventually(chkPrefetched, timeout=20))
+    assert aliceFetched['maxInFlight'] <= \
+        getattr(aliceAgent.config, 'ClaimDataPrefetchConcurrency', 4)
+    for cl in availableClaims:
+        assert cl in aliceAgent.proverClaimStore
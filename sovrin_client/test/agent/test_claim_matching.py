@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+from stp_core.loop.eventually import eventually
+
+from sovrin_client.client.wallet.link import Link
+from sovrin_client.client.wallet.types import AvailableClaim
+
+
+def testProofRequestsAreMatchedByClaimStore(aliceAgent, aliceAcceptedFaber,
+                                            emptyLooper):
+    faberLink = aliceAgent.wallet.getLink('Faber College')
+    transcript = faberLink.availableClaims[0]
+
+    # The attributes of claims are stored when the claims are listed
+    def chkStored():
+        assert transcript in aliceAgent.proverClaimStore
+
+    emptyLooper.run(eventually(chkStored, timeout=10))
+
+    walletLookups = []
+    proverWallet = aliceAgent.prover.wallet
+    getClaims = proverWallet.getClaims
+
+    async def countingGetClaims(schemaId):
+        walletLookups.append(schemaId)
+        return await getClaims(schemaId)
+
+    proverWallet.getClaims = countingGetClaims
+
+    matching = emptyLooper.run(aliceAgent.getClaimsUsedForAttrs(
+        {'degree': None, 'first_name': None}))
+    assert [(li.name, cl) for li, cl, _ in matching] == \
+        [('Faber College', transcript)]
+    assert list(matching[0][2].keys()) == \
+        list(aliceAgent.proverClaimStore.get(transcript).keys())
+
+    matching = emptyLooper.run(
+        aliceAgent.getMatchingLinksWithReceivedClaimAsync('Transcript'))
+    assert [(li.name, cl) for li, cl, _ in matching] == \
+        [('Faber College', transcript)]
+
+    assert emptyLooper.run(aliceAgent.getClaimsUsedForAttrs(
+        {'unknown_attr': None})) == []
+    # Matching is answered by the store, not by the prover's wallet
+    assert not walletLookups
+
+
+def testClaimsAreUsedInTheOrderOfLinks(aliceAgent, aliceAcceptedFaber,
+                                       emptyLooper):
+    # A claim sorting before the Transcript, offered by a link added after
+    # Faber's, that also has the degree
+    degree = AvailableClaim('Degree', '1.0', 'zetaIssuer')
+    aliceAgent.proverClaimStore.put(degree, OrderedDict(
+        [('degree', 'Bachelor of Arts'), ('major', 'History')]))
+    zetaLink = Link('Zeta University')
+    zetaLink.availableClaims.append(degree)
+    aliceAgent.wallet.addLink(zetaLink)
+    aliceAgent._linksByClaim = None
+
+    transcript = aliceAgent.wallet.getLink('Faber College').availableClaims[0]
+    matching = emptyLooper.run(aliceAgent.getClaimsUsedForAttrs(
+        {'degree': None}))
+    assert [(li.name, cl) for li, cl, _ in matching] == \
+        [('Faber College', transcript)]
+
+    matching = emptyLooper.run(aliceAgent.getClaimsUsedForAttrs(
+        OrderedDict([('major', None), ('degree', None)])))
+    assert [(li.name, cl) for li, cl, _ in matching] == \
+        [('Faber College', transcript), ('Zeta University', degree)]
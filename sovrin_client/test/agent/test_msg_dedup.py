@@ -0,0 +1,123 @@
+import pytest
+
+from plenum.common.constants import NONCE, TYPE, IDENTIFIER
+from plenum.common.types import f
+from plenum.common.util import getTimeBasedId
+from stp_core.loop.eventually import eventually
+
+from sovrin_client.agent.constants import PING
+from sovrin_client.agent.msg_constants import REQ_AVAIL_CLAIMS
+from sovrin_client.agent.walleted import Walleted
+
+
+def msg(reqId, sig='3Ah9Xoi8Xnps5xpGDHkW8AufUNDQqFbRNN6PkGGqb1Kk'):
+    return {f.IDENTIFIER.nm: 'Th7MpTaRZVRYnPiabds81Y', f.REQ_ID.nm: reqId,
+            f.SIG.nm: sig}
+
+
+def testDuplicateMessagesHaveSameKey():
+    key = Walleted._rcvdMsgKey
+    assert key(msg(1)) == key(msg(1))
+    assert key(msg(1)) != key(msg(2))
+    assert key(msg(1)) != key(msg(1, sig='x'))
+    assert key(msg(1, sig=None)) is None
+
+
+@pytest.fixture(scope="module")
+def faberReceived(faberAgent):
+    """
+    Messages Faber's endpoint receives
+    """
+    received = []
+    handler = faberAgent.endpoint.msgHandler
+
+    def recordingHandler(msg):
+        received.append(msg)
+        handler(msg)
+
+    faberAgent.endpoint.msgHandler = recordingHandler
+    return received
+
+
+@pytest.fixture
+def faberVerified(faberAgent):
+    """
+    Request ids of the messages Faber verifies the signature of
+    """
+    verified = []
+    verifySignature = faberAgent.verifySignature
+
+    def recordingVerifySignature(msg):
+        verified.append(msg.get(f.REQ_ID.nm))
+        return verifySignature(msg)
+
+    faberAgent.verifySignature = recordingVerifySignature
+    yield verified
+    del faberAgent.verifySignature
+
+
+def signedByAlice(aliceAgent, typ):
+    link = aliceAgent.wallet.getLink('Faber College')
+    msg = {TYPE: typ, NONCE: link.invitationNonce,
+           f.REQ_ID.nm: getTimeBasedId(), IDENTIFIER: link.localIdentifier}
+    msg[f.SIG.nm] = aliceAgent.wallet.signMsg(msg, link.localIdentifier)
+    return msg
+
+
+def aliceFrm(aliceAgent, faberAgent, faberReceived, emptyLooper):
+    """
+    The remote Faber receives Alice's messages from
+    """
+    aliceAgent.sendReqAvailClaims(aliceAgent.wallet.getLink('Faber College'))
+
+    def chkReceived():
+        assert any(body.get(TYPE) == REQ_AVAIL_CLAIMS
+                   for body, _ in faberReceived)
+
+    emptyLooper.run(eventually(chkReceived, timeout=10))
+    return next(frm for body, frm in faberReceived
+                if body.get(TYPE) == REQ_AVAIL_CLAIMS)
+
+
+def testReplayedMessageIsDroppedWithoutVerifyingIt(aliceAgent, faberAgent,
+                                                   aliceAcceptedFaber,
+                                                   faberReceived,
+                                                   faberVerified,
+                                                   emptyLooper):
+    aliceAgent.sendReqAvailClaims(aliceAgent.wallet.getLink('Faber College'))
+
+    def chkVerified():
+        assert faberVerified
+
+    emptyLooper.run(eventually(chkVerified, timeout=10))
+    genuine = next(m for m in faberReceived
+                   if m[0].get(f.REQ_ID.nm) == faberVerified[0])
+    dropped = faberAgent.msgDedupStats["duplicatesDropped"]
+
+    body, frm = genuine
+    faberAgent.handleEndpointMessage((dict(body), frm))
+    assert faberVerified == [body[f.REQ_ID.nm]]
+    assert faberAgent.msgDedupStats["duplicatesDropped"] == dropped + 1
+
+
+def testUnverifiedMessagesDoNotPoisonDedup(aliceAgent, faberAgent,
+                                           aliceAcceptedFaber, faberReceived,
+                                           faberVerified, emptyLooper):
+    frm = aliceFrm(aliceAgent, faberAgent, faberReceived, emptyLooper)
+    del faberVerified[:]
+
+    # A message of a type whose signature is not checked, carrying the
+    # signature of a genuine message Faber has not received yet
+    genuine = signedByAlice(aliceAgent, REQ_AVAIL_CLAIMS)
+    forged = dict(genuine, **{TYPE: PING})
+    faberAgent.handleEndpointMessage((forged, frm))
+    faberAgent.handleEndpointMessage((dict(genuine), frm))
+    assert faberVerified == [genuine[f.REQ_ID.nm]]
+
+    # A message whose signature is rejected
+    genuine = signedByAlice(aliceAgent, REQ_AVAIL_CLAIMS)
+    forged = dict(genuine, **{NONCE: 'forged'})
+    faberAgent.handleEndpointMessage((forged, frm))
+    faberAgent.handleEndpointMessage((dict(genuine), frm))
+    assert faberVerified[-2:] == [genuine[f.REQ_ID.nm]] * 2
+    assert faberAgent.rcvdMsgKeys.get(Walleted._rcvdMsgKey(genuine))
@@ -0,0 +1,33 @@
+import pytest
+
+from sovrin_client.agent.exception import OutboundQueueFull
+from sovrin_client.agent.outbound_queues import OutboundQueues
+
+
+def testMessagesAreQueuedPerRemoteInOrder():
+    queues = OutboundQueues()
+    queues.add(('Faber', None), 1)
+    queues.add(('Acme', None), 2)
+    queues.add(('Faber', None), 3)
+    assert list(queues.pop(('Faber', None))) == [1, 3]
+    assert ('Faber', None) not in queues
+    assert queues.stats == {"remotes": 1, "queued": 1, "maxDepth": 1,
+                            "dropped": 0, "refused": 0}
+
+
+def testFullQueueDropsOldestMessage():
+    queues = OutboundQueues(maxSize=2)
+    for msg in range(4):
+        queues.add('Faber', msg)
+    assert list(queues.pop('Faber')) == [2, 3]
+    assert queues.stats["dropped"] == 2
+
+
+def testFullQueueCanRefuseMessages():
+    queues = OutboundQueues(maxSize=2, dropOldest=False)
+    queues.add('Faber', 1)
+    queues.add('Faber', 2)
+    with pytest.raises(OutboundQueueFull):
+        queues.add('Faber', 3)
+    assert list(queues.pop('Faber')) == [1, 2]
+    assert queues.stats["refused"] == 1
@@ -0,0 +1,126 @@
+import pytest
+
+from anoncreds.protocol.types import SchemaKey, ID
+from stp_core.loop.eventually import eventually
+
+
+@pytest.fixture(scope="module")
+def alicePrecomputesProofs(aliceAgent):
+    config = aliceAgent.config
+    old = getattr(config, 'PrecomputeProofs', False)
+    config.PrecomputeProofs = True
+    yield aliceAgent
+    config.PrecomputeProofs = old
+
+
+@pytest.fixture(scope="module")
+def proofsBuilt(aliceAgent):
+    """
+    Proof inputs of the proofs Alice's prover builds
+    """
+    built = []
+    prover = aliceAgent.prover
+    presentProof = prover.presentProof
+
+    async def countingPresentProof(proofInput, nonce):
+        built.append(proofInput)
+        return await presentProof(proofInput, nonce)
+
+    prover.presentProof = countingPresentProof
+    return built
+
+
+def jobApplicationRequest(aliceAgent):
+    return aliceAgent.wallet.getMatchingLinksWithProofReq(
+        "Job-Application", "Acme Corp")[0]
+
+
+def testProofIsNotPrecomputedWithoutClaims(alicePrecomputesProofs,
+                                           proofsBuilt, aliceAcceptedFaber,
+                                           aliceAcceptedAcme, emptyLooper):
+    aliceAgent = alicePrecomputesProofs
+    acmeLink, proofReq = jobApplicationRequest(aliceAgent)
+    aliceAgent.schedulePrecomputeProof(acmeLink, proofReq)
+    emptyLooper.runFor(1)
+    assert not proofsBuilt
+    assert not aliceAgent._getPrecomputed(acmeLink, proofReq)
+
+
+def testProofIsPrecomputedWhenClaimArrives(alicePrecomputesProofs,
+                                           proofsBuilt, aliceAcceptedFaber,
+                                           aliceAcceptedAcme, acmeAgent,
+                                           emptyLooper):
+    aliceAgent = alicePrecomputesProofs
+    faberLink = aliceAgent.wallet.getLink('Faber College')
+    name, version, origin = faberLink.availableClaims[0]
+    schemaKey = SchemaKey(name, version, origin)
+    aliceAgent.sendReqClaim(faberLink, schemaKey)
+
+    async def chkClaims():
+        claim = await aliceAgent.prover.wallet.getClaims(ID(schemaKey))
+        assert claim.primaryClaim
+
+    emptyLooper.run(eventually(chkClaims, timeout=20))
+
+    # The received claim satisfies Acme's proof request, its proof is
+    # built right away
+    acmeLink, proofReq = jobApplicationRequest(aliceAgent)
+
+    def chkPrecomputed():
+        fut = aliceAgent._getPrecomputed(acmeLink, proofReq)
+        assert fut and fut.done()
+
+    emptyLooper.run(eventually(chkPrecomputed, timeout=20))
+    assert len(proofsBuilt) == 1
+
+    # The proof sent is the precomputed one and Acme accepts it
+    aliceAgent.sendProof(acmeLink, proofReq)
+
+    def chkProof():
+        internalId = acmeAgent.getInternalIdByInvitedNonce(
+            acmeLink.invitationNonce)
+        link = acmeAgent.wallet.getLinkByInternalId(internalId)
+        assert "Job-Application" in link.verifiedClaimProofs
+
+    emptyLooper.run(eventually(chkProof, timeout=20))
+    assert len(proofsBuilt) == 1
+    assert not aliceAgent._getPrecomputed(acmeLink, proofReq)
+
+
+def testAnsweredProofRequestIsNotPrecomputedAgain(alicePrecomputesProofs,
+                                                  proofsBuilt, emptyLooper):
+    aliceAgent = alicePrecomputesProofs
+    acmeLink, proofReq = jobApplicationRequest(aliceAgent)
+    assert proofReq.answered
+    aliceAgent.invalidatePrecomputedProofs(['degree', 'ssn'])
+    emptyLooper.runFor(1)
+    assert len(proofsBuilt) == 1
+    assert not aliceAgent._getPrecomputed(acmeLink, proofReq)
+
+
+def testProofIsKeptForClaimWithOtherAttrs(alicePrecomputesProofs,
+                                          proofsBuilt, emptyLooper):
+    aliceAgent = alicePrecomputesProofs
+    acmeLink, proofReq = jobApplicationRequest(aliceAgent)
+    # As if Acme asked for the proof again
+    proofReq.answered = False
+    aliceAgent.schedulePrecomputeProof(acmeLink, proofReq)
+
+    def chkPrecomputed():
+        fut = aliceAgent._getPrecomputed(acmeLink, proofReq)
+        assert fut and fut.done()
+
+    emptyLooper.run(eventually(chkPrecomputed, timeout=20))
+    assert len(proofsBuilt) == 2
+    precomputed = aliceAgent._getPrecomputed(acmeLink, proofReq)
+
+    # None of the attributes of the new claim is in the proof request
+    aliceAgent.invalidatePrecomputedProofs(['salary_bracket'])
+    emptyLooper.runFor(1)
+    assert aliceAgent._getPrecomputed(acmeLink, proofReq) is precomputed
+    assert len(proofsBuilt) == 2
+
+    aliceAgent.invalidatePrecomputedProofs(['ssn'])
+    assert not aliceAgent._getPrecomputed(acmeLink, proofReq)
+    emptyLooper.run(eventually(chkPrecomputed, timeout=20))
+    assert len(proofsBuilt) == 3
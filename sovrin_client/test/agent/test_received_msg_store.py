@@ -0,0 +1,32 @@
+from sovrin_client.agent.received_msg_store import ReceivedMsgStore
+from sovrin_client.test.helper import ManualClock
+
+
+def testTakenMessagesAreRemoved():
+    store = ReceivedMsgStore(maxSize=10)
+    ping, pong = ({'type': 'PING'}, 'Faber'), ({'type': 'PONG'}, 'Faber')
+    store.add(1, ping)
+    store.add(1, pong)
+    assert store.take(1, ping)
+    assert store.get(1) == [pong]
+    assert not store.take(1, ping)
+    assert store.take(1, pong)
+    assert 1 not in store
+    assert store.stats["taken"] == 2
+
+
+def testMessagesExpireAndAreEvicted():
+    clock = ManualClock()
+    store = ReceivedMsgStore(maxSize=2, ttl=10, clock=clock)
+    store.add(1, ({}, 'Faber'))
+    clock.now = 5
+    store.add(2, ({}, 'Acme'))
+    clock.now = 11
+    # The expired message makes room for the new one
+    store.add(3, ({}, 'Thrift'))
+    assert store.get(1) is None
+    assert store.stats["expirations"] == 1
+    assert store.stats["evictions"] == 0
+    store.add(4, ({}, 'Faber'))
+    assert store.get(2) is None
+    assert store.stats["evictions"] == 1
@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from sovrin_client.agent.response_waiters import ResponseWaiters
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def testWaitIsResolvedByMatchingResponse(loop):
+    waiters = ResponseWaiters(loop)
+    fut = waiters.wait(1, 'PONG', timeout=5)
+    other = waiters.wait(1, 'PONG', timeout=5,
+                         predicate=lambda msg: msg == 'from link')
+    assert waiters.resolve(2, 'PONG', 'msg') == 0
+    assert waiters.resolve(1, 'PONG', 'msg') == 1
+    assert loop.run_until_complete(fut) == 'msg'
+    assert not other.done()
+    waiters.resolve(1, 'PONG', 'from link')
+    assert loop.run_until_complete(other) == 'from link'
+    assert len(waiters) == 0
+
+
+def testWaitsExpireInOrderWithOneTimer(loop):
+    waiters = ResponseWaiters(loop)
+    late = waiters.wait(1, 'PONG', timeout=0.2)
+    early = waiters.wait(2, 'PONG', timeout=0.05)
+    resolved = waiters.wait(3, 'PONG', timeout=0.01)
+    waiters.resolve(3, 'PONG', 'msg')
+    with pytest.raises(asyncio.TimeoutError):
+        loop.run_until_complete(early)
+    assert not late.done()
+    with pytest.raises(asyncio.TimeoutError):
+        loop.run_until_complete(late)
+    assert loop.run_until_complete(resolved) == 'msg'
+    assert len(waiters) == 0
@@ -0,0 +1,41 @@
+from plenum.common.signer_did import DidSigner
+from stp_core.loop.eventually import eventually
+
+
+def aliceLinkOfFaber(aliceAgent, faberAgent):
+    faberLink = aliceAgent.wallet.getLink('Faber College')
+    internalId = faberAgent.getInternalIdByInvitedNonce(
+        faberLink.invitationNonce)
+    return faberAgent.wallet.getLinkByInternalId(internalId)
+
+
+def verifiersOf(agent, identifier):
+    return {k for k in agent.verifierCache._entries if k[0] == identifier}
+
+
+def testVerifiersAreReusedForMessagesOfALink(aliceAgent, faberAgent,
+                                             aliceAcceptedFaber, emptyLooper):
+    aliceIdr = aliceLinkOfFaber(aliceAgent, faberAgent).remoteIdentifier
+    verifiers = verifiersOf(faberAgent, aliceIdr)
+    assert verifiers
+    hits = faberAgent.verifierCache.stats["hits"]
+
+    aliceAgent.sendReqAvailClaims(aliceAgent.wallet.getLink('Faber College'))
+
+    def chkVerified():
+        assert faberAgent.verifierCache.stats["hits"] > hits
+
+    emptyLooper.run(eventually(chkVerified, timeout=10))
+    assert verifiersOf(faberAgent, aliceIdr) == verifiers
+
+
+def testNewTargetVerkeyInvalidatesVerifiers(aliceAgent, faberAgent,
+                                            aliceAcceptedFaber):
+    link = aliceLinkOfFaber(aliceAgent, faberAgent)
+    assert verifiersOf(faberAgent, link.remoteIdentifier)
+
+    newVerkey = DidSigner(identifier=link.remoteIdentifier).verkey
+    faberAgent.setLinkTargetVerkey(link, newVerkey)
+    assert link.targetVerkey == newVerkey
+    # Verifiers of the old verkey are dropped
+    assert not verifiersOf(faberAgent, link.remoteIdentifier)
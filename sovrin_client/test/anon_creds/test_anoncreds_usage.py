@@ -2,6 +2,10 @@ import pytest
 
 from anoncreds.protocol.repo.attributes_repo import AttributeRepoInMemory
 from anoncreds.protocol.types import ID, ProofInput, PredicateGE
+from sovrin_client.anon_creds.claim_issuance_pool import ClaimIssuancePool, \
+    _nonRevocationClaimIssuer
+from sovrin_client.anon_creds.proof_verification_pool import \
+    ProofVerificationPool
 from sovrin_client.anon_creds.sovrin_issuer import SovrinIssuer
 from sovrin_client.anon_creds.sovrin_prover import SovrinProver
 from sovrin_client.anon_creds.sovrin_verifier import SovrinVerifier
@@ -61,3 +65,80 @@ def testAnonCredsPrimaryOnly(issuer, prover, verifier, attrRepo, primes1, looper
         assert await verifier.verify(proofInput, proof, revealedAttrs, nonce)
 
     looper.run(doTestAnonCredsPrimaryOnly)
+
+
+def testAnonCredsClaimIssuedByWorkerProcess(issuer, prover, verifier, attrRepo,
+                                            primes1, looper):
+    pool = ClaimIssuancePool(workers=2)
+
+    async def issueAndVerify(schemaName):
+        schema = await issuer.genSchema(schemaName, '1.0', GVT.attribNames())
+        schemaId = ID(schemaKey=schema.getKey(), schemaId=schema.seqId)
+        await issuer.genKeys(schemaId, **primes1)
+        await issuer.issueAccumulator(schemaId=schemaId, iA='110', L=5)
+
+        attrs = GVT.attribs(name='Alex', age=28, height=175, sex='male')
+        proverId = str(prover.proverId)
+        attrRepo.addAttributes(schema.getKey(), proverId, attrs)
+
+        claimsReq = await prover.createClaimRequest(schemaId, proverId, False)
+        claims = await pool.issueClaim(issuer, attrRepo, schemaId, claimsReq)
+        await prover.processClaim(schemaId, claims)
+
+        proofInput = ProofInput(['name'], [PredicateGE('age', 18)])
+        nonce = verifier.generateNonce()
+        proof, revealedAttrs = await prover.presentProof(proofInput, nonce)
+        assert await verifier.verify(proofInput, proof, revealedAttrs, nonce)
+
+    async def doTest():
+        await issueAndVerify('GVT-pool')
+        executor = pool._executor
+        # Keys of a new schema are shipped with its claims, the workers
+        # are kept
+        await issueAndVerify('GVT-pool2')
+        assert pool._executor is executor
+
+    try:
+        looper.run(doTest)
+    finally:
+        pool.shutdown()
+
+
+def testNonRevocationIssuanceNeedsPinnedAnoncreds(issuer):
+    # The private Issuer methods used are there in the pinned anoncreds
+    assert _nonRevocationClaimIssuer(issuer)
+    with pytest.raises(RuntimeError):
+        _nonRevocationClaimIssuer(object())
+
+
+def testAnonCredsProofVerifiedByWorkerProcess(issuer, prover, verifier,
+                                              attrRepo, primes1, looper):
+    pool = ProofVerificationPool(workers=2)
+
+    async def doTest():
+        schema = await issuer.genSchema('GVT-verif', '1.0', GVT.attribNames())
+        schemaId = ID(schemaKey=schema.getKey(), schemaId=schema.seqId)
+        await issuer.genKeys(schemaId, **primes1)
+        await issuer.issueAccumulator(schemaId=schemaId, iA='110', L=5)
+
+        attrs = GVT.attribs(name='Alex', age=28, height=175, sex='male')
+        proverId = str(prover.proverId)
+        attrRepo.addAttributes(schema.getKey(), proverId, attrs)
+
+        claimsReq = await prover.createClaimRequest(schemaId, proverId, False)
+        claims = await issuer.issueClaim(schemaId, claimsReq)
+        await prover.processClaim(schemaId, claims)
+
+        proofInput = ProofInput(['name'], [PredicateGE('age', 18)])
+        nonce = verifier.generateNonce()
+        proof, revealedAttrs = await prover.presentProof(proofInput, nonce)
+        assert await pool.verify(verifier, proofInput, proof, revealedAttrs,
+                                 nonce)
+        # A proof for a different nonce does not verify
+        assert not await pool.verify(verifier, proofInput, proof,
+                                     revealedAttrs, verifier.generateNonce())
+
+    try:
+        looper.run(doTest)
+    finally:
+        pool.shutdown()
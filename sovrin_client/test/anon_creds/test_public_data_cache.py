@@ -0,0 +1,50 @@
+import os
+
+from plenum.common.constants import TARGET_NYM, TXN_TYPE, DATA, NAME, \
+    VERSION, ORIGIN
+
+from sovrin_client.anon_creds.public_data_cache import PublicDataCache
+from sovrin_common.constants import GET_SCHEMA, GET_ISSUER_KEY, GET_NYM, REF
+
+issuerId = 'CzkavE58zgX7rUMrzSinLr'
+getSchemaOp = {TARGET_NYM: issuerId, TXN_TYPE: GET_SCHEMA,
+               DATA: {NAME: 'Transcript', VERSION: '1.2'}}
+getIssuerKeyOp = {TXN_TYPE: GET_ISSUER_KEY, REF: 14, ORIGIN: issuerId}
+schemaReply = {DATA: '{"name": "Transcript", "seqNo": 14}', 'seqNo': 14}
+
+
+def testRepliesAreReadAfterRestart(tdir):
+    cache = PublicDataCache(tdir)
+    cache.putReply(getSchemaOp, schemaReply)
+    cache.close()
+
+    cache = PublicDataCache(tdir)
+    assert cache.stats["loaded"] == 0
+    assert cache.getReply(getSchemaOp) == schemaReply
+    assert cache.getReply(getIssuerKeyOp) is None
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+    cache.close()
+
+
+def testOnlySchemasAndKeysAreCached(tdir):
+    cache = PublicDataCache(tdir)
+    getNymOp = {TARGET_NYM: issuerId, TXN_TYPE: GET_NYM}
+    cache.putReply(getNymOp, {DATA: '{}'})
+    assert cache.getReply(getNymOp) is None
+    assert cache.stats["size"] == 0
+    cache.close()
+
+
+def testCorruptReplyIsDiscarded(tdir):
+    cache = PublicDataCache(tdir)
+    cache.putReply(getIssuerKeyOp, schemaReply)
+    cache.close()
+    for name in os.listdir(cache.objectsDir):
+        with open(os.path.join(cache.objectsDir, name), 'ab') as f:
+            f.write(b'garbage')
+
+    cache = PublicDataCache(tdir)
+    assert cache.getReply(getIssuerKeyOp) is None
+    assert cache.stats["size"] == 0
+    cache.close()
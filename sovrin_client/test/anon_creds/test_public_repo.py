@@ -1,4 +1,6 @@
+import asyncio
 import sys
+from contextlib import contextmanager
 
 import pytest
 from anoncreds.protocol.issuer import Issuer
@@ -96,6 +98,34 @@ def testGetSchema(submittedSchemaDefGvt, publicRepo, looper):
     assert schema == submittedSchemaDefGvt
 
 
+@contextmanager
+def submittedReqs(client):
+    sent = []
+    submitReqs = client.submitReqs
+
+    def countingSubmitReqs(*reqs):
+        sent.extend(reqs)
+        return submitReqs(*reqs)
+
+    client.submitReqs = countingSubmitReqs
+    try:
+        yield sent
+    finally:
+        del client.submitReqs
+
+
+def testConcurrentGetSchemaSendsOneRequest(submittedSchemaDefGvt, publicRepo,
+                                           looper):
+    publicRepo.client.readCache.clear()
+    schemaId = ID(schemaKey=submittedSchemaDefGvt.getKey())
+    with submittedReqs(publicRepo.client) as sent:
+        schemas = looper.run(asyncio.gather(
+            *[publicRepo.getSchema(schemaId) for _ in range(3)]))
+
+    assert len(sent) == 1
+    assert all(schema == submittedSchemaDefGvt for schema in schemas)
+
+
 def testSubmitPublicKey(submittedPublicKeys):
     assert submittedPublicKeys
 
@@ -120,3 +150,25 @@ def testGetRevocationPublicKey(submittedSchemaDefGvtID,
                        "due to an issue in charm-crypto package.")
     else:
         assert pk == submittedPublicRevocationKey
+
+
+def testGetBothPublicKeysSendsOneRequest(submittedSchemaDefGvtID,
+                                         submittedPublicKeys, stewardWallet,
+                                         steward, looper):
+    # A fresh repo has no parsed keys, the primary and revocation keys are
+    # fetched together. The read cache is cleared before each call so it
+    # cannot serve the second one.
+    publicRepo = SovrinPublicRepo(steward, stewardWallet)
+    with submittedReqs(steward) as sent:
+        steward.readCache.clear()
+        pk = looper.run(publicRepo.getPublicKey(id=submittedSchemaDefGvtID))
+        steward.readCache.clear()
+        pkR = looper.run(
+            publicRepo.getPublicKeyRevocation(id=submittedSchemaDefGvtID))
+
+    assert len(sent) == 1
+    assert pk == submittedPublicKeys[0]
+    assert pkR
+    # Keys are parsed from the reply once
+    assert looper.run(
+        publicRepo.getPublicKey(id=submittedSchemaDefGvtID)) is pk
@@ -0,0 +1,122 @@
+import pytest
+
+from plenum.common.constants import CONSISTENCY_PROOF, LEDGER_STATUS, \
+    OP_FIELD_NAME
+from plenum.common.util import randomString
+from plenum.test.helper import assertFunc
+from stp_core.loop.eventually import eventually
+from stp_core.network.port_dispenser import genHa
+
+from sovrin_client.agent.agent import WalletedAgent
+from sovrin_client.agent.agent_host import AgentHost
+from sovrin_client.client.client_pool import ClientPool
+from sovrin_client.test.helper import TestClient, addUser
+from sovrin_common.identity import Identity
+
+
+@pytest.fixture(scope="module")
+def wallets(nodeSet, looper, steward, stewardWallet):
+    """
+    Wallets of agents sharing the pool's clients, with identifiers written
+    to Sovrin
+    """
+    return {name: addUser(looper, steward, stewardWallet, name)
+            for name in ('alice', 'bob', 'carol')}
+
+
+@pytest.fixture(scope="module")
+def clientPool(nodeSet, looper, tdirWithPoolTxns):
+    pool = ClientPool(size=2, basedirpath=tdirWithPoolTxns,
+                      clientClass=TestClient)
+    looper.add(pool)
+    looper.run(eventually(assertFunc,
+                          lambda: all(c.isReady() for c in pool.clients),
+                          timeout=20))
+    return pool
+
+
+def ledgerMsgsTo(client):
+    msgs = [entry.params['wrappedMsg'][0] for entry in
+            client.spylog.getAll(TestClient.handleOneNodeMsg.__name__)]
+    return [msg for msg in msgs
+            if msg.get(OP_FIELD_NAME) in (LEDGER_STATUS, CONSISTENCY_PROOF)]
+
+
+def requestIdentityOf(wallet, other):
+    return wallet.requestIdentity(Identity(identifier=other.defaultId),
+                                  sender=wallet.defaultId)
+
+
+def testAgentsAreSpreadOverClients(clientPool):
+    clients = [clientPool.assign() for _ in range(4)]
+    assert clients[0] is not clients[1]
+    assert len(set(map(id, clients))) == 2
+    clientPool.release(clients[0])
+    assert clientPool.assign() is clients[0]
+    assert clientPool.stats["agents"] == 4
+    assert all(c.clientPool is clientPool for c in clientPool.clients)
+    for client in clients:
+        clientPool.release(client)
+    assert clientPool.stats["agents"] == 0
+
+
+def testPoolLedgerIsCaughtUpOnce(clientPool):
+    catchupClient, follower = clientPool.clients
+    assert clientPool.catchupClient is catchupClient
+    assert ledgerMsgsTo(catchupClient)
+    assert not ledgerMsgsTo(follower)
+    assert follower.ledger.size == catchupClient.ledger.size
+    assert follower.nodeReg.keys() == catchupClient.nodeReg.keys()
+
+
+def testRepliesAreRoutedToTheirWallet(clientPool, wallets, looper):
+    alice, bob = wallets['alice'], wallets['bob']
+    clientPool.registerWallet(alice)
+    clientPool.registerWallet(bob)
+    client = clientPool.assign()
+    reqs = [requestIdentityOf(alice, bob), requestIdentityOf(bob, alice)]
+    client.submitReqs(*reqs)
+
+    def chkReplied():
+        assert reqs[0].key not in alice._getPrepared()
+        assert reqs[1].key not in bob._getPrepared()
+
+    looper.run(eventually(chkReplied, timeout=10))
+    assert clientPool.stats["unroutedReplies"] == 0
+    clientPool.release(client)
+    clientPool.deregisterWallet(alice)
+    clientPool.deregisterWallet(bob)
+    assert clientPool.stats["wallets"] == 0
+
+
+def testHostOnPooledClientLeavesRepliesToPool(clientPool, wallets, looper,
+                                              tdirWithPoolTxns):
+    def newTenant(name):
+        return WalletedAgent(name=name, basedirpath=tdirWithPoolTxns,
+                             wallet=wallets[name], loop=looper.loop)
+
+    _, port = genHa()
+    host = AgentHost(name=randomString(6), basedirpath=tdirWithPoolTxns,
+                     client=clientPool.assign(), port=port, loop=looper.loop,
+                     tenantFactory=newTenant)
+    looper.add(host)
+    assert not host.ownsClient
+    assert not host.client.hasObserver(host.handleIncomingReply)
+
+    carol = host.addTenant('carol', load=True).wallet
+    assert clientPool.stats["wallets"] == 1
+    req = requestIdentityOf(carol, wallets['alice'])
+    host.client.submitReqs(req)
+
+    def chkReplied():
+        assert req.key not in carol._getPrepared()
+
+    looper.run(eventually(chkReplied, timeout=10))
+    assert clientPool.stats["unroutedReplies"] == 0
+    assert host.stats["unroutedReplies"] == 0
+
+    looper.removeProdable(host)
+    host.stop()
+    assert clientPool.stats["wallets"] == 0
+    assert clientPool.stats["agents"] == 0
+    assert all(c.isReady() for c in clientPool.clients)
@@ -0,0 +1,75 @@
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, DATA, NAME, \
+    VERSION, ORIGIN
+
+from sovrin_common.constants import GET_NYM, GET_SCHEMA, GET_ISSUER_KEY, REF
+from sovrin_client.client.cache import LRUCache, LedgerReadCache
+from sovrin_client.test.helper import ManualClock
+
+
+def testLRUCacheEvictsLeastRecentlyUsed():
+    cache = LRUCache(maxSize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.evictions == 1
+
+
+def testLRUCacheExpiresEntries():
+    clock = ManualClock()
+    cache = LRUCache(maxSize=10, ttl=5, clock=clock)
+    cache.put('mutable', 1)
+    cache.put('immutable', 2, expires=False)
+    clock.now = 6
+    assert cache.get('mutable') is None
+    assert cache.get('immutable') == 2
+    assert cache.expirations == 1
+
+
+def testLRUCacheCountsHitsAndMisses():
+    cache = LRUCache(maxSize=10)
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('b')
+    assert cache.stats['hits'] == 1
+    assert cache.stats['misses'] == 1
+    assert cache.invalidate('a')
+    assert not cache.invalidate('a')
+    assert cache.get('a') is None
+
+
+def testLedgerReadCacheKeepsSchemasAndExpiresNyms():
+    clock = ManualClock()
+    cache = LedgerReadCache(maxSize=10, ttl=5, clock=clock)
+    schemaOp = {
+        TARGET_NYM: 'issuer',
+        TXN_TYPE: GET_SCHEMA,
+        DATA: {NAME: 'gvt', VERSION: '1.0'}
+    }
+    nymOp = {TARGET_NYM: 'nym', TXN_TYPE: GET_NYM}
+    cache.putReply(schemaOp, {DATA: 'schema'})
+    cache.putReply(nymOp, {DATA: 'nym'})
+    clock.now = 6
+    # Key does not depend on the order of fields in the operation
+    assert cache.getReply({
+        TXN_TYPE: GET_SCHEMA,
+        DATA: {VERSION: '1.0', NAME: 'gvt'},
+        TARGET_NYM: 'issuer'
+    }) == {DATA: 'schema'}
+    assert cache.getReply(nymOp) is None
+
+
+def testLedgerReadCacheInvalidatesOnlyMutableEntriesOfTarget():
+    cache = LedgerReadCache(maxSize=10, ttl=100)
+    keyOp = {TXN_TYPE: GET_ISSUER_KEY, REF: 1, ORIGIN: 'issuer'}
+    nymOp = {TARGET_NYM: 'issuer', TXN_TYPE: GET_NYM}
+    otherNymOp = {TARGET_NYM: 'other', TXN_TYPE: GET_NYM}
+    for op in (keyOp, nymOp, otherNymOp):
+        cache.putReply(op, {DATA: op[TXN_TYPE]})
+    assert cache.invalidateTarget('issuer') == 1
+    assert cache.getReply(keyOp)
+    assert cache.getReply(nymOp) is None
+    assert cache.getReply(otherNymOp)
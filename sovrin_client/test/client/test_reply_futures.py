@@ -0,0 +1,6 @@
+def testReplyFutureOfRequestWithoutRepliesExpires(looper, steward):
+    fut = steward.getReplyFuture('unsentIdr', 1, timeout=.5)
+    assert ('unsentIdr', 1) in steward._replyFutures
+    looper.runFor(1)
+    assert fut.cancelled()
+    assert ('unsentIdr', 1) not in steward._replyFutures
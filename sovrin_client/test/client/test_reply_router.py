@@ -0,0 +1,82 @@
+import jsonpickle
+from plenum.common.constants import IDENTIFIER, TXN_TYPE, TARGET_NYM
+
+from sovrin_client.client.reply_router import ReplyRouter
+from sovrin_client.client.wallet.wallet import Wallet
+from sovrin_common.constants import GET_NYM
+from sovrin_common.types import Request
+
+
+def prepareRequest(wallet, idr, reqId):
+    wallet.pendRequest(Request(identifier=idr, reqId=reqId,
+                               operation={TXN_TYPE: GET_NYM,
+                                          TARGET_NYM: idr}))
+    req, = wallet.preparePending()
+    return req
+
+
+def reply(router, req):
+    return router.route(None, req.reqId, 'Alpha',
+                        {IDENTIFIER: req.identifier, TXN_TYPE: GET_NYM}, 1)
+
+
+def testRepliesAreRoutedToThePreparingWallet():
+    router = ReplyRouter()
+    alice, bob = Wallet('alice'), Wallet('bob')
+    for wallet in (alice, bob):
+        wallet.addIdentifier()
+        router.add(wallet)
+    aliceReq = prepareRequest(alice, alice.defaultId, 1)
+    bobReq = prepareRequest(bob, bob.defaultId, 1)
+    assert reply(router, bobReq) is bob
+    assert reply(router, aliceReq) is alice
+    assert not alice.hasPrepared(aliceReq.key)
+    assert router.unrouted == 0
+
+
+def testIdentifierAddedLaterIsIndexedWhenItPreparesRequest():
+    router = ReplyRouter()
+    alice = Wallet('alice')
+    router.add(alice)
+    alice.addIdentifier()
+    req = prepareRequest(alice, alice.defaultId, 1)
+    assert router.walletFor(req.identifier, req.reqId) is alice
+    assert reply(router, req) is alice
+
+
+def testUnknownRepliesAreNotRouted():
+    router = ReplyRouter()
+    alice = Wallet('alice')
+    alice.addIdentifier()
+    router.add(alice)
+    req = prepareRequest(alice, alice.defaultId, 1)
+    assert reply(router, req) is alice
+    # A late duplicate of the reply, and one for a wallet never added
+    assert reply(router, req) is None
+    other = Wallet('other')
+    other.addIdentifier()
+    assert reply(router, prepareRequest(other, other.defaultId, 1)) is None
+    assert router.unrouted == 2
+
+
+def testRemovedWalletIsNoLongerObserved():
+    router = ReplyRouter()
+    alice = Wallet('alice')
+    router.add(alice)
+    router.remove(alice)
+    assert len(router) == 0
+    alice.addIdentifier()
+    req = prepareRequest(alice, alice.defaultId, 1)
+    assert router.walletFor(req.identifier, req.reqId) is None
+
+
+def testObserversAreNotPersisted():
+    router = ReplyRouter()
+    alice = Wallet('alice')
+    alice.addIdentifier()
+    router.add(alice)
+    restored = jsonpickle.decode(jsonpickle.encode(alice, keys=True),
+                                 keys=True)
+    req = prepareRequest(restored, restored.defaultId, 1)
+    assert restored.hasPrepared(req.key)
+    assert router.walletFor(req.identifier, req.reqId) is None
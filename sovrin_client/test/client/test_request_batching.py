@@ -0,0 +1,176 @@
+import json
+
+import pytest
+
+from plenum.client.client import Client as PlenumClient
+from plenum.common.constants import BATCH, OP_FIELD_NAME, REQACK, REQNACK
+from plenum.common.signer_did import DidSigner
+from plenum.common.types import f
+from stp_core.loop.eventually import eventually
+
+from sovrin_client.test.helper import genTestClient
+from sovrin_common.identity import Identity
+
+
+@pytest.fixture(scope="module")
+def batchingClient(nodeSet, looper, tdirWithPoolTxns, stewardWallet):
+    client, _ = genTestClient(tmpdir=tdirWithPoolTxns, usePoolLedger=True)
+    client.registerObserver(stewardWallet.handleIncomingReply)
+    looper.add(client)
+    looper.run(client.ensureConnectedToNodes())
+    return client
+
+
+@pytest.fixture
+def window(batchingClient):
+    """
+    Sets the batch window and size of the client for a test
+    """
+    def setWindow(seconds, size=100):
+        batchingClient.reqBatchWindow = seconds
+        batchingClient.reqBatchSize = size
+
+    yield setWindow
+    setWindow(0)
+
+
+def nymRequest(wallet):
+    nym = DidSigner().identifier
+    wallet.addTrustAnchoredIdentity(Identity(identifier=nym))
+    req, = wallet.preparePending()
+    return nym, req
+
+
+def chkWritten(wallet, *nyms):
+    for nym in nyms:
+        assert wallet.getTrustAnchoredIdentity(nym).seqNo
+
+
+def testRequestsAreSentRightAwayWithoutWindow(batchingClient, window,
+                                              stewardWallet, looper):
+    window(0)
+    nym, req = nymRequest(stewardWallet)
+    assert batchingClient.submitReqs(req) == [req]
+    assert not batchingClient._reqBatch
+    looper.run(eventually(chkWritten, stewardWallet, nym, timeout=10))
+
+
+def testWritesAreSentAtProdOnceWindowPassed(batchingClient, window,
+                                            stewardWallet, looper):
+    window(2)
+    written = [nymRequest(stewardWallet) for _ in range(2)]
+    reqs = [req for _, req in written]
+    assert batchingClient.submitReqs(*reqs) == reqs
+    looper.runFor(.5)
+    assert batchingClient._reqBatch == reqs
+
+    def chkFlushed():
+        assert not batchingClient._reqBatch
+
+    looper.run(eventually(chkFlushed, timeout=5))
+    looper.run(eventually(chkWritten, stewardWallet,
+                          *[nym for nym, _ in written], timeout=10))
+
+
+def testFullBatchIsSentWithoutWaitingForWindow(batchingClient, window,
+                                               stewardWallet, looper):
+    window(60, size=3)
+    written = [nymRequest(stewardWallet) for _ in range(3)]
+    batchingClient.submitReqs(*[req for _, req in written])
+    assert not batchingClient._reqBatch
+    looper.run(eventually(chkWritten, stewardWallet,
+                          *[nym for nym, _ in written], timeout=10))
+
+
+def testHeldWritesReachEachNodeInOneBatch(batchingClient, window,
+                                          stewardWallet, looper,
+                                          monkeypatch):
+    window(60)
+    stack = batchingClient.nodestack
+    transmitted = []
+
+    def recordingTransmit(msg, uid, *args, **kwargs):
+        transmitted.append((uid, stack.deserializeMsg(msg)))
+        return transmit(msg, uid, *args, **kwargs)
+
+    transmit = stack.transmit
+    monkeypatch.setattr(stack, 'transmit', recordingTransmit)
+    written = [nymRequest(stewardWallet) for _ in range(3)]
+    reqIds = {req.reqId for _, req in written}
+    batchingClient.submitReqs(*[req for _, req in written])
+    assert batchingClient.flushReqBatch() == 3
+    looper.run(eventually(chkWritten, stewardWallet,
+                          *[nym for nym, _ in written], timeout=10))
+
+    # Each node got the writes once, all in a single batch message
+    sent = {}
+    for uid, msg in transmitted:
+        msgs = [json.loads(m) for m in msg.get(f.MSGS.nm, [])] \
+            if msg.get(OP_FIELD_NAME) == BATCH else [msg]
+        ours = [m for m in msgs if m.get(f.REQ_ID.nm) in reqIds]
+        if ours:
+            assert msg.get(OP_FIELD_NAME) == BATCH
+            sent.setdefault(uid, []).append(
+                {m[f.REQ_ID.nm] for m in ours})
+    assert len(sent) == len(batchingClient.nodeReg)
+    assert all(batches == [reqIds] for batches in sent.values())
+
+
+def testHeldWritesAreSentOnStop(nodeSet, looper, tdirWithPoolTxns,
+                                stewardWallet, batchingClient):
+    client, _ = genTestClient(tmpdir=tdirWithPoolTxns, usePoolLedger=True)
+    looper.add(client)
+    looper.run(client.ensureConnectedToNodes())
+    client.reqBatchWindow = 60
+    nym, req = nymRequest(stewardWallet)
+    client.submitReqs(req)
+    looper.removeProdable(client)
+    client.stop()
+    assert not client._reqBatch
+
+    # The stopped client is not there for the reply, so the nym is read
+    stewardWallet.requestIdentity(Identity(identifier=nym),
+                                  sender=stewardWallet.defaultId)
+    batchingClient.submitReqs(*stewardWallet.preparePending())
+
+    def chkWrittenByStopped():
+        assert stewardWallet.knownIds[nym].trustAnchor == \
+            stewardWallet.defaultId
+
+    looper.run(eventually(chkWrittenByStopped, timeout=10))
+
+
+def testReadsAreNotHeldBack(batchingClient, window, stewardWallet, looper):
+    window(60)
+    nym, write = nymRequest(stewardWallet)
+    read = stewardWallet.requestIdentity(
+        Identity(identifier=stewardWallet.defaultId),
+        sender=stewardWallet.defaultId)
+    assert batchingClient.submitReqs(write, read) == [write, read]
+    assert batchingClient._reqBatch == [write]
+
+    def chkRead():
+        assert read.key not in stewardWallet._getPrepared()
+
+    looper.run(eventually(chkRead, timeout=10))
+    assert batchingClient.flushReqBatch() == 1
+    looper.run(eventually(chkWritten, stewardWallet, nym, timeout=10))
+
+
+def testBatchedNodeMessagesAreHandledOneByOne(batchingClient, monkeypatch):
+    handled = []
+    monkeypatch.setattr(PlenumClient, 'handleOneNodeMsg',
+                        lambda self, wrappedMsg, excludeFromCli=None:
+                        handled.append(wrappedMsg))
+    rejected = []
+    monkeypatch.setattr(batchingClient, '_resolveIfRejected',
+                        lambda idr, reqId: rejected.append(reqId))
+
+    ack = {OP_FIELD_NAME: REQACK, f.IDENTIFIER.nm: 'idr', f.REQ_ID.nm: 1}
+    nack = {OP_FIELD_NAME: REQNACK, f.IDENTIFIER.nm: 'idr', f.REQ_ID.nm: 2}
+    batch = {OP_FIELD_NAME: BATCH,
+             f.MSGS.nm: [json.dumps(ack), json.dumps(nack)]}
+    batchingClient.handleOneNodeMsg((batch, 'Alpha'))
+
+    assert handled == [(ack, 'Alpha'), (nack, 'Alpha')]
+    assert rejected == [2]
@@ -1,2 +1,78 @@
+import jsonpickle
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, IDENTIFIER
+
+from sovrin_common.constants import GET_NYM
+from sovrin_common.types import Request
+from sovrin_client.client.wallet.link import Link
 from sovrin_client.client.wallet.wallet import Wallet
 
+
+def testLinkLookupsFollowLinkUpdates():
+    wallet = Wallet('test')
+    link = Link('Faber', invitationNonce='nonce1', internalId=1)
+    wallet.addLink(link)
+    assert wallet.getLinkByNonce('nonce1') is link
+    assert wallet.getLinkByInternalId(1) is link
+    assert wallet.getLinkInvitationByTarget('remoteIdr') is None
+
+    link.remoteIdentifier = 'remoteIdr'
+    link.invitationNonce = 'nonce2'
+    assert wallet.getLinkInvitationByTarget('remoteIdr') is link
+    assert wallet.getLinkByNonce('nonce1') is None
+    assert wallet.getLinkByNonce('nonce2', 'remoteIdr') is link
+    assert wallet.getLinkByNonce('nonce2', 'otherIdr') is None
+
+
+def testReplacedLinkIsRemovedFromLookups():
+    wallet = Wallet('test')
+    wallet.addLink(Link('Faber', invitationNonce='nonce1'))
+    newLink = Link('Faber', invitationNonce='nonce2')
+    wallet.addLink(newLink)
+    assert wallet.getLinkByNonce('nonce1') is None
+    assert wallet.getLinkByNonce('nonce2') is newLink
+
+
+def testLinkLookupsAfterWalletRestore():
+    wallet = Wallet('test')
+    wallet.addLink(Link('Faber', remoteIdentifier='remoteIdr',
+                        invitationNonce='nonce1', internalId=1))
+    restored = jsonpickle.decode(jsonpickle.encode(wallet, keys=True),
+                                 keys=True)
+    link = restored.getLink('Faber')
+    assert restored.getLinkInvitationByTarget('remoteIdr') is link
+    link.invitationNonce = 'nonce2'
+    assert restored.getLinkByNonce('nonce2') is link
+    assert restored.getLinkByInternalId(1) is link
+
+
+def prepareRequests(wallet, count):
+    idr = wallet.defaultId
+    reqs = []
+    for reqId in range(1, count + 1):
+        wallet.pendRequest(Request(identifier=idr, reqId=reqId,
+                                   operation={TXN_TYPE: GET_NYM,
+                                              TARGET_NYM: idr}))
+        reqs.extend(wallet.preparePending())
+    return reqs
+
+
+def testPreparedRequestIsRemovedOnceReplyHandled():
+    wallet = Wallet('test')
+    wallet.addIdentifier()
+    for req in prepareRequests(wallet, 100):
+        wallet.handleIncomingReply(None, req.reqId, 'Alpha',
+                                   {IDENTIFIER: req.identifier,
+                                    TXN_TYPE: GET_NYM}, 1)
+    # Does not grow with the number of requests
+    assert len(wallet._prepared) == 0
+
+
+def testPreparedRequestsWithoutReplyAreBounded():
+    wallet = Wallet('test')
+    wallet.maxPrepared = 10
+    wallet._prepared = wallet._newPrepared()
+    wallet.addIdentifier()
+    reqs = prepareRequests(wallet, 25)
+    assert len(wallet._prepared) == 10
+    assert (reqs[-1].identifier, reqs[-1].reqId) in wallet._prepared
+    assert (reqs[0].identifier, reqs[0].reqId) not in wallet._prepared
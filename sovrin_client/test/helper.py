@@ -259,4 +259,17 @@ def addUser(looper, creatorClient, creatorWallet, name, useDid=True,
     idr, _ = wallet.addIdentifier(signer=signer)
     verkey = wallet.getVerkey(idr) if addVerkey else None
     createNym(looper, idr, creatorClient, creatorWallet, verkey=verkey)
-    return wallet
\ No newline at end of file
+    return wallet
+
+
+class ManualClock:
+    """
+    Clock for caches and stores expiring their entries, telling the time a
+    test sets
+    """
+
+    def __init__(self, now=0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
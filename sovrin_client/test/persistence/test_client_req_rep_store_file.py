@@ -0,0 +1,45 @@
+import os
+
+from plenum.common.constants import TXN_TYPE
+from plenum.common.types import f
+
+from sovrin_client.persistence.client_req_rep_store_file import \
+    ClientReqRepStoreFile
+from sovrin_client.persistence.retention import RetentionPolicy
+from sovrin_common.constants import NYM
+from sovrin_common.types import Request
+
+
+def addRequest(store, identifier, reqId, age=0):
+    store.addRequest(Request(identifier=identifier, reqId=reqId,
+                             operation={TXN_TYPE: NYM}))
+    store.addAck({f.IDENTIFIER.nm: identifier, f.REQ_ID.nm: reqId}, 'Alpha')
+    if age:
+        path = store.reqStore.keyFilePath("{}{}".format(identifier, reqId))
+        then = os.path.getmtime(path) - age
+        os.utime(path, (then, then))
+
+
+def testRequestsAreFoundByTheirContent(tmpdir):
+    store = ClientReqRepStoreFile('client', str(tmpdir))
+    # Both are kept in the file of key "idr112"
+    addRequest(store, 'idr1', 12)
+    addRequest(store, 'idr11', 2)
+    assert sorted((e.identifier, e.reqId)
+                  for e in store.retentionEntries()) == \
+        [('idr1', 12), ('idr11', 2)]
+
+
+def testOldRequestsAreCompacted(tmpdir):
+    store = ClientReqRepStoreFile('client', str(tmpdir))
+    addRequest(store, 'idr', 1, age=1000)
+    addRequest(store, 'idr', 2, age=1000)
+    addRequest(store, 'idr', 3)
+
+    result = store.compact(RetentionPolicy(maxAge=100, minAge=0))
+    assert result.entries == 2
+    assert result.bytes > 0
+    assert [store.hasRequest('idr', r) for r in (1, 2, 3)] == \
+        [False, False, True]
+    assert store.getAcks('idr', 3) == ['Alpha']
+    assert store.compact(RetentionPolicy(maxAge=100, minAge=0)).entries == 0
@@ -0,0 +1,88 @@
+from plenum.common.constants import TXN_ID, TXN_TYPE, TXN_TIME
+from plenum.common.types import f
+
+from sovrin_common.constants import NYM
+from sovrin_common.types import Request
+from sovrin_client.persistence.client_req_rep_store_orientdb import \
+    ClientReqRepStoreOrientDB
+
+
+class RecordingClient:
+    def __init__(self):
+        self.commands = []
+        self.batches = []
+
+    def command(self, cmd):
+        self.commands.append(cmd)
+        return []
+
+    def batch(self, script):
+        self.batches.append(script)
+
+    @property
+    def roundTrips(self):
+        return len(self.commands) + len(self.batches)
+
+
+class FakeOrientDbStore:
+    def __init__(self):
+        self.client = RecordingClient()
+
+    def createClasses(self, classes):
+        pass
+
+
+def testWritesOfRequestsAreBatchedPerFlush():
+    store = ClientReqRepStoreOrientDB(FakeOrientDbStore(), batchSize=1000)
+    nodes = ('Alpha', 'Beta', 'Gamma', 'Delta')
+    numReqs = 10
+    for reqId in range(1, numReqs + 1):
+        store.addRequest(Request(identifier='idr', reqId=reqId,
+                                 operation={TXN_TYPE: NYM}))
+        for node in nodes:
+            store.addAck({f.IDENTIFIER.nm: 'idr', f.REQ_ID.nm: reqId}, node)
+        result = {TXN_ID: 'txn', TXN_TIME: 1, TXN_TYPE: NYM}
+        counts = [store.addReply('idr', reqId, node, result)
+                  for node in nodes]
+        assert counts == [1, 2, 3, 4]
+        store.setConsensus('idr', reqId)
+    store.flush()
+    # Previously every request took 1 + 4 + 2 * 4 + 1 round trips
+    assert store.store.client.roundTrips == 1
+    script = store.store.client.batches[0]
+    assert script.startswith("begin;") and script.endswith("commit;")
+
+
+def testValuesAreQuotedAsLiterals():
+    store = ClientReqRepStoreOrientDB(FakeOrientDbStore())
+    store.addNack({f.IDENTIFIER.nm: 'idr', f.REQ_ID.nm: 1,
+                   f.REASON.nm: 'can\'t "parse"'}, 'Alpha')
+    store.flush()
+    assert 'nacks.Alpha = "can\'t \\"parse\\""' in \
+           store.store.client.batches[0]
+
+
+def testBufferedWritesAreFlushedBeforeReads():
+    store = ClientReqRepStoreOrientDB(FakeOrientDbStore())
+    store.addAck({f.IDENTIFIER.nm: 'idr', f.REQ_ID.nm: 1}, 'Alpha')
+    assert not store.store.client.batches
+    store.getAcks('idr', 1)
+    assert len(store.store.client.batches) == 1
+
+
+def testReplySendersOfUnconfirmedRequestsAreBounded():
+    store = ClientReqRepStoreOrientDB(FakeOrientDbStore(),
+                                      replySendersCacheSize=5)
+    result = {TXN_ID: 'txn', TXN_TIME: 1, TXN_TYPE: NYM}
+    for reqId in range(1, 21):
+        store.addRequest(Request(identifier='idr', reqId=reqId,
+                                 operation={TXN_TYPE: NYM}))
+        # Only one reply, so the request never reaches consensus
+        store.addReply('idr', reqId, 'Alpha', result)
+    assert len(store._replySenders) == 5
+
+    store.setConsensus('idr', 20)
+    store.removeRequests({('idr', 19)})
+    assert ('idr', 20) not in store._replySenders
+    assert ('idr', 19) not in store._replySenders
+    assert len(store._replySenders) == 3
@@ -0,0 +1,140 @@
+import os
+import sqlite3
+
+from plenum.common.constants import TARGET_NYM, TXN_ID, TXN_TYPE, TXN_TIME
+from plenum.common.types import f
+
+from sovrin_common.constants import NYM
+from sovrin_common.types import Request
+from sovrin_client.persistence.client_req_rep_store_sqlite import \
+    ClientReqRepStoreSqlite
+from sovrin_client.persistence.retention import RetentionPolicy
+
+
+def msg(identifier, reqId, **kwargs):
+    return dict({f.IDENTIFIER.nm: identifier, f.REQ_ID.nm: reqId}, **kwargs)
+
+
+def reply(reqId):
+    return {f.IDENTIFIER.nm: 'idr', f.REQ_ID.nm: reqId, TXN_TYPE: NYM,
+            TXN_ID: 'txn{}'.format(reqId), TXN_TIME: 1000}
+
+
+def testRepliesAcksAndNacks(tmpdir):
+    store = ClientReqRepStoreSqlite('client', str(tmpdir), batchSize=5)
+    store.addRequest(Request(identifier='idr', reqId=1,
+                             operation={TXN_TYPE: NYM}))
+    assert store.hasRequest('idr', 1)
+    assert not store.requestConfirmed('idr', 1)
+    for node in ('Alpha', 'Beta'):
+        store.addAck(msg('idr', 1), node)
+    store.addNack(msg('idr', 1, **{f.REASON.nm: "can't"}), 'Gamma')
+    assert sorted(store.getAcks('idr', 1)) == ['Alpha', 'Beta']
+    assert store.getNacks('idr', 1) == {'Gamma': "can't"}
+
+    assert store.addReply('idr', 1, 'Alpha', reply(1)) == 1
+    assert store.addReply('idr', 1, 'Beta', reply(1)) == 2
+    assert store.requestConfirmed('idr', 1)
+    assert not store.hasConsensus('idr', 1)
+    store.setConsensus('idr', 1)
+    assert store.hasConsensus('idr', 1)
+    assert store.lastReqId == 1
+
+
+def testRequestsAndRejects(tmpdir):
+    store = ClientReqRepStoreSqlite('client', str(tmpdir))
+    req = Request(identifier='idr', reqId=1,
+                  operation={TXN_TYPE: NYM, TARGET_NYM: 'nym1'})
+    store.addRequest(req)
+    assert store.getRequest('idr', 1).operation == req.operation
+    assert store.getRequest('idr', 2) is None
+
+    store.addReject(msg('idr', 1, **{f.REASON.nm: 'exists'}), 'Alpha')
+    store.addReject(msg('idr', 1, **{f.REASON.nm: 'exists'}), 'Beta')
+    assert store.getRejects('idr', 1) == {'Alpha': 'exists',
+                                          'Beta': 'exists'}
+    assert store.getAllReplies('idr', 1) == \
+        ({}, {'Alpha': 'exists', 'Beta': 'exists'})
+
+    store.compact(RetentionPolicy(maxAge=0, minAge=0))
+    assert store.getRejects('idr', 1) == {}
+
+
+def testDataIsKeptAfterRestart(tmpdir):
+    store = ClientReqRepStoreSqlite('client', str(tmpdir))
+    store.addRequest(Request(identifier='idr', reqId=7,
+                             operation={TXN_TYPE: NYM}))
+    store.addAck(msg('idr', 7), 'Alpha')
+    store.setLastTxnForIdentifier('idr', 'txn7')
+    store.close()
+
+    store = ClientReqRepStoreSqlite('client', str(tmpdir))
+    assert store.lastReqId == 7
+    assert store.getAcks('idr', 7) == ['Alpha']
+    assert store.getLastTxnForIdentifier('idr') == 'txn7'
+    assert store.getLastTxnForIdentifier('other') is None
+
+
+def testConfirmedRequestsAreCompacted(tmpdir):
+    store = ClientReqRepStoreSqlite('client', str(tmpdir))
+    for reqId in (1, 2):
+        store.addRequest(Request(identifier='idr', reqId=reqId,
+                                 operation={TXN_TYPE: NYM}))
+        store.addAck(msg('idr', reqId), 'Alpha')
+    store.addReply('idr', 1, 'Alpha', reply(1))
+    store.setConsensus('idr', 1)
+
+    policy = RetentionPolicy(consensusGrace=0, minAge=0)
+    result = store.compact(policy)
+    assert result.entries == 1
+    assert result.bytes > 0
+    assert not store.hasRequest('idr', 1)
+    assert not store.getAcks('idr', 1)
+    assert store.hasRequest('idr', 2)
+    assert store.compact(policy).entries == 0
+
+
+def testCompactionRunsInSlices(tmpdir):
+    store = ClientReqRepStoreSqlite('client', str(tmpdir))
+    for reqId in range(1, 8):
+        store.addRequest(Request(identifier='idr', reqId=reqId,
+                                 operation={TXN_TYPE: NYM}))
+    store.flush()
+
+    steps = store.compactInSlices(RetentionPolicy(maxCount=2, minAge=0),
+                                  sliceSize=3)
+    # 7 requests read and 5 removed, 3 at a time
+    for _ in range(4):
+        next(steps)
+    try:
+        next(steps)
+    except StopIteration as ex:
+        assert ex.value.entries == 5
+    else:
+        assert False, "compaction did not finish"
+    assert [store.hasRequest('idr', r) for r in (5, 6, 7)] == \
+        [False, True, True]
+
+
+def testCreationTimeIsAddedToOldDatabases(tmpdir):
+    dataDir = os.path.join(str(tmpdir), "data", "clients", "client")
+    os.makedirs(dataDir)
+    db = sqlite3.connect(os.path.join(dataDir, "req_rep.db"))
+    db.execute("create table ReqData (identifier text not null, "
+               "reqId integer not null, txnType text, txnId text, "
+               "txnTime integer, hasConsensus integer not null default 0, "
+               "primary key (identifier, reqId))")
+    db.execute("insert into ReqData (identifier, reqId, txnType) "
+               "values ('idr', 1, 'NYM')")
+    db.commit()
+    db.close()
+
+    store = ClientReqRepStoreSqlite('client', str(tmpdir))
+    store.addRequest(Request(identifier='idr', reqId=2,
+                             operation={TXN_TYPE: NYM}))
+    assert store.hasRequest('idr', 2)
+    # The old request is aged from the migration, not dropped as expired
+    assert not store.compact(RetentionPolicy(maxAge=60, minAge=0)).entries
+    assert store.hasRequest('idr', 1)
+    # Requests were not kept before
+    assert store.getRequest('idr', 1) is None
@@ -0,0 +1,76 @@
+from plenum.common.constants import TXN_TYPE, TARGET_NYM, TXN_ID
+from plenum.common.types import f
+
+from sovrin_client.persistence.client_txn_log import ClientTxnLog
+from sovrin_common.constants import ATTRIB, NYM
+
+
+def txn(identifier, reqId, txnType, nym):
+    return {f.IDENTIFIER.nm: identifier, f.REQ_ID.nm: reqId,
+            TXN_TYPE: txnType, TARGET_NYM: nym,
+            TXN_ID: 'txn{}{}'.format(identifier, reqId)}
+
+
+def newTxnLog(dataDir):
+    txnLog = ClientTxnLog('client1', dataDir)
+    for t in (txn('idr1', 1, NYM, 'nym1'), txn('idr1', 2, ATTRIB, 'nym1'),
+              txn('idr2', 1, NYM, 'nym2')):
+        txnLog.append(t[f.IDENTIFIER.nm], t[f.REQ_ID.nm], t)
+    return txnLog
+
+
+def nymsOf(txns):
+    return [t[TARGET_NYM] for t in txns]
+
+
+def testLookupsByTypeNymAndTxnId(tmpdir):
+    txnLog = newTxnLog(str(tmpdir))
+    assert nymsOf(txnLog.getTxnsByType(NYM)) == ['nym1', 'nym2']
+    assert [t[TXN_TYPE] for t in txnLog.getTxnsByNym('nym1')] == \
+        [NYM, ATTRIB]
+    assert txnLog.getTxnById('txnidr12')[TXN_TYPE] == ATTRIB
+    assert txnLog.getTxnById('unknown') is None
+    assert txnLog.hasTxnWithReqId('idr2', 1)
+    assert not txnLog.hasTxnWithReqId('idr2', 2)
+
+
+def testIndexIsLoadedOnRestart(tmpdir):
+    newTxnLog(str(tmpdir)).close()
+    txnLog = ClientTxnLog('client1', str(tmpdir))
+    assert nymsOf(txnLog.getTxnsByType(ATTRIB)) == ['nym1']
+    assert txnLog.getTxnById('txnidr21')[TARGET_NYM] == 'nym2'
+    txnLog.append('idr2', 2, txn('idr2', 2, NYM, 'nym3'))
+    assert nymsOf(txnLog.getTxnsByType(NYM)) == ['nym1', 'nym2', 'nym3']
+
+
+def testPartiallyWrittenEntryIsDiscarded(tmpdir):
+    txnLog = newTxnLog(str(tmpdir))
+    indexPath = txnLog.txnIndex.filePath
+    txnLog.close()
+    # The process stopped while writing the last entry to the index
+    with open(indexPath, 'rb+') as indexFile:
+        indexFile.truncate(len(indexFile.read()) - 5)
+
+    txnLog = ClientTxnLog('client1', str(tmpdir))
+    assert nymsOf(txnLog.getTxnsByType(NYM)) == ['nym1', 'nym2']
+    assert txnLog.getTxnById('txnidr21')[TARGET_NYM] == 'nym2'
+
+
+def testTxnsMissingFromIndexAreIndexedOnStartup(tmpdir):
+    txnLog = newTxnLog(str(tmpdir))
+    indexPath = txnLog.txnIndex.filePath
+    txnLog.close()
+
+    # The process stopped after writing the last txn to the log but
+    # before adding it to the index
+    with open(indexPath, 'rb') as indexFile:
+        entries = indexFile.readlines()
+    with open(indexPath, 'wb') as indexFile:
+        indexFile.writelines(entries[:-1])
+
+    txnLog = ClientTxnLog('client1', str(tmpdir))
+    assert txnLog.hasTxnWithReqId('idr2', 1)
+    assert txnLog.getTxnById('txnidr21')[TARGET_NYM] == 'nym2'
+    assert nymsOf(txnLog.getTxnsByType(NYM)) == ['nym1', 'nym2']
+    # Nothing was indexed twice
+    assert len(txnLog.getTxnsByNym('nym1')) == 2
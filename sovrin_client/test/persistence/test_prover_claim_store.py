@@ -0,0 +1,41 @@
+from collections import OrderedDict
+
+from sovrin_client.persistence.prover_claim_store import ProverClaimStore
+
+transcript = ('Transcript', '1.2', 'FuN98eH2eZybECWkofW6A9BKJxxnTatBCopfUiNxo6ZB')
+jobCertificate = ('Job-Certificate', '0.2',
+                  'H2aKRiDeq8aLZSydQMDbtf3Q3cPdRRPnSuxFpHbTS5qR')
+
+
+def transcriptAttrs(received=True):
+    return OrderedDict([('student_name', 'Alice' if received else None),
+                        ('degree', 'Bachelor' if received else None),
+                        ('year', '2015' if received else None)])
+
+
+def testClaimsAreFoundByAttribute(tdir):
+    store = ProverClaimStore(tdir)
+    store.put(transcript, transcriptAttrs(received=False))
+    store.put(jobCertificate, OrderedDict([('first_name', None),
+                                           ('employee_status', None)]))
+    assert store.claimsWithAttrs(['degree']) == {transcript}
+    assert store.claimsWithAttrs(['year', 'employee_status']) == \
+        {transcript, jobCertificate}
+    assert store.claimsWithAttrs(['ssn']) == set()
+    assert not store.isReceived(transcript)
+    store.close()
+
+
+def testClaimsArePersistedInSchemaOrder(tdir):
+    store = ProverClaimStore(tdir)
+    store.put(transcript, transcriptAttrs(received=False))
+    store.put(transcript, transcriptAttrs())
+    store.close()
+
+    store = ProverClaimStore(tdir)
+    assert len(store) == 1
+    assert store.isReceived(transcript)
+    assert list(store.get(transcript).items()) == \
+        list(transcriptAttrs().items())
+    assert store.claimsWithAttrs(['student_name']) == {transcript}
+    store.close()
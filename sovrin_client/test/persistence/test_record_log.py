@@ -0,0 +1,71 @@
+import json
+import os
+
+from sovrin_client.persistence.client_req_rep_store_file import \
+    ClientReqRepStoreFile
+from sovrin_client.persistence.record_log import RecordLog
+
+
+def testLatestValuesAreRecoveredOnRestart(tmpdir):
+    log = RecordLog(str(tmpdir), 'log')
+    log.put('a', 1)
+    log.put('b', {'x': 2})
+    log.put('a', 3)
+    log.put(('c', 1), 4)
+    log.remove('b')
+    log.close()
+
+    log = RecordLog(str(tmpdir), 'log')
+    assert log.get('a') == 3
+    assert 'b' not in log
+    assert log.get(('c', 1)) == 4
+    assert len(log) == 2
+
+
+def testPartiallyWrittenRecordIsDiscarded(tmpdir):
+    log = RecordLog(str(tmpdir), 'log')
+    log.put('a', 1)
+    log.close()
+    with open(log.filePath, 'ab') as f:
+        f.write(b'["p", "a", ')
+
+    log = RecordLog(str(tmpdir), 'log')
+    assert log.get('a') == 1
+    log.put('b', 2)
+    log.close()
+
+    log = RecordLog(str(tmpdir), 'log')
+    assert log.get('a') == 1
+    assert log.get('b') == 2
+
+
+def testLogIsCompactedWhenMostlyOverwrites(tmpdir):
+    log = RecordLog(str(tmpdir), 'log', compactionFactor=2,
+                    minCompactionSize=10)
+    for i in range(25):
+        log.put('a' if i % 2 else 'b', i)
+    with open(log.filePath) as f:
+        assert len(f.readlines()) <= 10
+    log.close()
+
+    log = RecordLog(str(tmpdir), 'log')
+    assert log.get('a') == 23
+    assert log.get('b') == 24
+    assert not os.path.exists(log.filePath + '.tmp')
+
+
+def testLegacyLastTxnsAreMigrated(tmpdir):
+    store = ClientReqRepStoreFile('client', str(tmpdir))
+    legacyPath = os.path.join(store.dataLocation, store.lastTxnsFileName)
+    store.lastTxns.close()
+    os.remove(store.lastTxns.filePath)
+    with open(legacyPath, 'w') as f:
+        # Leftovers of a longer object since the file was not truncated
+        f.write(json.dumps({'idr1': 'txn1', 'idr2': 'txn2'}) + '2"}')
+
+    store = ClientReqRepStoreFile('client', str(tmpdir))
+    assert store.getLastTxnForIdentifier('idr1') == 'txn1'
+    assert store.getLastTxnForIdentifier('idr2') == 'txn2'
+    assert not os.path.exists(legacyPath)
+    store.setLastTxnForIdentifier('idr1', 'txn3')
+    assert store.getLastTxnForIdentifier('idr1') == 'txn3'
@@ -0,0 +1,28 @@
+from sovrin_client.persistence.retention import RetentionEntry, \
+    RetentionPolicy
+
+
+def entry(reqId, time, confirmed=False):
+    return RetentionEntry('idr', reqId, time, confirmed, 10)
+
+
+def testOldRequestsAreDropped():
+    policy = RetentionPolicy(maxAge=100, minAge=0)
+    entries = [entry(1, 0), entry(2, 50), entry(3, 150)]
+    assert policy.select(entries, now=160) == {('idr', 1), ('idr', 2)}
+
+
+def testConfirmedRequestsAreDroppedAfterGrace():
+    policy = RetentionPolicy(consensusGrace=10, minAge=0)
+    entries = [entry(1, 0, confirmed=True), entry(2, 0),
+               entry(3, 95, confirmed=True)]
+    assert policy.select(entries, now=100) == {('idr', 1)}
+
+
+def testOnlyNewestRequestsAreKeptButNotTooYoungOnes():
+    policy = RetentionPolicy(maxCount=1, minAge=30)
+    entries = [entry(3, 90), entry(1, 0), entry(2, 50)]
+    assert policy.select(entries, now=100) == {('idr', 1), ('idr', 2)}
+    # Request 2 is still waiting for replies
+    assert policy.select(entries, now=60) == {('idr', 1)}
+    assert not RetentionPolicy(minAge=0).select(entries, now=1000)